@@ -0,0 +1,210 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+Records the API responses the crawler sees into a compressed fixture and serves them again offline.
+
+Stub clients are real boto3 clients; the stub answers at the HTTP layer (before-send), so request
+serialization, response parsing, retries, the rate limiter and the API metrics run as in Lambda.
+The organizations, sso-admin and identitystore APIs all use the JSON protocol, so a request is
+identified by its service, operation and JSON body.
+"""
+
+import gzip
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+import boto3
+from botocore.awsrequest import AWSResponse
+
+FIXTURE_VERSION = 1
+THROTTLING_BODY = {"__type": "ThrottlingException", "message": "Rate exceeded"}
+
+
+class ServiceError(Exception):
+    def __init__(self, code: str, message: str = "", status_code: int = 400):
+        """Raised by StubSession.respond() to answer with a service error, e.g. ResourceNotFoundException."""
+        super().__init__(message or code)
+        self.code = code
+        self.status_code = status_code
+
+
+def _canonical_body(body) -> str:
+    if isinstance(body, bytes):
+        body = body.decode("utf-8")
+    return json.dumps(json.loads(body or "{}"), sort_keys=True, separators=(",", ":"))
+
+
+class _RawBody:
+    """Minimal urllib3 response stand-in; AWSResponse only streams it."""
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+    def stream(self, **kwargs):
+        yield self.content
+
+
+class StubSession:
+    def __init__(
+        self,
+        latency_seconds: float = 0.0,
+        throttle_rate: float = 0.0,
+        seed: int = 1,
+    ):
+        """
+        boto3.Session look-alike whose clients are answered by respond() instead of AWS.
+
+        Args:
+            latency_seconds (float): Simulated round trip time of every request.
+            throttle_rate (float): Share of requests answered with a ThrottlingException.
+            seed (int): Seed of the throttling decisions.
+        """
+        self.latency_seconds = latency_seconds
+        self.throttle_rate = throttle_rate
+        self.requests = 0
+        self.throttled_requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._session = boto3.Session(
+            aws_access_key_id="stub",
+            aws_secret_access_key="stub",
+            region_name="us-east-1",
+        )
+
+    def respond(self, service_name: str, operation_name: str, params: Dict) -> Dict:
+        raise NotImplementedError
+
+    def client(self, service_name: str, config=None, **kwargs):
+        client = self._session.client(service_name, config=config, **kwargs)
+
+        def _send(request, **_):
+            operation_name = request.headers["X-Amz-Target"].decode().split(".")[-1]
+            with self._lock:
+                self.requests += 1
+                throttled = self._random.random() < self.throttle_rate
+                self.throttled_requests += 1 if throttled else 0
+            if self.latency_seconds:
+                time.sleep(self.latency_seconds)
+            if throttled:
+                return self._response(request, 400, THROTTLING_BODY)
+            try:
+                body = self.respond(
+                    service_name, operation_name, json.loads(request.body or "{}")
+                )
+            except ServiceError as e:
+                return self._response(
+                    request, e.status_code, {"__type": e.code, "message": str(e)}
+                )
+            return self._response(request, 200, body)
+
+        client.meta.events.register("before-send.*.*", _send)
+        return client
+
+    def _response(self, request, status_code: int, body) -> AWSResponse:
+        content = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        return AWSResponse(
+            request.url,
+            status_code,
+            {"Content-Type": "application/x-amz-json-1.1"},
+            _RawBody(content),
+        )
+
+
+class ApiRecorder:
+    def __init__(self):
+        """Collects the successful responses of the clients it is attached to."""
+        self.responses: Dict[Tuple[str, str, str], bytes] = {}
+        self._lock = threading.Lock()
+
+    # ¦ attach
+    def attach(self, boto3_client):
+        service_name = boto3_client.meta.service_model.service_name
+
+        def _before_call(params, context, **_):
+            context["recorded_request"] = _canonical_body(params.get("body"))
+
+        def _after_call(http_response, model, context, **_):
+            if http_response.status_code != 200 or "recorded_request" not in context:
+                return
+            with self._lock:
+                self.responses[
+                    (service_name, model.name, context["recorded_request"])
+                ] = http_response.content
+
+        boto3_client.meta.events.register("before-call.*.*", _before_call)
+        boto3_client.meta.events.register("after-call.*.*", _after_call)
+        return boto3_client
+
+    # ¦ save
+    def save(self, path: str, metadata: Optional[Dict] = None):
+        fixture = {
+            "version": FIXTURE_VERSION,
+            "recorded": datetime.now(timezone.utc).isoformat(),
+            "metadata": metadata or {},
+            "responses": [
+                {
+                    "service": service_name,
+                    "operation": operation_name,
+                    "request": request,
+                    "response": content.decode("utf-8"),
+                }
+                for (service_name, operation_name, request), content in sorted(
+                    self.responses.items()
+                )
+            ],
+        }
+        with gzip.open(path, "wt", encoding="utf-8") as fixture_file:
+            json.dump(fixture, fixture_file)
+
+
+class RecordingSession:
+    def __init__(self, session, recorder: ApiRecorder):
+        """Wraps a boto3 session (real or stub); its clients report to the recorder."""
+        self.session = session
+        self.recorder = recorder
+
+    def client(self, service_name: str, config=None, **kwargs):
+        return self.recorder.attach(
+            self.session.client(service_name, config=config, **kwargs)
+        )
+
+
+class ReplaySession(StubSession):
+    def __init__(self, fixture_path: str, **kwargs):
+        """
+        Serves the responses of a fixture written by ApiRecorder.save().
+
+        A request that is not in the fixture raises a LookupError, e.g. because the crawl
+        settings differ from the recording.
+        """
+        super().__init__(**kwargs)
+        with gzip.open(fixture_path, "rt", encoding="utf-8") as fixture_file:
+            fixture = json.load(fixture_file)
+        if fixture.get("version") != FIXTURE_VERSION:
+            raise ValueError(f"Unsupported fixture version {fixture.get('version')}")
+        self.metadata = fixture.get("metadata", {})
+        self.responses = {
+            (entry["service"], entry["operation"], entry["request"]): entry[
+                "response"
+            ].encode("utf-8")
+            for entry in fixture["responses"]
+        }
+
+    def respond(self, service_name: str, operation_name: str, params: Dict) -> bytes:
+        key = (service_name, operation_name, _canonical_body(json.dumps(params)))
+        if key not in self.responses:
+            raise LookupError(f"Request not in fixture: {key}")
+        return self.responses[key]
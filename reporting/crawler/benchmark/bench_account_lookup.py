@@ -0,0 +1,75 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+Micro-benchmark for AccountWrapper: loading and id lookup cost by organization size.
+
+    python bench_account_lookup.py [--sizes 100 1000 10000 50000] [--lookups 100000]
+"""
+
+import argparse
+import random
+
+from bench_utils import best_of, offline_session, print_table
+from pull_data.account_wrapper import AccountWrapper
+
+
+def _synthetic_accounts(count: int):
+    return [
+        {
+            "Id": f"{100000000000 + i}",
+            "Arn": f"arn:aws:organizations::111111111111:account/o-bench/{100000000000 + i}",
+            "Email": f"account-{i}@example.com",
+            "Name": f"account-{i}",
+            "Status": "ACTIVE",
+            "JoinedMethod": "CREATED",
+            "JoinedTimestamp": "2024-01-01T00:00:00Z",
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AccountWrapper lookup benchmark")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000]
+    )
+    parser.add_argument("--lookups", type=int, default=100000)
+    args = parser.parse_args()
+
+    session = offline_session()
+    rows = []
+    for size in args.sizes:
+        accounts = _synthetic_accounts(size)
+        rng = random.Random(size)
+        lookup_ids = [rng.choice(accounts)["Id"] for _ in range(args.lookups)]
+
+        load_seconds = best_of(lambda: AccountWrapper(session, accounts=accounts), 3)
+        account_wrapper = AccountWrapper(session, accounts=accounts)
+
+        def _lookups():
+            for account_id in lookup_ids:
+                account_wrapper.get_account_record_by_id(account_id)
+
+        lookup_seconds = best_of(_lookups)
+        rows.append(
+            [
+                size,
+                f"{load_seconds * 1000:.1f}",
+                f"{lookup_seconds / args.lookups * 1e9:.0f}",
+            ]
+        )
+
+    print_table(["accounts", "load_ms", "lookup_ns"], rows)
+
+
+if __name__ == "__main__":
+    main()
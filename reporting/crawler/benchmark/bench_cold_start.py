@@ -0,0 +1,182 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+Measures the cold start of the crawler Lambda: the import of main and the first invocation,
+each in a fresh Python process, plus an -X importtime profile of the import.
+
+    python bench_cold_start.py [--runs 7] [--top 15] [--output-formats excel,csv]
+
+The first invocation crawls a small fake tenant (see fake_aws.py), so it includes creating the
+boto3 clients and loading their service models, but no network round trips.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from bench_utils import LAMBDA_FILES_PATH, print_table
+
+BENCHMARK_PATH = os.path.dirname(os.path.abspath(__file__))
+
+# Runs in the fresh process; prints the import and first invocation times in milliseconds
+COLD_START_SCRIPT = """
+import json, os, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+sys.path.insert(0, os.environ["BENCHMARK_PATH"])
+import globals
+from fake_aws import FakeSession, FakeTenant
+from local_s3 import LocalS3Client
+session = FakeSession(FakeTenant())
+globals.assume_remote_role = lambda **kwargs: session
+globals.set_s3_client(LocalS3Client())
+invoked = time.perf_counter()
+result = main.lambda_handler({}, None)
+finished = time.perf_counter()
+assert result["statusCode"] == 200, result
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_invocation_ms": (finished - invoked) * 1000,
+    "modules": len(sys.modules),
+    "xlsxwriter_loaded": "xlsxwriter" in sys.modules,
+}))
+"""
+
+
+def environment(output_formats: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(
+        {
+            "BENCHMARK_PATH": BENCHMARK_PATH,
+            "AWS_REGION": env.get("AWS_REGION", "us-east-1"),
+            "CRAWLER_ARN": "arn:aws:iam::000000000000:role/offline",
+            "REPORT_BUCKET_NAME": "local-report-bucket",
+            "OUTPUT_FORMATS": output_formats,
+            "SQLITE_EXPORT": "false",
+            "METRICS_NAMESPACE": "",
+            "LOG_LEVEL": "WARNING",
+            "API_RATE_LIMITS": json.dumps(
+                {"sso-admin": 1e6, "identitystore": 1e6, "organizations": 1e6}
+            ),
+        }
+    )
+    return env
+
+
+def run_cold_start(output_formats: str) -> Dict:
+    completed = subprocess.run(
+        [sys.executable, "-c", COLD_START_SCRIPT],
+        cwd=LAMBDA_FILES_PATH,
+        env=environment(output_formats),
+        check=True,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def import_profile(output_formats: str) -> List[Tuple[str, int, int]]:
+    """Returns (module, self us, cumulative us) of every module imported by main."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=LAMBDA_FILES_PATH,
+        env=environment(output_formats),
+        check=True,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    profile = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        profile.append((name.strip(), int(self_us), int(cumulative_us)))
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument(
+        "--output-formats",
+        nargs="+",
+        default=["excel,csv", "csv"],
+        help="OUTPUT_FORMATS values to compare",
+    )
+    args = parser.parse_args()
+
+    rows = []
+    for output_formats in args.output_formats:
+        runs = [run_cold_start(output_formats) for _ in range(args.runs)]
+        import_ms = [run["import_ms"] for run in runs]
+        invocation_ms = [run["first_invocation_ms"] for run in runs]
+        rows.append(
+            [
+                output_formats,
+                f"{statistics.median(import_ms):.0f}",
+                f"{min(import_ms):.0f}",
+                f"{statistics.median(invocation_ms):.0f}",
+                f"{statistics.median(map(sum, zip(import_ms, invocation_ms))):.0f}",
+                runs[0]["modules"],
+                runs[0]["xlsxwriter_loaded"],
+            ]
+        )
+    print_table(
+        [
+            "output_formats",
+            "import_ms",
+            "import_min_ms",
+            "first_invocation_ms",
+            "cold_start_ms",
+            "modules",
+            "xlsxwriter",
+        ],
+        rows,
+    )
+
+    profile = import_profile(args.output_formats[0])
+    packages: Dict[str, int] = {}
+    for name, self_us, _ in profile:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    print(
+        f"\nImport time by top-level package (OUTPUT_FORMATS={args.output_formats[0]})"
+    )
+    print_table(
+        ["package", "self_ms"],
+        [
+            [package, f"{self_us / 1000:.1f}"]
+            for package, self_us in sorted(
+                packages.items(), key=lambda item: item[1], reverse=True
+            )[: args.top]
+        ],
+    )
+    print(f"\nSlowest modules (self time)")
+    print_table(
+        ["module", "self_ms", "cumulative_ms"],
+        [
+            [name, f"{self_us / 1000:.1f}", f"{cumulative_us / 1000:.1f}"]
+            for name, self_us, cumulative_us in sorted(
+                profile, key=lambda entry: entry[1], reverse=True
+            )[: args.top]
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+
+Benchmark for report_diff.diff_assignments between two synthetic tenants that differ by a few percent.
+
+    python bench_diff.py [--users 1000 10000 40000]
+"""
+
+import argparse
+import copy
+import random
+
+from bench_transformer import synthetic_tenant
+from bench_utils import best_of, print_table
+from report_diff import diff_assignments, iter_assignment_keys
+from transformer import Transformer
+
+
+def _change_some_assignments(transformed, rng: random.Random):
+    changed = copy.deepcopy(transformed)
+    for account_info in changed["accounts"].values():
+        for permission_set_info in account_info["permission_sets"].values():
+            if permission_set_info["groups"] and rng.random() < 0.05:
+                permission_set_info["groups"].pop()
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assignment diff benchmark")
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 10000, 40000])
+    args = parser.parse_args()
+
+    rows = []
+    for user_count in args.users:
+        permission_sets, identitystore = synthetic_tenant(user_count)
+        previous = Transformer(permission_sets, identitystore).transform_assignments()
+        current = _change_some_assignments(previous, random.Random(user_count))
+        assignment_count = sum(1 for _ in iter_assignment_keys(current))
+        seconds = best_of(lambda: diff_assignments(previous, current), 3)
+        diff = diff_assignments(previous, current)
+        rows.append(
+            [
+                user_count,
+                assignment_count,
+                len(diff["removed"]),
+                f"{seconds * 1000:.1f}",
+                f"{seconds / assignment_count * 1e6:.2f}",
+            ]
+        )
+
+    print_table(
+        ["users", "assignments", "removed", "diff_ms", "us_per_assignment"], rows
+    )
+
+
+if __name__ == "__main__":
+    main()
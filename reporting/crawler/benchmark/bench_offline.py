@@ -0,0 +1,146 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+Runs main.lambda_handler end to end offline, against a recorded fixture or the seeded fake tenant,
+and reports wall time, API calls and peak memory.
+
+    python bench_offline.py --fixture fixtures/api/fake_tenant.json.gz --latency-ms 20 --throttle-rate 0.02
+    python bench_offline.py --fake-accounts 200 --fake-users 2000 --repeat 3 --tracemalloc
+
+The crawl settings (CRAWL_STRATEGY, GROUP_RESOLUTION, ...) come from the environment as in Lambda; a
+fixture only answers the requests of the settings it was recorded with (see its metadata).
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+import bench_utils
+from api_fixtures import ReplaySession
+from fake_aws import FakeSession, FakeTenant
+from local_s3 import LocalS3Client
+
+LOCAL_BUCKET_NAME = "local-report-bucket"
+
+
+def peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark")
+    parser.add_argument("--fixture", help="Fixture written by record_fixture.py")
+    parser.add_argument("--fake-accounts", type=int, default=30)
+    parser.add_argument("--fake-users", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="Also report the peak Python heap (slows the run down)",
+    )
+    parser.add_argument(
+        "--no-rate-limits",
+        action="store_true",
+        help="Lift the client-side API rate limits to measure the crawler code alone",
+    )
+    args = parser.parse_args()
+
+    # globals reads its settings at import time
+    os.environ["REPORT_BUCKET_NAME"] = LOCAL_BUCKET_NAME
+    os.environ["FORCE_FULL_CRAWL"] = "true"
+    os.environ["SKIP_UNCHANGED_REPORTS"] = "false"
+    os.environ.setdefault("METRICS_NAMESPACE", "")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("AWS_REGION", "us-east-1")
+    os.environ.setdefault("CRAWLER_ARN", "arn:aws:iam::000000000000:role/offline")
+    if args.no_rate_limits:
+        os.environ["API_RATE_LIMITS"] = json.dumps(
+            {"sso-admin": 1e6, "identitystore": 1e6, "organizations": 1e6}
+        )
+    import globals
+    import main as crawler_main
+    from pull_data.api_metrics import API_METRICS
+
+    stub_settings = dict(
+        latency_seconds=args.latency_ms / 1000,
+        throttle_rate=args.throttle_rate,
+        seed=args.seed,
+    )
+    if args.fixture:
+        session = ReplaySession(args.fixture, **stub_settings)
+        print(f"Replaying {len(session.responses)} responses of {args.fixture}")
+    else:
+        tenant = FakeTenant(
+            account_count=args.fake_accounts, user_count=args.fake_users
+        )
+        session = FakeSession(tenant, **stub_settings)
+    globals.assume_remote_role = lambda **kwargs: session
+    globals.set_s3_client(LocalS3Client())
+
+    rows = []
+    for run in range(1, args.repeat + 1):
+        if args.tracemalloc:
+            tracemalloc.start()
+        started = time.perf_counter()
+        result = crawler_main.lambda_handler({}, None)
+        seconds = time.perf_counter() - started
+        heap_peak = ""
+        if args.tracemalloc:
+            heap_peak = f"{tracemalloc.get_traced_memory()[1] / (1024 * 1024):.1f}"
+            tracemalloc.stop()
+        if result["statusCode"] != 200:
+            raise RuntimeError(f"Run {run} failed: {result}")
+
+        stats = API_METRICS.get_stats().values()
+        phases = API_METRICS.get_phases()
+        rows.append(
+            [
+                run,
+                f"{seconds:.2f}",
+                f"{phases.get('crawl', 0.0):.2f}",
+                f"{phases.get('render', 0.0):.2f}",
+                sum(operation["calls"] for operation in stats),
+                sum(operation["retries"] for operation in stats),
+                sum(operation["throttles"] for operation in stats),
+                f"{peak_rss_mib():.1f}",
+                heap_peak,
+            ]
+        )
+
+    bench_utils.print_table(
+        [
+            "run",
+            "seconds",
+            "crawl_s",
+            "render_s",
+            "api_calls",
+            "retries",
+            "throttles",
+            "peak_rss_mib",
+            "peak_heap_mib",
+        ],
+        rows,
+    )
+    print(json.dumps(API_METRICS.get_stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+Measures the rendering of the Excel report and the CSV files on synthetic tenants.
+Uploads are skipped (REPORT_BUCKET_NAME is unset); the Excel file stays in the temp directory.
+
+    python bench_rendering.py [--users 250 500 1000]
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+
+os.environ.pop("REPORT_BUCKET_NAME", None)
+
+from bench_transformer import synthetic_tenant  # noqa: E402
+from bench_utils import print_table  # noqa: E402
+from main import render_reports  # noqa: E402
+from transformer import Transformer  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report rendering benchmark")
+    parser.add_argument("--users", type=int, nargs="+", default=[250, 500, 1000])
+    args = parser.parse_args()
+
+    rows = []
+    for user_count in args.users:
+        permission_sets, identitystore = synthetic_tenant(user_count)
+        transformed = Transformer(
+            permission_sets, identitystore
+        ).transform_assignments()
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        render_reports(transformed)
+        seconds = time.perf_counter() - started
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        rows.append(
+            [user_count, f"{seconds * 1000:.0f}", f"{peak_bytes / (1024 * 1024):.1f}"]
+        )
+
+    print_table(["users", "render_ms", "peak_mib"], rows)
+
+
+if __name__ == "__main__":
+    main()
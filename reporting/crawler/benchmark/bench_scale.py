@@ -0,0 +1,231 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+Runs the full pipeline (crawl, Transformer, Excel/CSV/SQLite rendering) of main.lambda_handler on
+synthetic tenants of increasing size and reports time and memory per size.
+
+    python bench_scale.py [--sizes small medium large xl] [--output scale.json] [--plot scale.png]
+    python bench_scale.py --baseline scale.json
+
+Every size runs in its own process, so the peak RSS is that of one run. API rate limits are
+lifted and no latency is injected, so the times are those of the crawler code; the API time of
+a real tenant comes on top (see bench_offline.py --latency-ms).
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_utils import print_table
+from fake_aws import TENANT_SIZES
+
+PHASES = ["identity_fill", "crawl", "transform", "render"]
+
+
+def peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_size(size_name: str) -> dict:
+    """Crawls and renders one synthetic tenant in this process."""
+    output_path = tempfile.mkdtemp(prefix="bench-scale-")
+    # globals reads its settings at import time
+    os.environ["REPORT_BUCKET_NAME"] = "local-report-bucket"
+    os.environ["FORCE_FULL_CRAWL"] = "true"
+    os.environ["SKIP_UNCHANGED_REPORTS"] = "false"
+    os.environ["METRICS_NAMESPACE"] = ""
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("AWS_REGION", "us-east-1")
+    os.environ.setdefault("CRAWLER_ARN", "arn:aws:iam::000000000000:role/offline")
+    os.environ["API_RATE_LIMITS"] = json.dumps(
+        {"sso-admin": 1e6, "identitystore": 1e6, "organizations": 1e6}
+    )
+    import bench_utils  # noqa: F401  (puts lambda-files on sys.path)
+    import globals
+    import main as crawler_main
+    from fake_aws import FakeSession, SyntheticTenant
+    from local_s3 import LocalS3Client
+    from pull_data.api_metrics import API_METRICS
+
+    size = TENANT_SIZES[size_name]
+    tenant = SyntheticTenant(size)
+    tenant_rss = peak_rss_mib()
+    session = FakeSession(tenant)
+    globals.assume_remote_role = lambda **kwargs: session
+    # Written to disk, so the uploaded reports do not count towards the peak RSS
+    globals.set_s3_client(LocalS3Client(root_path=output_path))
+
+    started = time.perf_counter()
+    result = crawler_main.lambda_handler({}, None)
+    seconds = time.perf_counter() - started
+    if result["statusCode"] != 200:
+        raise RuntimeError(f"Run of {size_name} failed: {result}")
+    summary = json.loads(result["body"])
+    phases = API_METRICS.get_phases()
+    subprocess.run(["rm", "-rf", output_path], check=False)
+    return {
+        "size": size_name,
+        "tenant": size._asdict(),
+        "assignments": summary["counts"]["assignments"],
+        "api_calls": session.requests,
+        "seconds": round(seconds, 3),
+        "phases": {name: round(phases.get(name, 0.0), 3) for name in PHASES},
+        "tenant_rss_mib": round(tenant_rss, 1),
+        "peak_rss_mib": round(peak_rss_mib(), 1),
+    }
+
+
+def plot(results: list, path: str):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as pyplot
+
+    assignments = [result["assignments"] for result in results]
+    figure, (time_axis, memory_axis) = pyplot.subplots(1, 2, figsize=(12, 4.5))
+    for phase in PHASES:
+        time_axis.plot(
+            assignments,
+            [result["phases"][phase] for result in results],
+            marker="o",
+            label=phase,
+        )
+    time_axis.plot(
+        assignments,
+        [result["seconds"] for result in results],
+        marker="o",
+        linestyle="--",
+        label="total",
+    )
+    time_axis.set(xlabel="assignments", ylabel="seconds", title="Wall time")
+    memory_axis.plot(
+        assignments,
+        [result["peak_rss_mib"] for result in results],
+        marker="o",
+        label="peak RSS",
+    )
+    memory_axis.plot(
+        assignments,
+        [result["tenant_rss_mib"] for result in results],
+        marker="o",
+        linestyle="--",
+        label="after tenant generation",
+    )
+    memory_axis.set(xlabel="assignments", ylabel="MiB", title="Memory")
+    for axis in (time_axis, memory_axis):
+        axis.set_xscale("log")
+        axis.grid(True, alpha=0.3)
+        axis.legend()
+        for result in results:
+            axis.annotate(
+                result["size"],
+                (result["assignments"], 0),
+                xycoords=("data", "axes fraction"),
+                textcoords="offset points",
+                xytext=(0, 4),
+                ha="center",
+                fontsize=8,
+            )
+    figure.tight_layout()
+    figure.savefig(path, dpi=120)
+    print(f"Plot written to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline scale benchmark")
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        default=["small", "medium"],
+        choices=list(TENANT_SIZES),
+    )
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare")
+    parser.add_argument("--plot", help="Write a PNG of time and memory (matplotlib)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_size(args.worker)))
+        return
+    # matplotlib is optional and only checked for if a plot is requested
+    if args.plot and importlib.util.find_spec("matplotlib") is None:
+        parser.error("--plot needs matplotlib (pip install matplotlib)")
+
+    results = []
+    for size_name in args.sizes:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", size_name],
+            check=True,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = {result["size"]: result for result in json.load(baseline_file)}
+    rows = []
+    for result in results:
+        previous = baseline.get(result["size"])
+        rows.append(
+            [
+                result["size"],
+                result["tenant"]["accounts"],
+                result["tenant"]["users"],
+                result["assignments"],
+                result["api_calls"],
+                *[f"{result['phases'][phase]:.2f}" for phase in PHASES],
+                f"{result['seconds']:.2f}",
+                f"{result['peak_rss_mib']:.0f}",
+                f"{result['seconds'] / previous['seconds']:.2f}x" if previous else "",
+                (
+                    f"{result['peak_rss_mib'] / previous['peak_rss_mib']:.2f}x"
+                    if previous
+                    else ""
+                ),
+            ]
+        )
+    print_table(
+        [
+            "size",
+            "accounts",
+            "users",
+            "assignments",
+            "api_calls",
+            *[f"{phase}_s" for phase in PHASES],
+            "total_s",
+            "peak_rss_mib",
+            "vs_base_time",
+            "vs_base_rss",
+        ],
+        rows,
+    )
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+    if args.plot:
+        plot(results, args.plot)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+Regression benchmark for Transformer.transform_assignments on a synthetic tenant.
+
+    python bench_transformer.py [--users 1000 10000 40000]
+"""
+
+import argparse
+import random
+from typing import Dict, Tuple
+
+from bench_utils import best_of, print_table
+from transformer import Transformer
+
+
+class StaticIdentitystore:
+    """Serves user and group details from memory, in the shape IdentitystoreWrapper returns them."""
+
+    def __init__(self, users: Dict, groups: Dict):
+        self.cache = {"users": users, "groups": groups}
+
+    def get_user_info(self, user_id: str) -> Dict:
+        return self.cache["users"][user_id]
+
+    def resolve_groups(self, group_ids):
+        pass
+
+    def get_group_info(self, group_id: str) -> Dict:
+        return self.cache["groups"][group_id]
+
+
+def synthetic_tenant(
+    user_count: int, seed: int = 42
+) -> Tuple[Dict, StaticIdentitystore]:
+    """Builds crawl output with 1 group per 20 users, 1 account per 25 users and 30 permission sets."""
+    rng = random.Random(seed)
+    user_ids = [f"u-{i:08d}" for i in range(user_count)]
+    group_ids = [f"g-{i:08d}" for i in range(max(1, user_count // 20))]
+    account_ids = [f"{100000000000 + i}" for i in range(max(1, user_count // 25))]
+
+    users = {
+        user_id: {"user_name": f"{user_id}@example.com", "display_name": user_id}
+        for user_id in user_ids
+    }
+    groups = {
+        group_id: {
+            "display_name": group_id,
+            "assigned_users": rng.sample(user_ids, min(len(user_ids), 40)),
+            "external_ids": [],
+        }
+        for group_id in group_ids
+    }
+
+    permission_sets = {}
+    for ps_index in range(30):
+        ps_arn = f"arn:aws:sso:::permissionSet/ssoins-bench/ps-{ps_index:04d}"
+        permission_sets[ps_arn] = {
+            "permissionset_details": {"name": f"PermissionSet{ps_index}"},
+            "accounts": [
+                {
+                    "id": account_id,
+                    "name": f"account-{account_id}",
+                    "status": "ACTIVE",
+                    "assignments": {
+                        "users": rng.sample(user_ids, min(len(user_ids), 3)),
+                        "groups": rng.sample(group_ids, min(len(group_ids), 4)),
+                    },
+                }
+                for account_id in rng.sample(account_ids, max(1, len(account_ids) // 3))
+            ],
+        }
+    return permission_sets, StaticIdentitystore(users, groups)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transformer regression benchmark")
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 10000, 40000])
+    args = parser.parse_args()
+
+    rows = []
+    for user_count in args.users:
+        permission_sets, identitystore = synthetic_tenant(user_count)
+        pairs = sum(len(ps["accounts"]) for ps in permission_sets.values())
+        seconds = best_of(
+            lambda: Transformer(permission_sets, identitystore).transform_assignments(),
+            3,
+        )
+        rows.append(
+            [
+                user_count,
+                pairs,
+                f"{seconds * 1000:.1f}",
+                f"{seconds / pairs * 1e6:.2f}",
+            ]
+        )
+
+    print_table(["users", "pairs", "transform_ms", "us_per_pair"], rows)
+
+
+if __name__ == "__main__":
+    main()
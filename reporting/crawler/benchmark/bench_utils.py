@@ -0,0 +1,56 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import os
+import sys
+import time
+from typing import Callable, List, Sequence
+
+# Make the Lambda sources importable the same way the Lambda runtime does
+LAMBDA_FILES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "lambda-files"
+)
+if LAMBDA_FILES_PATH not in sys.path:
+    sys.path.insert(0, LAMBDA_FILES_PATH)
+
+
+def offline_session():
+    """Returns a boto3 session with dummy credentials; creating clients does not touch the network."""
+    import boto3
+
+    return boto3.Session(
+        aws_access_key_id="benchmark",
+        aws_secret_access_key="benchmark",
+        region_name="us-east-1",
+    )
+
+
+def best_of(function: Callable[[], None], repeat: int = 5) -> float:
+    """Returns the fastest wall time in seconds out of `repeat` runs."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def print_table(headers: Sequence[str], rows: List[Sequence]):
+    widths = [
+        max(len(str(value)) for value in [header] + [row[i] for row in rows])
+        for i, header in enumerate(headers)
+    ]
+    print("  ".join(str(h).rjust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(str(v).rjust(w) for v, w in zip(row, widths)))
@@ -0,0 +1,386 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+Offline stand-in for the organizations, sso-admin and identitystore APIs the crawler calls.
+
+Clients are real boto3 clients (so paginators, serialization, retries and the rate limiter hooks
+run as usual); only the HTTP request is answered by a FakeTenant, see api_fixtures.StubSession.
+"""
+
+import json
+import random
+import threading
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from api_fixtures import ServiceError, StubSession
+
+INSTANCE_ARN = "arn:aws:sso:::instance/ssoins-0000000000000000"
+FUNCTION_ARN = "arn:aws:lambda:us-east-1:000000000000:function:offline-crawler"
+IDENTITY_STORE_ID = "d-0000000000"
+
+# Items per page when the caller passes no MaxResults, as the services return them
+# (the wrappers never pass MaxResults). Larger MaxResults values are capped to these.
+SERVICE_PAGE_SIZES = {
+    "ListAccounts": 20,
+    "ListInstances": 100,
+    "ListPermissionSets": 100,
+    "ListAccountsForProvisionedPermissionSet": 100,
+    "ListAccountAssignments": 100,
+    "ListAccountAssignmentsForPrincipal": 100,
+    "ListUsers": 100,
+    "ListGroups": 100,
+    "ListGroupMemberships": 100,
+}
+
+
+class TenantSize(NamedTuple):
+    accounts: int
+    permission_sets: int
+    users: int
+    groups: int
+
+
+TENANT_SIZES = {
+    "small": TenantSize(accounts=100, permission_sets=20, users=1000, groups=100),
+    "medium": TenantSize(accounts=500, permission_sets=60, users=10000, groups=500),
+    "large": TenantSize(accounts=2000, permission_sets=150, users=40000, groups=2000),
+    "xl": TenantSize(accounts=5000, permission_sets=300, users=100000, groups=5000),
+}
+
+
+def _account(index: int) -> Dict:
+    account_id = f"{100000000000 + index}"
+    return {
+        "Id": account_id,
+        "Arn": f"arn:aws:organizations::111111111111:account/o-fake/{account_id}",
+        "Email": f"account-{index}@example.com",
+        "Name": f"account-{index}",
+        "Status": "ACTIVE",
+        "JoinedMethod": "CREATED",
+        "JoinedTimestamp": "2024-01-01T00:00:00Z",
+    }
+
+
+def _permission_set_arn(index: int) -> str:
+    return f"arn:aws:sso:::permissionSet/ssoins-0000000000000000/ps-{index:016x}"
+
+
+class FakeTenant:
+    def __init__(
+        self,
+        account_count: int = 30,
+        permission_set_count: int = 5,
+        user_count: int = 50,
+        group_count: int = 10,
+        members_per_group: int = 5,
+        page_size: Optional[int] = 3,
+        seed: int = 1,
+        failing_pairs: Optional[Set[Tuple[str, str]]] = None,
+    ):
+        """
+        Seeded IAM Identity Center tenant. Every provisioned (permission set, account) pair gets
+        two direct user assignments and one group assignment.
+
+        Args:
+            page_size (int): Items per page of every list operation, small values exercise pagination.
+                None serves the page sizes of the real services (SERVICE_PAGE_SIZES).
+            failing_pairs (Set[Tuple[str, str]]): (permission set ARN, account id) pairs whose
+                ListAccountAssignments call fails.
+        """
+        self.page_size = page_size
+        self.account_count = account_count
+        self.permission_set_count = permission_set_count
+        self.user_count = user_count
+        self.group_count = group_count
+        self.members_per_group = members_per_group
+        self.accounts: List[Dict] = []
+        self.permission_set_arns: List[str] = []
+        self.provisioned_accounts: Dict[str, List[str]] = {}
+        self.user_ids: List[str] = []
+        self.group_ids: List[str] = []
+        self.members: Dict[str, List[str]] = {}
+        self.assignments: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        self._generate(random.Random(seed))
+        self._principal_ids = set(self.user_ids) | set(self.group_ids)
+        self._permission_set_index = {
+            arn: index for index, arn in enumerate(self.permission_set_arns)
+        }
+        # Built on first use, the listings are served from these instead of per page
+        self._principal_assignments: Optional[Dict[Tuple[str, str], List[Dict]]] = None
+        self._users: Optional[List[Dict]] = None
+        self._groups: Optional[List[Dict]] = None
+        self.failing_pairs = failing_pairs or set()
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _generate(self, rng: random.Random):
+        self.accounts = [_account(i) for i in range(self.account_count)]
+        account_ids = [account["Id"] for account in self.accounts]
+        self.permission_set_arns = [
+            _permission_set_arn(i) for i in range(self.permission_set_count)
+        ]
+        self.provisioned_accounts = {
+            arn: rng.sample(account_ids, k=max(1, self.account_count // 2))
+            for arn in self.permission_set_arns
+        }
+        self.user_ids = [f"u-{i:08d}" for i in range(self.user_count)]
+        self.group_ids = [f"g-{i:08d}" for i in range(self.group_count)]
+        self.members = {
+            group_id: rng.sample(
+                self.user_ids, k=min(self.members_per_group, self.user_count)
+            )
+            for group_id in self.group_ids
+        }
+        self.assignments = {}
+        for arn in self.permission_set_arns:
+            for account_id in self.provisioned_accounts[arn]:
+                self.assignments[(arn, account_id)] = [
+                    ("USER", user_id) for user_id in rng.sample(self.user_ids, 2)
+                ] + [
+                    (
+                        "GROUP",
+                        rng.choice(self.group_ids[: max(1, self.group_count // 2)]),
+                    )
+                ]
+
+    def _page(self, operation_name: str, items: List, key: str, params: Dict) -> Dict:
+        page_size = self.page_size or SERVICE_PAGE_SIZES[operation_name]
+        if params.get("MaxResults"):
+            page_size = min(page_size, int(params["MaxResults"]))
+        start = int(params.get("NextToken", 0))
+        page = {key: items[start : start + page_size]}
+        if start + page_size < len(items):
+            page["NextToken"] = str(start + page_size)
+        return page
+
+    # ¦ handle
+    def handle(self, operation_name: str, params: Dict) -> Dict:
+        with self._lock:
+            self.calls[operation_name] = self.calls.get(operation_name, 0) + 1
+
+        if operation_name == "ListAccounts":
+            return self._page(operation_name, self.accounts, "Accounts", params)
+        if operation_name == "ListInstances":
+            return {
+                "Instances": [
+                    {"InstanceArn": INSTANCE_ARN, "IdentityStoreId": IDENTITY_STORE_ID}
+                ]
+            }
+        if operation_name == "ListPermissionSets":
+            return self._page(
+                operation_name, self.permission_set_arns, "PermissionSets", params
+            )
+        if operation_name == "DescribePermissionSet":
+            arn = params["PermissionSetArn"]
+            return {
+                "PermissionSet": {
+                    "Name": f"PermissionSet{self._permission_set_index[arn]}",
+                    "PermissionSetArn": arn,
+                    "SessionDuration": "PT1H",
+                }
+            }
+        if operation_name == "ListAccountsForProvisionedPermissionSet":
+            return self._page(
+                operation_name,
+                self.provisioned_accounts[params["PermissionSetArn"]],
+                "AccountIds",
+                params,
+            )
+        if operation_name == "ListAccountAssignments":
+            pair = (params["PermissionSetArn"], params["AccountId"])
+            if pair in self.failing_pairs:
+                raise RuntimeError(f"Simulated failure for {pair}")
+            items = [
+                {
+                    "AccountId": pair[1],
+                    "PermissionSetArn": pair[0],
+                    "PrincipalType": principal_type,
+                    "PrincipalId": principal_id,
+                }
+                for principal_type, principal_id in self.assignments[pair]
+            ]
+            return self._page(operation_name, items, "AccountAssignments", params)
+        if operation_name == "ListAccountAssignmentsForPrincipal":
+            principal = (params["PrincipalType"], params["PrincipalId"])
+            if principal[1] not in self._principal_ids:
+                raise ServiceError(
+                    "ResourceNotFoundException", f"{principal[1]} does not exist"
+                )
+            items = self._get_principal_assignments().get(principal, [])
+            return self._page(operation_name, items, "AccountAssignments", params)
+        if operation_name == "ListUsers":
+            if self._users is None:
+                self._users = [self._user(user_id) for user_id in self.user_ids]
+            return self._page(operation_name, self._users, "Users", params)
+        if operation_name == "DescribeUser":
+            return self._user(params["UserId"])
+        if operation_name == "ListGroups":
+            if self._groups is None:
+                self._groups = [self._group(group_id) for group_id in self.group_ids]
+            return self._page(operation_name, self._groups, "Groups", params)
+        if operation_name == "DescribeGroup":
+            return self._group(params["GroupId"])
+        if operation_name == "ListGroupMemberships":
+            memberships = [
+                {"MemberId": {"UserId": user_id}}
+                for user_id in self.members[params["GroupId"]]
+            ]
+            return self._page(operation_name, memberships, "GroupMemberships", params)
+        raise NotImplementedError(operation_name)
+
+    def _get_principal_assignments(self) -> Dict[Tuple[str, str], List[Dict]]:
+        with self._lock:
+            if self._principal_assignments is None:
+                index: Dict[Tuple[str, str], List[Dict]] = {}
+                for (arn, account_id), principals in self.assignments.items():
+                    for principal_type, principal_id in principals:
+                        index.setdefault((principal_type, principal_id), []).append(
+                            {
+                                "AccountId": account_id,
+                                "PermissionSetArn": arn,
+                                "PrincipalType": principal_type,
+                                "PrincipalId": principal_id,
+                            }
+                        )
+                # Like the real API, a user query also returns the entries of its groups,
+                # with the group as principal
+                for group_id, user_ids in self.members.items():
+                    for user_id in user_ids:
+                        index.setdefault(("USER", user_id), []).extend(
+                            index.get(("GROUP", group_id), [])
+                        )
+                self._principal_assignments = index
+            return self._principal_assignments
+
+    # ¦ delete_user
+    def delete_user(self, user_id: str):
+        """Removes the user with its memberships and assignments, as DeleteUser does."""
+        self.user_ids.remove(user_id)
+        self._principal_ids.discard(user_id)
+        for user_ids in self.members.values():
+            if user_id in user_ids:
+                user_ids.remove(user_id)
+        for principals in self.assignments.values():
+            if ("USER", user_id) in principals:
+                principals.remove(("USER", user_id))
+        self._principal_assignments = None
+        self._users = None
+
+    def _user(self, user_id: str) -> Dict:
+        return {
+            "UserId": user_id,
+            "UserName": f"{user_id}@example.com",
+            "DisplayName": user_id.upper(),
+        }
+
+    def _group(self, group_id: str) -> Dict:
+        return {
+            "GroupId": group_id,
+            "DisplayName": group_id.upper(),
+            "ExternalIds": [
+                {"Issuer": "https://scim.example.com", "Id": f"x-{group_id}"}
+            ],
+        }
+
+
+class SyntheticTenant(FakeTenant):
+    def __init__(self, size: TenantSize, seed: int = 1, **kwargs):
+        """
+        Large seeded tenant with the skew of real organizations and the page sizes of the
+        real services, e.g. SyntheticTenant(TENANT_SIZES["xl"]).
+
+        - Permission set k is provisioned to about accounts / (k + 1) ** 0.8 accounts, so a few
+          baseline permission sets reach every account and most reach a few.
+        - Group k has about 30 % of the users / (k + 1) members, an "all employees" group
+          followed by a long tail of small teams.
+        - A (permission set, account) pair is assigned to one or two random groups, and in 15 %
+          of the pairs also to one user directly.
+
+        Keyword arguments (page_size, failing_pairs) are passed to FakeTenant.
+        """
+        kwargs.setdefault("page_size", None)
+        super().__init__(
+            account_count=size.accounts,
+            permission_set_count=size.permission_sets,
+            user_count=size.users,
+            group_count=size.groups,
+            seed=seed,
+            **kwargs,
+        )
+
+    def _generate(self, rng: random.Random):
+        self.accounts = [_account(i) for i in range(self.account_count)]
+        account_ids = [account["Id"] for account in self.accounts]
+        self.permission_set_arns = [
+            _permission_set_arn(i) for i in range(self.permission_set_count)
+        ]
+        self.provisioned_accounts = {
+            arn: rng.sample(
+                account_ids, k=max(1, int(self.account_count / (rank + 1) ** 0.8))
+            )
+            for rank, arn in enumerate(self.permission_set_arns)
+        }
+        self.user_ids = [f"u-{i:08d}" for i in range(self.user_count)]
+        self.group_ids = [f"g-{i:08d}" for i in range(self.group_count)]
+        self.members = {
+            group_id: rng.sample(
+                self.user_ids, k=max(1, int(0.3 * self.user_count / (rank + 1)))
+            )
+            for rank, group_id in enumerate(self.group_ids)
+        }
+        self.assignments = {}
+        for arn in self.permission_set_arns:
+            for account_id in self.provisioned_accounts[arn]:
+                group_ids = rng.choices(
+                    self.group_ids, k=2 if rng.random() < 0.3 else 1
+                )
+                principals = [
+                    ("GROUP", group_id) for group_id in dict.fromkeys(group_ids)
+                ]
+                if rng.random() < 0.15:
+                    principals.append(("USER", rng.choice(self.user_ids)))
+                self.assignments[(arn, account_id)] = principals
+
+
+class FakeSession(StubSession):
+    def __init__(self, tenant: FakeTenant, **kwargs):
+        """
+        boto3.Session look-alike whose clients are answered by the tenant.
+
+        Keyword arguments (latency_seconds, throttle_rate, seed) are passed to StubSession.
+        """
+        super().__init__(**kwargs)
+        self.tenant = tenant
+
+    def respond(self, service_name: str, operation_name: str, params: Dict) -> Dict:
+        return self.tenant.handle(operation_name, params)
+
+
+class FakeContext:
+    def __init__(self, checks_before_deadline: int = 1_000_000):
+        """Lambda context whose remaining time drops to zero after the given number of checks."""
+        self.invoked_function_arn = FUNCTION_ARN
+        self.checks_left = checks_before_deadline
+
+    def get_remaining_time_in_millis(self) -> int:
+        self.checks_left -= 1
+        return 900_000 if self.checks_left >= 0 else 0
+
+
+class FakeLambdaClient:
+    def __init__(self):
+        """Stand-in for the Lambda client that keeps the asynchronous invocations."""
+        self.invocations: List[Dict] = []
+
+    def invoke(self, FunctionName: str, InvocationType: str, Payload: bytes):
+        self.invocations.append(json.loads(Payload))
+        return {"StatusCode": 202}
@@ -0,0 +1,106 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import hashlib
+import io
+import os
+import threading
+from typing import Dict, Optional
+
+from botocore.exceptions import ClientError
+
+
+class LocalS3Client:
+    def __init__(self, root_path: Optional[str] = None):
+        """
+        Stand-in for the S3 client calls the crawler makes, including conditional puts
+        (IfMatch, IfNoneMatch) and ETags. Objects are kept in memory,
+        or written below root_path/<bucket>/<key> if a root path is given.
+        """
+        self.root_path = root_path
+        self.objects: Dict[tuple, bytes] = {}
+        # Serializes conditional puts like S3 does
+        self._lock = threading.Lock()
+
+    def _path(self, bucket: str, key: str) -> str:
+        return os.path.join(self.root_path, bucket, *key.split("/"))
+
+    def _read_body(self, body) -> bytes:
+        if hasattr(body, "read"):
+            body = body.read()
+        return body.encode("utf-8") if isinstance(body, str) else bytes(body)
+
+    def _etag(self, content: bytes) -> str:
+        return f'"{hashlib.md5(content).hexdigest()}"'
+
+    def _read_object(self, bucket: str, key: str) -> Optional[bytes]:
+        if self.root_path:
+            if not os.path.exists(self._path(bucket, key)):
+                return None
+            with open(self._path(bucket, key), "rb") as file:
+                return file.read()
+        return self.objects.get((bucket, key))
+
+    def put_object(
+        self,
+        Bucket: str,
+        Key: str,
+        Body,
+        IfMatch: Optional[str] = None,
+        IfNoneMatch: Optional[str] = None,
+        **kwargs,
+    ) -> Dict:
+        content = self._read_body(Body)
+        with self._lock:
+            if IfMatch is not None or IfNoneMatch is not None:
+                current = self._read_object(Bucket, Key)
+                if (IfNoneMatch == "*" and current is not None) or (
+                    IfMatch is not None
+                    and (current is None or self._etag(current) != IfMatch)
+                ):
+                    raise ClientError(
+                        {"Error": {"Code": "PreconditionFailed"}}, "PutObject"
+                    )
+            if self.root_path:
+                os.makedirs(os.path.dirname(self._path(Bucket, Key)), exist_ok=True)
+                with open(self._path(Bucket, Key), "wb") as file:
+                    file.write(content)
+            else:
+                self.objects[(Bucket, Key)] = content
+        return {"ETag": self._etag(content)}
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str, **kwargs):
+        with open(Filename, "rb") as file:
+            self.put_object(Bucket=Bucket, Key=Key, Body=file)
+
+    def upload_fileobj(self, Fileobj, Bucket: str, Key: str, **kwargs):
+        self.put_object(Bucket=Bucket, Key=Key, Body=Fileobj)
+
+    def get_object(self, Bucket: str, Key: str, **kwargs) -> Dict:
+        content = self._read_object(Bucket, Key)
+        if content is None:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        return {
+            "Body": io.BytesIO(content),
+            "ContentLength": len(content),
+            "ETag": self._etag(content),
+        }
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs) -> Dict:
+        if self.root_path:
+            if os.path.exists(self._path(Bucket, Key)):
+                os.remove(self._path(Bucket, Key))
+        else:
+            self.objects.pop((Bucket, Key), None)
+        return {}
@@ -0,0 +1,113 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+Runs main.lambda_handler once per crawl strategy and group resolution and records every API response
+the wrappers receive into a compressed fixture for bench_offline.py.
+
+Against a live Identity Center instance (AWS credentials that may assume CRAWLER_ARN):
+    CRAWLER_ARN=arn:aws:iam::111111111111:role/idc-crawler python record_fixture.py --output tenant.json.gz
+
+From the seeded fake tenant:
+    python record_fixture.py --fake --output fixtures/api/fake_tenant.json.gz
+
+Reports are rendered into a local S3 stand-in; nothing is written to the report bucket.
+"""
+
+import argparse
+import json
+import os
+
+import bench_utils  # noqa: F401  (puts lambda-files on sys.path)
+from api_fixtures import ApiRecorder, RecordingSession
+from fake_aws import FakeSession, FakeTenant
+from local_s3 import LocalS3Client
+
+LOCAL_BUCKET_NAME = "local-report-bucket"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record API fixtures")
+    parser.add_argument("--output", required=True, help="Fixture path (.json.gz)")
+    parser.add_argument(
+        "--strategies",
+        nargs="+",
+        default=["per_pair", "per_principal"],
+        choices=["per_pair", "per_principal"],
+    )
+    parser.add_argument(
+        "--group-resolutions",
+        nargs="+",
+        default=["lazy", "prefetch"],
+        choices=["lazy", "prefetch"],
+    )
+    parser.add_argument(
+        "--fake", action="store_true", help="Record the seeded fake tenant"
+    )
+    parser.add_argument("--fake-accounts", type=int, default=30)
+    parser.add_argument("--fake-users", type=int, default=50)
+    args = parser.parse_args()
+
+    # globals reads its settings at import time
+    os.environ["REPORT_BUCKET_NAME"] = LOCAL_BUCKET_NAME
+    os.environ["SKIP_UNCHANGED_REPORTS"] = "false"
+    os.environ.setdefault("METRICS_NAMESPACE", "")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("AWS_REGION", "us-east-1")
+    if args.fake:
+        os.environ["CRAWLER_ARN"] = "arn:aws:iam::000000000000:role/offline"
+        os.environ.setdefault(
+            "API_RATE_LIMITS",
+            json.dumps({"sso-admin": 1e6, "identitystore": 1e6, "organizations": 1e6}),
+        )
+    elif not os.environ.get("CRAWLER_ARN"):
+        parser.error("CRAWLER_ARN must be set, or use --fake")
+    import globals
+    import main as crawler_main
+
+    recorder = ApiRecorder()
+    if args.fake:
+        tenant = FakeTenant(
+            account_count=args.fake_accounts, user_count=args.fake_users
+        )
+        globals.assume_remote_role = lambda **kwargs: RecordingSession(
+            FakeSession(tenant), recorder
+        )
+    else:
+        assume_remote_role = globals.assume_remote_role
+        globals.assume_remote_role = lambda **kwargs: RecordingSession(
+            assume_remote_role(**kwargs), recorder
+        )
+    globals.set_s3_client(LocalS3Client())
+
+    for strategy in args.strategies:
+        for group_resolution in args.group_resolutions:
+            globals.CRAWL_STRATEGY = strategy
+            globals.GROUP_RESOLUTION = group_resolution
+            result = crawler_main.lambda_handler({"full_crawl": True}, None)
+            print(
+                f"{strategy}/{group_resolution}: status {result['statusCode']}, "
+                f"{len(recorder.responses)} distinct responses recorded"
+            )
+
+    recorder.save(
+        args.output,
+        metadata={
+            "crawl_strategies": args.strategies,
+            "group_resolutions": args.group_resolutions,
+            "source": "fake" if args.fake else "live",
+        },
+    )
+    print(f"Fixture written to {args.output} ({os.path.getsize(args.output)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+Replays recorded EventBridge/CloudTrail events through main.event_handler against a local S3 stand-in.
+
+    python replay_events.py --snapshot fixtures/events/transformed.json \
+        fixtures/events/create_account_assignment.json \
+        fixtures/events/create_group_membership.json \
+        fixtures/events/delete_account_assignment.json \
+        --expected fixtures/events/expected_transformed.json
+
+Exits with 1 if an event fails or the resulting snapshot differs from --expected.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import bench_utils  # noqa: F401  (puts lambda-files on sys.path)
+from local_s3 import LocalS3Client
+
+LOCAL_BUCKET_NAME = "local-report-bucket"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay events offline")
+    parser.add_argument("events", nargs="+", help="Event JSON files, applied in order")
+    parser.add_argument(
+        "--snapshot", help="Transformed JSON to seed as the last stored snapshot"
+    )
+    parser.add_argument(
+        "--expected", help="Transformed JSON the snapshot must equal after the events"
+    )
+    parser.add_argument(
+        "--s3-dir", help="Keep the local S3 objects in this folder instead of memory"
+    )
+    args = parser.parse_args()
+
+    # globals reads its settings at import time
+    os.environ["REPORT_BUCKET_NAME"] = LOCAL_BUCKET_NAME
+    os.environ.setdefault("AWS_REGION", "us-east-1")
+    # No EMF record on stdout
+    os.environ.setdefault("METRICS_NAMESPACE", "")
+    os.environ.setdefault("CRAWLER_ARN", "arn:aws:iam::000000000000:role/offline")
+    import globals
+    import main as crawler_main
+    from snapshot_store import SnapshotStore
+
+    s3_client = LocalS3Client(args.s3_dir)
+    globals.set_s3_client(s3_client)
+    snapshot_store = SnapshotStore()
+    if args.snapshot:
+        with open(args.snapshot) as snapshot_file:
+            snapshot_store.save_transformed(json.load(snapshot_file))
+
+    failed_events = []
+    for event_path in args.events:
+        with open(event_path) as event_file:
+            result = crawler_main.event_handler(json.load(event_file), None)
+        print(f"{os.path.basename(event_path)}: {result}")
+        if result["statusCode"] != 200:
+            failed_events.append(event_path)
+
+    transformed = snapshot_store.load_transformed()
+    print(json.dumps(transformed, indent=2))
+    if failed_events:
+        print(f"failed events: {failed_events}")
+        sys.exit(1)
+    if args.expected:
+        with open(args.expected) as expected_file:
+            identical = transformed == json.load(expected_file)
+        print(f"identical to {os.path.basename(args.expected)}: {identical}")
+        if not identical:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+Runs main.lambda_handler against a fake tenant with a Lambda deadline that hits after a few units
+of work, follows the self re-invocations and compares the result with an uninterrupted crawl.
+
+    python simulate_checkpoint.py --strategy per_pair --checks-per-invocation 7
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+from typing import Dict
+
+import bench_utils  # noqa: F401  (puts lambda-files on sys.path)
+from fake_aws import FakeContext, FakeLambdaClient, FakeSession, FakeTenant
+from local_s3 import LocalS3Client
+
+LOCAL_BUCKET_NAME = "local-report-bucket"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate checkpoint/resume offline")
+    parser.add_argument(
+        "--strategy", default="per_pair", choices=["per_pair", "per_principal"]
+    )
+    parser.add_argument(
+        "--checks-per-invocation",
+        type=int,
+        default=7,
+        help="Units of work each invocation gets before its deadline",
+    )
+    parser.add_argument("--accounts", type=int, default=30)
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+
+    # globals reads its settings at import time
+    os.environ["REPORT_BUCKET_NAME"] = LOCAL_BUCKET_NAME
+    os.environ["CRAWL_STRATEGY"] = args.strategy
+    os.environ["FORCE_FULL_CRAWL"] = "true"
+    os.environ["SKIP_UNCHANGED_REPORTS"] = "false"
+    os.environ["CHECKPOINT_MAX_RESUMES"] = "1000"
+    os.environ.setdefault("CRAWLER_MAX_WORKERS", "1")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("AWS_REGION", "us-east-1")
+    # No EMF record on stdout
+    os.environ.setdefault("METRICS_NAMESPACE", "")
+    os.environ.setdefault("CRAWLER_ARN", "arn:aws:iam::000000000000:role/offline")
+    os.environ.setdefault(
+        "API_RATE_LIMITS",
+        json.dumps({"sso-admin": 1e6, "identitystore": 1e6, "organizations": 1e6}),
+    )
+    import globals
+    import main as crawler_main
+    from snapshot_store import SnapshotStore
+
+    tenant = FakeTenant(account_count=args.accounts, user_count=args.users)
+    globals.assume_remote_role = lambda **kwargs: FakeSession(tenant)
+    s3_client = LocalS3Client()
+    globals.set_s3_client(s3_client)
+    lambda_client = FakeLambdaClient()
+    globals.set_lambda_client(lambda_client)
+    snapshot_store = SnapshotStore()
+
+    crawler_main.lambda_handler({}, None)
+    expected = snapshot_store.load_transformed()
+
+    event: Dict = {}
+    invocation_count = 0
+    while True:
+        invocation_count += 1
+        result = crawler_main.lambda_handler(
+            event, FakeContext(args.checks_per_invocation)
+        )
+        print(f"invocation {invocation_count}: {result['statusCode']}")
+        if result["statusCode"] != 202:
+            break
+        print(f"  {result['body']}")
+        event = lambda_client.invocations[-1]
+
+    resumed = snapshot_store.load_transformed()
+    checkpoint_key = snapshot_store.get_key("crawl_checkpoint.json.gz")
+    raw_crawl = json.loads(
+        gzip.decompress(
+            s3_client.objects[
+                (LOCAL_BUCKET_NAME, snapshot_store.get_key("raw_crawl.json.gz"))
+            ]
+        )
+    )
+    checks = {
+        "resumed at least once": invocation_count > 1,
+        "identical to uninterrupted crawl": resumed == expected,
+        "checkpoint removed": (LOCAL_BUCKET_NAME, checkpoint_key)
+        not in s3_client.objects,
+        "raw crawl complete": len(raw_crawl["permission_sets"])
+        == tenant.permission_set_count,
+    }
+    print(f"invocations: {invocation_count}")
+    for name, passed in checks.items():
+        print(f"{name}: {passed}")
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
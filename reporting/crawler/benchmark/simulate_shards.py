@@ -0,0 +1,92 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+Runs main.lambda_handler against a fake tenant once unsharded and once per shard count, with the
+shards dispatched in-process, and compares wall time, API calls and the transformed result.
+Exits with 1 if a sharded crawl differs from the unsharded one.
+
+    python simulate_shards.py --shards 2 4 8 --latency-ms 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import bench_utils  # noqa: F401  (puts lambda-files on sys.path)
+from fake_aws import FakeSession, FakeTenant
+from local_s3 import LocalS3Client
+
+LOCAL_BUCKET_NAME = "local-report-bucket"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate sharded crawls offline")
+    parser.add_argument("--shards", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--accounts", type=int, default=40)
+    parser.add_argument("--permission-sets", type=int, default=12)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    # globals reads its settings at import time
+    os.environ["REPORT_BUCKET_NAME"] = LOCAL_BUCKET_NAME
+    os.environ["CRAWL_STRATEGY"] = "per_pair"
+    os.environ["FORCE_FULL_CRAWL"] = "true"
+    os.environ["SKIP_UNCHANGED_REPORTS"] = "false"
+    os.environ.setdefault("CRAWLER_MAX_WORKERS", "2")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("AWS_REGION", "us-east-1")
+    # No EMF record on stdout
+    os.environ.setdefault("METRICS_NAMESPACE", "")
+    os.environ.setdefault("CRAWLER_ARN", "arn:aws:iam::000000000000:role/offline")
+    os.environ.setdefault(
+        "API_RATE_LIMITS",
+        json.dumps({"sso-admin": 1e6, "identitystore": 1e6, "organizations": 1e6}),
+    )
+    import globals
+    import main as crawler_main
+    from snapshot_store import SnapshotStore
+
+    tenant = FakeTenant(
+        account_count=args.accounts, permission_set_count=args.permission_sets
+    )
+    globals.assume_remote_role = lambda **kwargs: FakeSession(
+        tenant, latency_seconds=args.latency_ms / 1000
+    )
+    globals.set_s3_client(LocalS3Client())
+    snapshot_store = SnapshotStore()
+
+    print(f"{'shards':>6} {'seconds':>8} {'api calls':>9} identical")
+    expected = None
+    mismatches = []
+    for shard_count in [1] + args.shards:
+        tenant.calls.clear()
+        started = time.perf_counter()
+        crawler_main.lambda_handler({"shard_count": shard_count}, None)
+        seconds = time.perf_counter() - started
+        transformed = snapshot_store.load_transformed()
+        if expected is None:
+            expected = transformed
+        print(
+            f"{shard_count:>6} {seconds:>8.2f} {sum(tenant.calls.values()):>9} "
+            f"{transformed == expected}"
+        )
+        if transformed != expected:
+            mismatches.append(shard_count)
+    if mismatches:
+        print(f"results differ from the unsharded crawl with {mismatches} shards")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import json
+import time
+from concurrent.futures import ALL_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+import globals
+from snapshot_store import SnapshotStore
+
+SHARD_FOLDER_NAME = "shards"
+# Interval of the checks for finished shards and for the coordinator deadline
+SHARD_POLL_SECONDS = 5
+# A shard result still missing this long after the dispatch belongs to a worker that died;
+# workers end at the 15 minute Lambda limit at the latest
+SHARD_MAX_WAIT_SECONDS = 960
+
+
+def partition_permission_sets(permission_sets: Dict, shard_count: int) -> List[Dict]:
+    """
+    Splits the permission sets into at most shard_count shards of similar crawl cost.
+
+    The cost of a permission set is its number of provisioned accounts, i.e. the number of
+    ListAccountAssignments pairs. The largest ones are placed first, each into the currently
+    cheapest shard. Empty shards are dropped.
+    """
+    shards: List[Dict] = [{} for _ in range(max(1, shard_count))]
+    costs = [0] * len(shards)
+    for permission_set_arn, permission_set_info in sorted(
+        permission_sets.items(),
+        key=lambda item: len(item[1].get("accounts", [])),
+        reverse=True,
+    ):
+        index = costs.index(min(costs))
+        shards[index][permission_set_arn] = permission_set_info
+        costs[index] += max(1, len(permission_set_info.get("accounts", [])))
+    return [shard for shard in shards if shard]
+
+
+class InProcessDispatcher:
+    def __init__(self, handler: Callable):
+        """
+        Runs the shard events on a thread pool of this process, e.g. for local runs and tests.
+
+        Args:
+            handler (Callable): Called as handler(event, None), normally main.lambda_handler.
+        """
+        self.handler = handler
+
+    # ¦ dispatch
+    def dispatch(
+        self, events: List[Dict], should_stop: Optional[Callable[[], bool]] = None
+    ) -> List[Optional[Dict]]:
+        """Runs all shards to the end; local runs have no deadline, so should_stop is ignored."""
+        with ThreadPoolExecutor(
+            max_workers=len(events) or 1, thread_name_prefix="shard"
+        ) as executor:
+            return list(executor.map(lambda event: self.handler(event, None), events))
+
+
+class LambdaDispatcher:
+    def __init__(self, function_name: str, lambda_client=None):
+        """
+        Invokes the given function once per shard event and waits for all responses.
+
+        Args:
+            function_name (str): Name or ARN of the worker function, normally this function.
+            lambda_client: Lambda client to use, defaults to globals.get_lambda_client().
+        """
+        self.function_name = function_name
+        self.lambda_client = lambda_client or globals.get_lambda_client()
+
+    # ¦ dispatch
+    def dispatch(
+        self, events: List[Dict], should_stop: Optional[Callable[[], bool]] = None
+    ) -> List[Optional[Dict]]:
+        """
+        Invokes all shards and waits for their responses until should_stop returns True.
+
+        Returns one response per event; shards still running when the wait ended have None.
+        They keep running and store their results as usual.
+        """
+        # Every worker has its own rate limiter, so each gets an equal share of the API limits
+        rate_share = 1.0 / max(1, len(events))
+        events = [
+            dict(event, shard=dict(event["shard"], rate_share=rate_share))
+            for event in events
+        ]
+        executor = ThreadPoolExecutor(
+            max_workers=len(events) or 1, thread_name_prefix="shard"
+        )
+        futures = [executor.submit(self._invoke, event) for event in events]
+        try:
+            while True:
+                _, not_done = wait(
+                    futures, timeout=SHARD_POLL_SECONDS, return_when=ALL_COMPLETED
+                )
+                if not not_done or (should_stop and should_stop()):
+                    break
+        finally:
+            # Does not wait for invocations still in flight
+            executor.shutdown(wait=False)
+        return [future.result() if future.done() else None for future in futures]
+
+    def _invoke(self, event: Dict) -> Dict:
+        response = self.lambda_client.invoke(
+            FunctionName=self.function_name,
+            InvocationType="RequestResponse",
+            Payload=json.dumps(event).encode("utf-8"),
+        )
+        payload = json.loads(response["Payload"].read() or b"null")
+        if response.get("FunctionError"):
+            raise RuntimeError(f"Shard worker failed: {payload}")
+        return payload
+
+
+class ShardCoordinator:
+    def __init__(self, snapshot_store: SnapshotStore, dispatcher):
+        """
+        Fans a crawl out to shard workers and merges their partial results.
+
+        Shard inputs and partial results are exchanged as snapshots under
+        idc-reports/snapshots/shards/<run id>/, so events and responses stay small.
+
+        If the coordinator's own deadline comes first, it stops waiting and self.checkpoint
+        holds what resume() needs to collect the results of the still running workers.
+
+        Args:
+            snapshot_store (SnapshotStore): Store for the shard inputs and partial results.
+            dispatcher: Object with dispatch(events, should_stop) -> responses, e.g. LambdaDispatcher.
+        """
+        self.snapshot_store = snapshot_store
+        self.dispatcher = dispatcher
+        self.failed_assignment_pairs: List[Tuple[str, str]] = []
+        self.checkpoint: Optional[Dict] = None
+
+    # ¦ crawl
+    def crawl(
+        self,
+        run_id: str,
+        permission_sets: Dict,
+        shard_count: int,
+        sso_admin_instance: Optional[Dict] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ) -> Optional[Dict]:
+        """
+        Crawls the assignments of the permission sets in up to shard_count workers.
+
+        Args:
+            sso_admin_instance (Dict): InstanceArn and IdentityStoreId, so workers skip ListInstances.
+            should_stop (Callable[[], bool]): Checked while waiting for the workers.
+
+        Returns:
+            Dict: Permission sets by ARN, each account entry carrying its "assignments",
+                as returned by SsoAdminWrapper.get_assignments(). None if should_stop ended
+                the wait first, see self.checkpoint.
+        """
+        self.checkpoint = None
+        shards = partition_permission_sets(permission_sets, shard_count)
+        events = []
+        for index, shard in enumerate(shards):
+            if (
+                self.snapshot_store.save(
+                    shard_input_name(run_id, index),
+                    {"permission_sets": shard, "instance": sso_admin_instance},
+                )
+                is None
+            ):
+                raise RuntimeError(f"Failed to save the input of shard {index}.")
+            events.append({"shard": {"run_id": run_id, "index": index}})
+        globals.LOGGER.info(
+            f"Dispatching {len(shards)} shards of {len(permission_sets)} permission sets."
+        )
+        shard_state = {
+            "run_id": run_id,
+            "shard_count": len(shards),
+            # Order of the unsharded crawl, so the reports do not depend on sharding
+            "permission_set_arns": list(permission_sets),
+            "dispatched_at": time.time(),
+        }
+
+        try:
+            responses = self.dispatcher.dispatch(events, should_stop)
+            failed_shards = [
+                index
+                for index, response in enumerate(responses)
+                if response is not None and response.get("statusCode") != 200
+            ]
+            if failed_shards:
+                raise RuntimeError(f"Shards {failed_shards} did not complete.")
+        except Exception:
+            self._delete_shard_files(run_id, len(shards))
+            raise
+        finished = [
+            index for index, response in enumerate(responses) if response is not None
+        ]
+        return self._collect(shard_state, should_stop, finished)
+
+    # ¦ resume
+    def resume(
+        self, shard_state: Dict, should_stop: Optional[Callable[[], bool]] = None
+    ) -> Optional[Dict]:
+        """Waits for the remaining shard results of a checkpointed crawl; returns like crawl()."""
+        self.checkpoint = None
+        globals.LOGGER.info(
+            f"Resuming the sharded crawl {shard_state['run_id']} "
+            f"at {shard_state['cursor'] - 1} of {shard_state['shard_count']} shards."
+        )
+        return self._collect(shard_state, should_stop)
+
+    def _collect(
+        self,
+        shard_state: Dict,
+        should_stop: Optional[Callable[[], bool]],
+        finished: Optional[List[int]] = None,
+    ) -> Optional[Dict]:
+        """Loads the shard results, waiting for those of still running workers."""
+        run_id, shard_count = shard_state["run_id"], shard_state["shard_count"]
+        partials: Dict[int, Dict] = {}
+        while True:
+            for index in range(shard_count):
+                if index not in partials:
+                    partial = self.snapshot_store.load(shard_result_name(run_id, index))
+                    if partial is not None:
+                        partials[index] = partial
+            missing = [index for index in range(shard_count) if index not in partials]
+            if not missing:
+                break
+            # These workers responded, so their results will not show up anymore
+            lost = [index for index in missing if index in (finished or [])]
+            if lost:
+                self._delete_shard_files(run_id, shard_count)
+                raise RuntimeError(f"Results of shards {lost} not found.")
+            if time.time() - shard_state["dispatched_at"] > SHARD_MAX_WAIT_SECONDS:
+                self._delete_shard_files(run_id, shard_count)
+                raise RuntimeError(f"Shards {missing} did not complete.")
+            if should_stop and should_stop():
+                # The dispatch counts as the first unit of work, so a checkpoint taken before
+                # any shard finished still shows progress
+                self.checkpoint = dict(
+                    shard_state, cursor=1 + len(partials), total=1 + shard_count
+                )
+                globals.LOGGER.info(
+                    f"Coordinator deadline reached, {len(missing)} of {shard_count} shards still running."
+                )
+                return None
+            time.sleep(SHARD_POLL_SECONDS)
+
+        merged = self._merge(partials)
+        self._delete_shard_files(run_id, shard_count)
+        return {
+            arn: merged[arn]
+            for arn in shard_state["permission_set_arns"]
+            if arn in merged
+        }
+
+    def _merge(self, partials: Dict[int, Dict]) -> Dict:
+        merged = {}
+        self.failed_assignment_pairs = []
+        for _, partial in sorted(partials.items()):
+            # Shards hold disjoint permission sets, so their results do not overlap
+            merged.update(partial["permission_sets"])
+            self.failed_assignment_pairs.extend(
+                tuple(pair) for pair in partial.get("failed_assignment_pairs", [])
+            )
+        if self.failed_assignment_pairs:
+            globals.LOGGER.error(
+                f"Shards failed to retrieve assignments for {len(self.failed_assignment_pairs)} pairs."
+            )
+        return merged
+
+    def _delete_shard_files(self, run_id: str, shard_count: int):
+        for index in range(shard_count):
+            self.snapshot_store.delete(shard_input_name(run_id, index))
+            self.snapshot_store.delete(shard_result_name(run_id, index))
+
+
+def shard_input_name(run_id: str, index: int) -> str:
+    return f"{SHARD_FOLDER_NAME}/{run_id}/input-{index}.json.gz"
+
+
+def shard_result_name(run_id: str, index: int) -> str:
+    return f"{SHARD_FOLDER_NAME}/{run_id}/result-{index}.json.gz"
@@ -0,0 +1,341 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import logging
+from typing import Callable, Dict, Optional, Set
+
+import globals
+from boto3.session import Session
+from pull_data.account_wrapper import AccountWrapper
+from pull_data.identitystore_wrapper import IdentitystoreWrapper
+from pull_data.metadata_cache import METADATA_CACHE, permission_set_key
+
+OUTPUT_ASSIGNMENTS = "assignments"
+OUTPUT_USERS = "users"
+OUTPUT_GROUPS = "groups"
+
+
+class DeltaUpdater:
+    def __init__(
+        self,
+        transformed: Dict,
+        crawler_session_factory: Callable[[], Session],
+    ):
+        """
+        Patches a transformed snapshot in place from CloudTrail events delivered by EventBridge.
+
+        Args:
+            transformed (Dict): Output of Transformer.transform_assignments, modified in place.
+            crawler_session_factory (Callable): Returns the crawler session; only called if an
+                event needs details that are not part of the snapshot.
+        """
+        self.transformed = transformed
+        self._crawler_session_factory = crawler_session_factory
+        self._crawler_session: Optional[Session] = None
+        self._sso_client = None
+        self._account_wrapper: Optional[AccountWrapper] = None
+        self._identitystore_wrapper: Optional[IdentitystoreWrapper] = None
+        self._identitystore_id: Optional[str] = None
+        self.affected_outputs: Set[str] = set()
+
+        self._permission_set_names = {
+            permission_set_info["permission_set_arn"]: permission_set_name
+            for account_info in transformed["accounts"].values()
+            for permission_set_name, permission_set_info in account_info[
+                "permission_sets"
+            ].items()
+        }
+        self._handlers = {
+            "CreateAccountAssignment": self._on_account_assignment_created,
+            "DeleteAccountAssignment": self._on_account_assignment_deleted,
+            "DeletePermissionSet": self._on_permission_set_deleted,
+            "CreateGroupMembership": self._on_group_membership_created,
+            "DeleteGroupMembership": self._on_group_membership_deleted,
+            "UpdateUser": self._on_user_updated,
+            "DeleteUser": self._on_user_deleted,
+            "UpdateGroup": self._on_group_updated,
+            "DeleteGroup": self._on_group_deleted,
+        }
+
+    # ¦ apply_event
+    def apply_event(self, event: Dict) -> bool:
+        """Applies one event; returns False if it was ignored."""
+        detail = event.get("detail", {})
+        event_name = detail.get("eventName")
+        if detail.get("errorCode"):
+            logging.info(f"Ignoring failed {event_name}: {detail.get('errorCode')}")
+            return False
+        handler = self._handlers.get(event_name)
+        if handler is None:
+            logging.info(f"Ignoring unsupported event {event_name}")
+            return False
+
+        request = detail.get("requestParameters") or {}
+        if request.get("identityStoreId"):
+            self._identitystore_id = request["identityStoreId"]
+        logging.info(f"Applying {event_name}")
+        handler(request)
+        return True
+
+    # region lookups
+    # ¦ _get_crawler_session
+    def _get_crawler_session(self) -> Session:
+        if self._crawler_session is None:
+            self._crawler_session = self._crawler_session_factory()
+        return self._crawler_session
+
+    # ¦ _get_sso_client
+    def _get_sso_client(self):
+        if self._sso_client is None:
+            self._sso_client = globals.create_client(
+                self._get_crawler_session(), "sso-admin"
+            )
+        return self._sso_client
+
+    # ¦ _get_account_wrapper
+    def _get_account_wrapper(self) -> AccountWrapper:
+        if self._account_wrapper is None:
+            self._account_wrapper = AccountWrapper(self._get_crawler_session())
+        return self._account_wrapper
+
+    # ¦ _get_identitystore_wrapper
+    def _get_identitystore_wrapper(self) -> IdentitystoreWrapper:
+        if self._identitystore_wrapper is None:
+            if not self._identitystore_id:
+                instances = self._get_sso_client().list_instances().get("Instances", [])
+                self._identitystore_id = (
+                    instances[0].get("IdentityStoreId", "") if instances else ""
+                )
+            self._identitystore_wrapper = IdentitystoreWrapper(
+                self._get_crawler_session(), self._identitystore_id
+            )
+        return self._identitystore_wrapper
+
+    # ¦ _get_permission_set_name
+    def _get_permission_set_name(
+        self, permission_set_arn: str, instance_arn: str
+    ) -> str:
+        if permission_set_arn not in self._permission_set_names:
+            response = self._get_sso_client().describe_permission_set(
+                InstanceArn=instance_arn, PermissionSetArn=permission_set_arn
+            )
+            self._permission_set_names[permission_set_arn] = response.get(
+                "PermissionSet", {}
+            ).get("Name", "")
+        return self._permission_set_names[permission_set_arn]
+
+    # endregion
+
+    # region account assignments
+    # ¦ _on_account_assignment_created
+    def _on_account_assignment_created(self, request: Dict):
+        if request.get("targetType", "AWS_ACCOUNT") != "AWS_ACCOUNT":
+            return
+        account_id = request["targetId"]
+        principal_type = request["principalType"]
+        principal_id = request["principalId"]
+
+        account_info = self.transformed["accounts"].get(account_id)
+        if account_info is None:
+            account_record = self._get_account_wrapper().get_account_record_by_id(
+                account_id
+            )
+            account_info = self.transformed["accounts"][account_id] = {
+                "account_name": account_record.name if account_record else None,
+                "account_status": account_record.status if account_record else None,
+                "permission_sets": {},
+            }
+        permission_set_name = self._get_permission_set_name(
+            request["permissionSetArn"], request.get("instanceArn", "")
+        )
+        permission_set_info = account_info["permission_sets"].setdefault(
+            permission_set_name,
+            {
+                "permission_set_arn": request["permissionSetArn"],
+                "users": [],
+                "groups": [],
+            },
+        )
+
+        principal_ids = permission_set_info[
+            "users" if principal_type == "USER" else "groups"
+        ]
+        if principal_id not in principal_ids:
+            principal_ids.append(principal_id)
+            self.affected_outputs.add(OUTPUT_ASSIGNMENTS)
+        self._ensure_principal(principal_type, principal_id)
+
+    # ¦ _on_account_assignment_deleted
+    def _on_account_assignment_deleted(self, request: Dict):
+        account_info = self.transformed["accounts"].get(request.get("targetId"), {})
+        for permission_set_info in account_info.get("permission_sets", {}).values():
+            if permission_set_info["permission_set_arn"] != request.get(
+                "permissionSetArn"
+            ):
+                continue
+            principal_ids = permission_set_info[
+                "users" if request.get("principalType") == "USER" else "groups"
+            ]
+            if request.get("principalId") in principal_ids:
+                principal_ids.remove(request["principalId"])
+                self.affected_outputs.add(OUTPUT_ASSIGNMENTS)
+        self._prune_principals()
+
+    # ¦ _on_permission_set_deleted
+    def _on_permission_set_deleted(self, request: Dict):
+        METADATA_CACHE.invalidate(permission_set_key(request.get("permissionSetArn")))
+        for account_id, account_info in list(self.transformed["accounts"].items()):
+            for permission_set_name, permission_set_info in list(
+                account_info["permission_sets"].items()
+            ):
+                if permission_set_info["permission_set_arn"] == request.get(
+                    "permissionSetArn"
+                ):
+                    del account_info["permission_sets"][permission_set_name]
+                    self.affected_outputs.add(OUTPUT_ASSIGNMENTS)
+            # Accounts are only listed while a permission set is provisioned to them
+            if not account_info["permission_sets"]:
+                del self.transformed["accounts"][account_id]
+        self._prune_principals()
+
+    # endregion
+
+    # region identity store
+    # ¦ _on_group_membership_created
+    def _on_group_membership_created(self, request: Dict):
+        group_info = self.transformed["principals"]["groups"].get(
+            request.get("groupId")
+        )
+        member_id = request.get("memberId") or {}
+        user_id = member_id.get("userId") or member_id.get("UserId")
+        # Groups without assignments are not part of the report
+        if group_info is None or not user_id:
+            return
+        if user_id not in group_info["assigned_users"]:
+            group_info["assigned_users"].append(user_id)
+            self.affected_outputs.add(OUTPUT_ASSIGNMENTS)
+        self._ensure_principal("USER", user_id)
+
+    # ¦ _on_group_membership_deleted
+    def _on_group_membership_deleted(self, request: Dict):
+        # The event only carries the membership id, so the memberships of all
+        # reported groups are listed again
+        groups = self.transformed["principals"]["groups"]
+        group_ids = [request["groupId"]] if request.get("groupId") else list(groups)
+        identitystore_wrapper = self._get_identitystore_wrapper()
+        identitystore_wrapper.resolve_groups(group_ids)
+        for group_id in group_ids:
+            if group_id not in groups:
+                continue
+            assigned_users = identitystore_wrapper.get_group_info(group_id)[
+                "assigned_users"
+            ]
+            if assigned_users != groups[group_id]["assigned_users"]:
+                groups[group_id]["assigned_users"] = assigned_users
+                self.affected_outputs.add(OUTPUT_ASSIGNMENTS)
+        self._prune_principals()
+
+    # ¦ _on_user_updated
+    def _on_user_updated(self, request: Dict):
+        user_id = request.get("userId")
+        # The cached user listing of warm invocations is outdated now
+        self._get_identitystore_wrapper().forget_user(user_id)
+        if user_id in self.transformed["principals"]["users"]:
+            self.transformed["principals"]["users"][
+                user_id
+            ] = self._get_identitystore_wrapper().get_user_info(user_id)
+            self.affected_outputs.update([OUTPUT_USERS, OUTPUT_ASSIGNMENTS])
+
+    # ¦ _on_user_deleted
+    def _on_user_deleted(self, request: Dict):
+        user_id = request.get("userId")
+        self._get_identitystore_wrapper().forget_user(user_id)
+        for account_info in self.transformed["accounts"].values():
+            for permission_set_info in account_info["permission_sets"].values():
+                if user_id in permission_set_info["users"]:
+                    permission_set_info["users"].remove(user_id)
+                    self.affected_outputs.add(OUTPUT_ASSIGNMENTS)
+        for group_info in self.transformed["principals"]["groups"].values():
+            if user_id in group_info["assigned_users"]:
+                group_info["assigned_users"].remove(user_id)
+                self.affected_outputs.add(OUTPUT_ASSIGNMENTS)
+        self._prune_principals()
+
+    # ¦ _on_group_updated
+    def _on_group_updated(self, request: Dict):
+        group_id = request.get("groupId")
+        self._get_identitystore_wrapper().forget_group(group_id)
+        groups = self.transformed["principals"]["groups"]
+        if group_id in groups:
+            groups[group_id] = self._get_identitystore_wrapper().get_group_info(
+                group_id
+            )
+            self.affected_outputs.update([OUTPUT_GROUPS, OUTPUT_ASSIGNMENTS])
+
+    # ¦ _on_group_deleted
+    def _on_group_deleted(self, request: Dict):
+        group_id = request.get("groupId")
+        self._get_identitystore_wrapper().forget_group(group_id)
+        for account_info in self.transformed["accounts"].values():
+            for permission_set_info in account_info["permission_sets"].values():
+                if group_id in permission_set_info["groups"]:
+                    permission_set_info["groups"].remove(group_id)
+                    self.affected_outputs.add(OUTPUT_ASSIGNMENTS)
+        self._prune_principals()
+
+    # endregion
+
+    # region principals
+    # ¦ _ensure_principal
+    def _ensure_principal(self, principal_type: str, principal_id: str):
+        """Adds details of a newly referenced principal, as the full crawl would have."""
+        principals = self.transformed["principals"]
+        if principal_type == "USER":
+            if principal_id not in principals["users"]:
+                principals["users"][
+                    principal_id
+                ] = self._get_identitystore_wrapper().get_user_info(principal_id)
+                self.affected_outputs.add(OUTPUT_USERS)
+            return
+
+        if principal_id not in principals["groups"]:
+            group_info = self._get_identitystore_wrapper().get_group_info(principal_id)
+            principals["groups"][principal_id] = group_info
+            self.affected_outputs.update([OUTPUT_GROUPS, OUTPUT_ASSIGNMENTS])
+            for user_id in group_info["assigned_users"]:
+                self._ensure_principal("USER", user_id)
+
+    # ¦ _prune_principals
+    def _prune_principals(self):
+        """Drops principals that are no longer referenced, as the full crawl would have."""
+        referenced_user_ids = set()
+        referenced_group_ids = set()
+        for account_info in self.transformed["accounts"].values():
+            for permission_set_info in account_info["permission_sets"].values():
+                referenced_user_ids.update(permission_set_info["users"])
+                referenced_group_ids.update(permission_set_info["groups"])
+
+        groups = self.transformed["principals"]["groups"]
+        for group_id in [g for g in groups if g not in referenced_group_ids]:
+            del groups[group_id]
+            self.affected_outputs.add(OUTPUT_GROUPS)
+        for group_info in groups.values():
+            referenced_user_ids.update(group_info["assigned_users"])
+
+        users = self.transformed["principals"]["users"]
+        for user_id in [u for u in users if u not in referenced_user_ids]:
+            del users[user_id]
+            self.affected_outputs.add(OUTPUT_USERS)
+
+    # endregion
@@ -12,12 +12,28 @@ For commercial licensing, contact: contact@acai.gmbh
 
 """
 
+import gzip
+import json
 import logging
 import os
-from typing import Optional
+import resource
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
 
 import boto3
 from botocore.config import Config as boto3_config
+from botocore.credentials import (
+    CredentialProvider,
+    CredentialResolver,
+    RefreshableCredentials,
+)
+from botocore.session import get_session as get_botocore_session
+from pull_data.api_metrics import API_METRICS
+from pull_data.rate_limiter import RATE_LIMITER
 
 LOGLEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
 logging.getLogger().setLevel(LOGLEVEL)
@@ -25,96 +41,498 @@ for noisy_log_source in ["boto", "boto3", "botocore", "urllib3"]:
     logging.getLogger(noisy_log_source).setLevel(logging.WARN)
 LOGGER = logging.getLogger()
 
-# Resolve region safely at import time
-REGION = (
-    os.environ.get("AWS_REGION")
-    or os.environ.get("AWS_DEFAULT_REGION")
-    or boto3.Session().region_name
-    or "us-east-1"
-)
 REPORT_BUCKET_NAME = os.environ.get("REPORT_BUCKET_NAME")
 REPORT_BUCKET_FOLDER_NAME = "idc-reports"
 
-BOTO3_CONFIG_SETTINGS = boto3_config(
-    region_name=REGION, retries=dict(max_attempts=10, mode="adaptive")
+# Number of worker threads sharing one client for the assignment crawl (1 = serial)
+CRAWLER_MAX_WORKERS = max(1, int(os.environ.get("CRAWLER_MAX_WORKERS", "8")))
+# "lazy": expand only groups referenced by assignments, "prefetch": expand all groups
+GROUP_RESOLUTION = os.environ.get("GROUP_RESOLUTION", "lazy").lower()
+# "auto": let the crawl planner choose, "per_pair" or "per_principal" to force a strategy
+CRAWL_STRATEGY = os.environ.get("CRAWL_STRATEGY", "auto").lower()
+# Ignore the previous crawl snapshot and re-crawl everything
+FORCE_FULL_CRAWL = os.environ.get("FORCE_FULL_CRAWL", "false").lower() == "true"
+# Snapshots older than this are not reused, bounding how long unchanged details are trusted
+SNAPSHOT_MAX_AGE_HOURS = float(os.environ.get("SNAPSHOT_MAX_AGE_HOURS", "24"))
+# Write the Excel report row by row to disk instead of keeping every cell in memory
+EXCEL_CONSTANT_MEMORY = (
+    os.environ.get("EXCEL_CONSTANT_MEMORY", "true").lower() == "true"
+)
+# Skip rendering and upload if the report data did not change since the last report
+SKIP_UNCHANGED_REPORTS = (
+    os.environ.get("SKIP_UNCHANGED_REPORTS", "true").lower() == "true"
+)
+# Assignment report formats rendered per run: "excel" and/or "csv"; renderers are imported on use
+OUTPUT_FORMATS = [
+    output_format.strip().lower()
+    for output_format in os.environ.get("OUTPUT_FORMATS", "excel,csv").split(",")
+    if output_format.strip()
+]
+# Also export the report as an indexed SQLite database
+SQLITE_EXPORT = os.environ.get("SQLITE_EXPORT", "false").lower() == "true"
+# Also write gzip NDJSON files partitioned as dt=YYYY-MM-DD/table=<table>/ for Athena
+ATHENA_EXPORT = os.environ.get("ATHENA_EXPORT", "false").lower() == "true"
+# Shards the partitioned assignments by this many leading account id digits (0 = no sharding)
+ATHENA_SHARD_DIGITS = int(os.environ.get("ATHENA_SHARD_DIGITS", "0"))
+# Event-driven updates render the reports covering the whole tenant at most this often (0 = every event)
+EVENT_RENDER_INTERVAL_SECONDS = float(
+    os.environ.get("EVENT_RENDER_INTERVAL_SECONDS", "300")
+)
+# Return the full transformed model in the response body instead of a summary (6 MB limit)
+FULL_RESPONSE = os.environ.get("FULL_RESPONSE", "false").lower() == "true"
+# A crawl stops, checkpoints and re-invokes the function once less time than this is left
+CHECKPOINT_RESERVE_SECONDS = float(os.environ.get("CHECKPOINT_RESERVE_SECONDS", "120"))
+# Upper bound of self re-invocations of one crawl run
+CHECKPOINT_MAX_RESUMES = int(os.environ.get("CHECKPOINT_MAX_RESUMES", "10"))
+# Lifetime of the assumed crawler role credentials; role chaining caps it at one hour
+ROLE_SESSION_DURATION = int(os.environ.get("ROLE_SESSION_DURATION", "3600"))
+ROLE_SESSION_NAME = os.environ.get("ROLE_SESSION_NAME", "RemoteSession")
+# CloudWatch namespace of the Embedded Metric Format record written per run (empty disables it)
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "IdcReporting")
+# Fan the assignment crawl out to this many worker invocations, split by permission set (1 = off)
+CRAWL_SHARDS = max(1, int(os.environ.get("CRAWL_SHARDS", "1")))
+
+# Local files above the threshold are streamed to S3 as multipart uploads, see get_s3_transfer_config()
+S3_MULTIPART_BYTES = 16 * 1024 * 1024
+S3_TRANSFER_MAX_CONCURRENCY = 4
+# Artifacts uploaded concurrently by UPLOAD_SERVICE
+UPLOAD_MAX_WORKERS = max(1, int(os.environ.get("UPLOAD_MAX_WORKERS", "4")))
+# Text artifacts larger than this are uploaded gzip-compressed as <name>.gz (0 disables it)
+UPLOAD_GZIP_THRESHOLD_BYTES = int(
+    float(os.environ.get("UPLOAD_GZIP_THRESHOLD_MB", "5")) * 1024 * 1024
 )
+UPLOAD_GZIP_EXTENSIONS = (".csv", ".json", ".ndjson")
+
+
+_REGION = None
+_BOTO3_CONFIG_SETTINGS = None
+_DATA_LOADER = None
+_BASE_SESSION = None
+
+
+def get_region() -> str:
+    """Returns the region of the function, resolved on first use."""
+    global _REGION
+    if _REGION is None:
+        # Lambda always sets AWS_REGION; only local runs fall back to the AWS config files
+        _REGION = (
+            os.environ.get("AWS_REGION")
+            or os.environ.get("AWS_DEFAULT_REGION")
+            or boto3.Session().region_name
+            or "us-east-1"
+        )
+    return _REGION
+
+
+def get_boto3_config() -> boto3_config:
+    """Returns the default client config (region and adaptive retries), created on first use."""
+    global _BOTO3_CONFIG_SETTINGS
+    if _BOTO3_CONFIG_SETTINGS is None:
+        _BOTO3_CONFIG_SETTINGS = boto3_config(
+            region_name=get_region(), retries=dict(max_attempts=10, mode="adaptive")
+        )
+    return _BOTO3_CONFIG_SETTINGS
+
+
+def __getattr__(name: str):
+    # REGION, BOTO3_CONFIG_SETTINGS and S3_TRANSFER_CONFIG stay module attributes, but are only resolved when read
+    if name == "REGION":
+        return get_region()
+    if name == "BOTO3_CONFIG_SETTINGS":
+        return get_boto3_config()
+    if name == "S3_TRANSFER_CONFIG":
+        return get_s3_transfer_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def new_botocore_session():
+    """
+    Returns a new botocore session that shares the data loader of the sessions created before.
+
+    The loader caches the parsed service models and endpoint data, so they are read once per
+    container instead of once per session and invocation.
+    """
+    global _DATA_LOADER
+    botocore_session = get_botocore_session()
+    if _DATA_LOADER is None:
+        _DATA_LOADER = botocore_session.get_component("data_loader")
+    else:
+        botocore_session.register_component("data_loader", _DATA_LOADER)
+    return botocore_session
+
+
+class _StaticCredentialProvider(CredentialProvider):
+    METHOD = "sts-assume-role"
+
+    def __init__(self, credentials: RefreshableCredentials):
+        """Hands out one credential set, which refreshes itself."""
+        super().__init__()
+        self.credentials = credentials
+
+    # ¦ load
+    def load(self) -> RefreshableCredentials:
+        return self.credentials
+
+
+def refreshable_session(refresh_using) -> boto3.Session:
+    """
+    Returns a session backed by refreshable credentials. refresh_using returns the credential
+    metadata (access_key, secret_key, token, expiry_time); botocore calls it again shortly before
+    the credentials expire.
+
+    The credentials reach the session through its public credential_provider component, the only
+    provider of the returned session.
+    """
+    credentials = RefreshableCredentials.create_from_metadata(
+        metadata=refresh_using(),
+        refresh_using=refresh_using,
+        method=_StaticCredentialProvider.METHOD,
+    )
+    botocore_session = new_botocore_session()
+    botocore_session.register_component(
+        "credential_provider",
+        CredentialResolver(providers=[_StaticCredentialProvider(credentials)]),
+    )
+    return boto3.Session(botocore_session=botocore_session, region_name=get_region())
+
+
+def get_base_session() -> boto3.Session:
+    """Returns the session of the function's own role (STS, S3, Lambda), created on first use."""
+    global _BASE_SESSION
+    if _BASE_SESSION is None:
+        _BASE_SESSION = boto3.Session(
+            botocore_session=new_botocore_session(), region_name=get_region()
+        )
+    return _BASE_SESSION
+
+
+def client_config(max_pool_connections: Optional[int] = None) -> boto3_config:
+    """Returns the default client config, sized for the given number of concurrent callers."""
+    if max_pool_connections is None:
+        return get_boto3_config()
+    # botocore keeps at least 10 connections in the pool by default
+    return get_boto3_config().merge(
+        boto3_config(max_pool_connections=max(10, max_pool_connections))
+    )
+
+
+def create_client(
+    session: boto3.Session,
+    service_name: str,
+    max_pool_connections: Optional[int] = None,
+):
+    """Creates a client whose API calls go through the shared rate limiter and are recorded in API_METRICS."""
+    client = session.client(service_name, config=client_config(max_pool_connections))
+    # Attached after the rate limiter, so the recorded latency excludes its waiting time
+    return API_METRICS.attach(RATE_LIMITER.attach(client))
 
 
 def assume_remote_role(
     remote_role_arn: str,
     sts_region_name: Optional[str] = None,
     customer_session: Optional[boto3.Session] = None,
+    duration_seconds: Optional[int] = None,
+    session_name: Optional[str] = None,
 ) -> boto3.Session:
+    """
+    Assumes the provided role in the auditing member account and returns a session.
+
+    The session is backed by refreshable credentials: botocore assumes the role again shortly
+    before they expire. All clients created from the session, and so all worker threads,
+    share this one credential set.
+
+    Args:
+        duration_seconds (int): Credential lifetime, defaults to ROLE_SESSION_DURATION.
+        session_name (str): Role session name shown in CloudTrail, defaults to ROLE_SESSION_NAME.
+    """
     try:
-        """Assumes the provided role in the auditing member account and returns a session"""
         # Beginning the assume role process for account
-        if customer_session is None:
-            if sts_region_name is None:
-                sts_client = boto3.client("sts", config=BOTO3_CONFIG_SETTINGS)
-            else:
-                sts_client = boto3.client(
-                    "sts", region_name=sts_region_name, config=BOTO3_CONFIG_SETTINGS
-                )
+        session = customer_session or get_base_session()
+        if sts_region_name is None:
+            sts_client = session.client("sts", config=get_boto3_config())
         else:
-            if sts_region_name is None:
-                sts_client = customer_session.client(
-                    "sts", config=BOTO3_CONFIG_SETTINGS
-                )
-            else:
-                sts_client = customer_session.client(
-                    "sts", region_name=sts_region_name, config=BOTO3_CONFIG_SETTINGS
-                )
+            sts_client = session.client(
+                "sts", region_name=sts_region_name, config=get_boto3_config()
+            )
 
-        LOGGER.debug(f"Assuming role {remote_role_arn}")
-        response = sts_client.assume_role(
-            RoleArn=remote_role_arn, RoleSessionName="RemoteSession"
-        )
+        def _assume_role() -> Dict:
+            LOGGER.debug(f"Assuming role {remote_role_arn}")
+            response = sts_client.assume_role(
+                RoleArn=remote_role_arn,
+                RoleSessionName=session_name or ROLE_SESSION_NAME,
+                DurationSeconds=duration_seconds or ROLE_SESSION_DURATION,
+            )
+            credentials = response["Credentials"]
+            LOGGER.debug(
+                f"Assumed role {remote_role_arn} until {credentials['Expiration']}"
+            )
+            return {
+                "access_key": credentials["AccessKeyId"],
+                "secret_key": credentials["SecretAccessKey"],
+                "token": credentials["SessionToken"],
+                "expiry_time": credentials["Expiration"].isoformat(),
+            }
 
-        # Storing STS credentials
-        session = boto3.Session(
-            aws_access_key_id=response["Credentials"]["AccessKeyId"],
-            aws_secret_access_key=response["Credentials"]["SecretAccessKey"],
-            aws_session_token=response["Credentials"]["SessionToken"],
-            region_name=REGION,
-        )
-        LOGGER.debug(f"Assumed role {remote_role_arn}")
-        return session
+        return refreshable_session(_assume_role)
 
     except Exception:
         LOGGER.exception(f"Was not able to assume role {remote_role_arn}")
         raise
 
 
-def upload_to_s3(
-    object_name: str,
-    local_file_path: Optional[str] = None,
-    content: Optional[bytes] = None,
-):
-    if REPORT_BUCKET_NAME:
-        s3_client = boto3.client("s3", region_name=REGION, config=BOTO3_CONFIG_SETTINGS)
-        s3_bucket_name = REPORT_BUCKET_NAME
-        s3_key = f"{REPORT_BUCKET_FOLDER_NAME}/{object_name}"
-        s3_url = f"s3://{s3_bucket_name}/{s3_key}"
+_S3_CLIENT = None
+_S3_TRANSFER_CONFIG = None
+
+
+def get_s3_client():
+    """Returns the S3 client for the report bucket, created once per container."""
+    global _S3_CLIENT
+    if _S3_CLIENT is None:
+        _S3_CLIENT = get_base_session().client(
+            "s3",
+            config=client_config(UPLOAD_MAX_WORKERS * S3_TRANSFER_MAX_CONCURRENCY),
+        )
+    return _S3_CLIENT
+
+
+def get_s3_transfer_config():
+    """Returns the TransferConfig of the report uploads, created on first use."""
+    global _S3_TRANSFER_CONFIG
+    if _S3_TRANSFER_CONFIG is None:
+        # Imported here, so invocations without uploads do not load s3transfer on cold start
+        from boto3.s3.transfer import TransferConfig
+
+        _S3_TRANSFER_CONFIG = TransferConfig(
+            multipart_threshold=S3_MULTIPART_BYTES,
+            multipart_chunksize=S3_MULTIPART_BYTES,
+            max_concurrency=S3_TRANSFER_MAX_CONCURRENCY,
+        )
+    return _S3_TRANSFER_CONFIG
+
+
+def set_s3_client(s3_client):
+    """Replaces the S3 client, e.g. with a local stand-in for offline runs."""
+    global _S3_CLIENT
+    _S3_CLIENT = s3_client
+
 
-        LOGGER.info(f"Uploading to S3: {s3_url}")
+_LAMBDA_CLIENT = None
 
+
+def get_lambda_client():
+    """Returns the Lambda client used to invoke the crawler itself, created once per container."""
+    global _LAMBDA_CLIENT
+    if _LAMBDA_CLIENT is None:
+        # Shard workers are invoked synchronously and may run up to the 15 minute Lambda limit.
+        # A retried invoke would start a second worker (or resume chain) while the first may
+        # still run, so every invoke is attempted exactly once
+        _LAMBDA_CLIENT = get_base_session().client(
+            "lambda",
+            config=client_config(CRAWL_SHARDS).merge(
+                boto3_config(
+                    read_timeout=900,
+                    retries={"total_max_attempts": 1, "mode": "standard"},
+                )
+            ),
+        )
+    return _LAMBDA_CLIENT
+
+
+def set_lambda_client(lambda_client):
+    """Replaces the Lambda client, e.g. with a stand-in that records the invocations."""
+    global _LAMBDA_CLIENT
+    _LAMBDA_CLIENT = lambda_client
+
+
+class UploadService:
+    def __init__(
+        self,
+        max_workers: int = UPLOAD_MAX_WORKERS,
+        gzip_threshold_bytes: int = UPLOAD_GZIP_THRESHOLD_BYTES,
+    ):
+        """
+        Uploads report artifacts to the report bucket, optionally in the background.
+
+        The worker pool is created on first use and kept for warm invocations.
+
+        Args:
+            max_workers (int): Concurrent uploads.
+            gzip_threshold_bytes (int): Text artifacts above this size are gzip-compressed, 0 disables it.
+        """
+        self.max_workers = max_workers
+        self.gzip_threshold_bytes = gzip_threshold_bytes
+        self._executor = None
+        self._pending: List[Future] = []
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="upload"
+            )
+        return self._executor
+
+    # ¦ submit
+    def submit(
+        self,
+        object_name: str,
+        local_file_path: Optional[str] = None,
+        content: Optional[bytes] = None,
+        remove_local_file: bool = False,
+    ) -> Future:
+        """Queues an upload. Its manifest entry is returned by the next wait()."""
+        future = self.executor.submit(
+            self.upload, object_name, local_file_path, content, remove_local_file
+        )
+        with self._lock:
+            self._pending.append(future)
+        return future
+
+    # ¦ wait
+    def wait(self) -> List[Dict]:
+        """Waits for all queued uploads and returns their manifest entries in submission order."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        return [future.result() for future in pending]
+
+    # ¦ upload
+    def upload(
+        self,
+        object_name: str,
+        local_file_path: Optional[str] = None,
+        content: Optional[bytes] = None,
+        remove_local_file: bool = False,
+    ) -> Dict:
+        """
+        Uploads a local file or in-memory content below idc-reports/.
+
+        Returns:
+            Dict: Manifest entry with key, url, sizes and duration; url is None if nothing was uploaded.
+        """
+        entry = {
+            "object_name": object_name,
+            "key": None,
+            "url": None,
+            "size_bytes": 0,
+            "uploaded_bytes": 0,
+            "compressed": False,
+            "duration_seconds": 0.0,
+        }
+        started = time.perf_counter()
         try:
+            if not REPORT_BUCKET_NAME:
+                LOGGER.info("No output bucket provided.")
+                return entry
             if local_file_path:
-                with open(local_file_path, "rb") as file_content:
-                    s3_client.put_object(
-                        Bucket=s3_bucket_name, Key=s3_key, Body=file_content
-                    )
+                size_bytes = os.path.getsize(local_file_path)
             elif content is not None:
-                s3_client.put_object(Bucket=s3_bucket_name, Key=s3_key, Body=content)
+                if isinstance(content, str):
+                    content = content.encode("utf-8")
+                size_bytes = len(content)
             else:
                 LOGGER.error("No local file path or content provided for upload.")
-                return None
+                return entry
+
+            compress = (
+                0 < self.gzip_threshold_bytes < size_bytes
+                and object_name.endswith(UPLOAD_GZIP_EXTENSIONS)
+            )
+            if compress:
+                object_name = f"{object_name}.gz"
+            s3_key = f"{REPORT_BUCKET_FOLDER_NAME}/{object_name}"
+            s3_url = f"s3://{REPORT_BUCKET_NAME}/{s3_key}"
+            LOGGER.info(f"Uploading to S3: {s3_url}")
+
+            s3_client = get_s3_client()
+            if local_file_path and compress:
+                with tempfile.TemporaryFile() as compressed_file:
+                    with open(local_file_path, "rb") as source, gzip.GzipFile(
+                        fileobj=compressed_file, mode="wb"
+                    ) as target:
+                        shutil.copyfileobj(source, target)
+                    uploaded_bytes = compressed_file.tell()
+                    compressed_file.seek(0)
+                    s3_client.upload_fileobj(
+                        compressed_file,
+                        REPORT_BUCKET_NAME,
+                        s3_key,
+                        Config=get_s3_transfer_config(),
+                    )
+            elif local_file_path:
+                # Reads the file in chunks, so its size does not count against memory
+                s3_client.upload_file(
+                    local_file_path,
+                    REPORT_BUCKET_NAME,
+                    s3_key,
+                    Config=get_s3_transfer_config(),
+                )
+                uploaded_bytes = size_bytes
+            else:
+                if compress:
+                    content = gzip.compress(content)
+                s3_client.put_object(
+                    Bucket=REPORT_BUCKET_NAME, Key=s3_key, Body=content
+                )
+                uploaded_bytes = len(content)
 
+            entry.update(
+                {
+                    "object_name": object_name,
+                    "key": s3_key,
+                    "url": s3_url,
+                    "size_bytes": size_bytes,
+                    "uploaded_bytes": uploaded_bytes,
+                    "compressed": compress,
+                }
+            )
             LOGGER.info(f"Upload to S3 completed: {s3_url}")
-            return s3_url
+            return entry
         except Exception:
             LOGGER.exception("Failed to upload to S3")
-            return None
-    else:
-        LOGGER.info("No output bucket provided.")
-        return None
+            return entry
+        finally:
+            entry["duration_seconds"] = round(time.perf_counter() - started, 3)
+            if (
+                remove_local_file
+                and local_file_path
+                and os.path.exists(local_file_path)
+            ):
+                # Frees /tmp for the next invocation of a warm container
+                os.remove(local_file_path)
+
+
+# Module-level so the worker pool and the S3 client are reused by warm invocations
+UPLOAD_SERVICE = UploadService()
+
+
+def upload_to_s3(
+    object_name: str,
+    local_file_path: Optional[str] = None,
+    content: Optional[bytes] = None,
+) -> Optional[str]:
+    """Uploads right away and returns the S3 URL, or None if nothing was uploaded."""
+    return UPLOAD_SERVICE.upload(
+        object_name=object_name, local_file_path=local_file_path, content=content
+    )["url"]
+
+
+def dump_json_gz(data) -> str:
+    """Streams data as gzip-compressed JSON into a temp file and returns its path."""
+    file_descriptor, local_file_path = tempfile.mkstemp(suffix=".json.gz")
+    os.close(file_descriptor)
+    # json.dump encodes chunk by chunk, so the document never exists as one string
+    with gzip.open(local_file_path, "wt", encoding="utf-8") as json_file:
+        json.dump(data, json_file, default=str, separators=(",", ":"))
+    return local_file_path
+
+
+def log_resource_usage(label: str):
+    """Logs the peak RSS of the process and the used space of the temp directory."""
+    # ru_maxrss is reported in KiB on Linux
+    peak_rss_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    tmp_usage = shutil.disk_usage(tempfile.gettempdir())
+    LOGGER.info(
+        f"{label}: peak_rss={peak_rss_mib:.1f} MiB, "
+        f"tmp_used={tmp_usage.used / (1024 * 1024):.1f} MiB of {tmp_usage.total / (1024 * 1024):.1f} MiB"
+    )
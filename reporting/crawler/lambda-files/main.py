@@ -12,21 +12,63 @@ For commercial licensing, contact: contact@acai.gmbh
 
 """
 
+import copy
 import json
 import os
+import random
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Optional
 
 import boto3
 import botocore
 import globals
 from botocore.exceptions import ClientError
+from pull_data.api_metrics import API_METRICS
+from pull_data.crawl_planner import STRATEGY_PER_PAIR
 from pull_data.identitystore_wrapper import IdentitystoreWrapper
+from pull_data.metadata_cache import METADATA_CACHE
+from pull_data.rate_limiter import RATE_LIMITER
 from pull_data.ssoadmin_wrapper import SsoAdminWrapper
-from rendering.csv import CSV
-from rendering.excel_report import ExcelReport
-from transformer import Transformer
+from rendering.csv import CSV, AssignmentsDiffCSV
+from rendering.effective_access import EffectiveAccessExport
+from rendering.rows import RowPipeline, iter_assignment_rows
+from report_diff import diff_assignments, iter_assignment_keys
+from report_manifest import ReportManifest, compute_content_hash
+from snapshot_store import SnapshotConflictError, SnapshotStore
+from transformer import Transformer, build_effective_access
+
+# Values of OUTPUT_FORMATS
+OUTPUT_FORMAT_EXCEL = "excel"
+OUTPUT_FORMAT_CSV = "csv"
+# Attempts of event_handler to patch the transformed snapshot while other invocations change it
+EVENT_UPDATE_MAX_ATTEMPTS = 5
+# EventBridge events handled by event_handler, see the idc_changes rule in main.tf
+CLOUDTRAIL_DETAIL_TYPE = "AWS API Call via CloudTrail"
+CLOUDTRAIL_EVENT_SOURCES = ("aws.sso", "aws.identitystore")
+
+
+def is_identity_center_change(event) -> bool:
+    """
+    True for the IdC CloudTrail events of the idc_changes rule. Other EventBridge events, e.g. a
+    scheduled rule ("detail-type": "Scheduled Event"), run the full crawl.
+    """
+    return (
+        isinstance(event, dict)
+        and event.get("detail-type") == CLOUDTRAIL_DETAIL_TYPE
+        and event.get("source") in CLOUDTRAIL_EVENT_SOURCES
+    )
 
 
 def lambda_handler(event, context):
+    # CloudTrail events routed by EventBridge only patch the last snapshot
+    if is_identity_center_change(event):
+        return event_handler(event, context)
+    # Worker invocations of a sharded crawl
+    if isinstance(event, dict) and "shard" in event:
+        return shard_handler(event, context)
+
     try:
         # Minimal, safe startup logs
         globals.LOGGER.debug(
@@ -46,17 +88,133 @@ def lambda_handler(event, context):
                 "body": json.dumps({"error": "Server misconfiguration"}),
             }
 
+        RATE_LIMITER.reset_stats()
+        # A warm container may have served as a shard worker with a smaller share before
+        RATE_LIMITER.set_share(1.0)
+        API_METRICS.reset()
+        METADATA_CACHE.reset_stats()
+        started = time.perf_counter()
+        full_crawl = globals.FORCE_FULL_CRAWL or (
+            isinstance(event, dict) and bool(event.get("full_crawl"))
+        )
+        resume = event.get("resume") if isinstance(event, dict) else None
+        # Metadata cached by earlier invocations of this container belongs to the crawler role
+        METADATA_CACHE.bind(crawler_role=crawler_arn)
+        if full_crawl and not resume:
+            METADATA_CACHE.clear()
         crawler_session = globals.assume_remote_role(
             remote_role_arn=crawler_arn, sts_region_name=region
         )
 
         ssoadmin_wrapper = SsoAdminWrapper(crawler_session)
-        assignments = ssoadmin_wrapper.get_assignments()
+
+        # Reuse the previous crawl unless a full crawl is forced
+        snapshot_store = SnapshotStore()
+
+        # Continue a crawl that checkpointed before the Lambda time limit
+        checkpoint = None
+        if resume:
+            checkpoint = snapshot_store.load_checkpoint(resume["run_id"])
+            if checkpoint is None:
+                globals.LOGGER.warning(
+                    "Crawl checkpoint not found, starting a new crawl."
+                )
+        run_id = checkpoint["run_id"] if checkpoint else uuid.uuid4().hex
+        crawl_state = checkpoint["crawl_state"] if checkpoint else None
+        previous_crawl = None
+        if full_crawl:
+            globals.LOGGER.info("Full crawl requested, ignoring previous snapshot.")
+        else:
+            previous_crawl = snapshot_store.load_raw_crawl(
+                ssoadmin_wrapper.instance_arn, globals.SNAPSHOT_MAX_AGE_HOURS
+            )
+        previous_crawl = previous_crawl or {}
+        # Accounts and users listed by the previous crawl are reused while they are fresh
+        ssoadmin_wrapper.account_wrapper.seed(
+            previous_crawl.get("accounts"), previous_crawl.get("accounts_listed_at")
+        )
 
         identitystore_wrapper = IdentitystoreWrapper(
-            crawler_session, ssoadmin_wrapper.identitystore_id
+            crawler_session,
+            ssoadmin_wrapper.identitystore_id,
+            previous_cache=previous_crawl.get("identity_cache"),
+            previous_users_listed_at=previous_crawl.get("users_listed_at"),
         )
-        identitystore_wrapper.fill_cache()
+        with API_METRICS.phase("identity_fill"):
+            identitystore_wrapper.fill_cache()
+
+        with API_METRICS.phase("crawl"):
+            shard_count = globals.CRAWL_SHARDS
+            if isinstance(event, dict) and event.get("shard_count"):
+                shard_count = int(event["shard_count"])
+            should_stop = deadline_check(context)
+            if crawl_state is not None and "shard_count" in crawl_state:
+                # The coordinator of a sharded crawl checkpointed while its shards were running
+                from crawl_shards import ShardCoordinator
+
+                coordinator = ShardCoordinator(
+                    snapshot_store, create_dispatcher(context)
+                )
+                assignments = coordinator.resume(crawl_state, should_stop)
+                stopped_state = coordinator.checkpoint
+            elif shard_count > 1 and crawl_state is None and snapshot_store.bucket_name:
+                # Shard workers exchange their results through the report bucket
+                from crawl_shards import ShardCoordinator
+
+                coordinator = ShardCoordinator(
+                    snapshot_store, create_dispatcher(context)
+                )
+                assignments = coordinator.crawl(
+                    run_id,
+                    ssoadmin_wrapper.load_permission_sets(
+                        previous_permission_sets=previous_crawl.get("permission_sets")
+                    ),
+                    shard_count,
+                    sso_admin_instance={
+                        "InstanceArn": ssoadmin_wrapper.instance_arn,
+                        "IdentityStoreId": ssoadmin_wrapper.identitystore_id,
+                    },
+                    should_stop=should_stop,
+                )
+                stopped_state = coordinator.checkpoint
+            else:
+                # The principal ids let the crawl planner consider per-principal listing
+                principals = None
+                if crawl_state is None and globals.CRAWL_STRATEGY != STRATEGY_PER_PAIR:
+                    principals = identitystore_wrapper.list_principal_ids()
+                assignments = ssoadmin_wrapper.get_assignments(
+                    principals=principals,
+                    group_members=(
+                        identitystore_wrapper.known_group_members()
+                        if principals is not None
+                        else None
+                    ),
+                    previous_permission_sets=previous_crawl.get("permission_sets"),
+                    checkpoint=crawl_state,
+                    should_stop=should_stop,
+                )
+                stopped_state = (
+                    None
+                    if ssoadmin_wrapper.crawl_complete
+                    else ssoadmin_wrapper.checkpoint
+                )
+            if stopped_state is not None:
+                return checkpoint_and_resume(
+                    event,
+                    context,
+                    snapshot_store,
+                    run_id,
+                    stopped_state,
+                    previous_cursor=crawl_state["cursor"] if crawl_state else 0,
+                )
+            if checkpoint:
+                snapshot_store.delete_checkpoint()
+            # A cached user id that no longer exists means the cached user listing is outdated
+            if any(
+                principal_type == "USER"
+                for principal_type, _ in ssoadmin_wrapper.missing_principals
+            ):
+                identitystore_wrapper.refresh_users()
 
         # Avoid dumping full cache to logs; log only sizes at debug level
         try:
@@ -68,16 +226,452 @@ def lambda_handler(event, context):
         except Exception:
             globals.LOGGER.debug("Identity cache size check failed")
 
-        transformer = Transformer(assignments, identitystore_wrapper)
-        transformed = transformer.transform_assignments()
+        with API_METRICS.phase("transform"):
+            transformer = Transformer(assignments, identitystore_wrapper)
+            transformed = transformer.transform_assignments()
+        RATE_LIMITER.log_stats()
+        globals.LOGGER.info(f"Metadata cache: {METADATA_CACHE.get_stats()}")
+
+        # The transformed snapshot is what event_handler patches between crawls,
+        # the previous one is the baseline of the assignments diff
+        previous_transformed = snapshot_store.load_transformed()
+        snapshot_store.save_transformed(transformed)
+        # Saved after the transformation, so lazily resolved groups are part of the cache
+        snapshot_store.save_raw_crawl(
+            instance_arn=ssoadmin_wrapper.instance_arn,
+            identitystore_id=ssoadmin_wrapper.identitystore_id,
+            accounts=ssoadmin_wrapper.account_wrapper.accounts,
+            permission_sets=assignments,
+            identity_cache=identitystore_wrapper.cache,
+            accounts_listed_at=ssoadmin_wrapper.account_wrapper.listed_at,
+            users_listed_at=identitystore_wrapper.users_listed_at,
+        )
+
+        with API_METRICS.phase("render"):
+            artifacts = render_reports(
+                transformed,
+                force=isinstance(event, dict) and bool(event.get("force_render")),
+                previous_transformed=previous_transformed,
+                effective_access=transformer.effective_access,
+            )
+        timings = {
+            f"{name}_seconds": seconds
+            for name, seconds in API_METRICS.get_phases().items()
+        }
+        timings["total_seconds"] = time.perf_counter() - started
+
+        full_response = globals.FULL_RESPONSE or (
+            isinstance(event, dict) and bool(event.get("full_response"))
+        )
+        if full_response:
+            return {"statusCode": 200, "body": json.dumps(transformed)}
+        return {
+            "statusCode": 200,
+            "body": json.dumps(
+                build_summary(transformed, len(assignments), artifacts, timings)
+            ),
+        }
+
+    except ClientError:
+        globals.LOGGER.exception("AWS client error")
+        raise
+    except Exception:
+        globals.LOGGER.exception("Unhandled error")
+        raise
+    finally:
+        emit_metrics()
+
+
+def shard_handler(event, context):
+    """Crawls the assignments of one shard of a sharded crawl and stores them for the coordinator."""
+    from crawl_shards import shard_input_name, shard_result_name
+
+    shard = event["shard"]
+    # Shards dispatched in-process report into the statistics of their coordinator
+    if context is not None:
+        RATE_LIMITER.reset_stats()
+        API_METRICS.reset()
+    RATE_LIMITER.set_share(float(shard.get("rate_share", 1.0)))
+    snapshot_store = SnapshotStore()
+    shard_input = snapshot_store.load(shard_input_name(shard["run_id"], shard["index"]))
+    if shard_input is None:
+        raise RuntimeError(f"Input of shard {shard['index']} not found.")
+
+    crawler_session = globals.assume_remote_role(
+        remote_role_arn=os.environ.get("CRAWLER_ARN"),
+        sts_region_name=os.environ.get("AWS_REGION"),
+    )
+    # The shard input already holds the provisioned accounts, so the organization is not listed again
+    ssoadmin_wrapper = SsoAdminWrapper(
+        crawler_session, sso_admin_instance=shard_input.get("instance"), accounts=[]
+    )
+    # Per-principal listing does not split by permission set, so shards always crawl per pair
+    with API_METRICS.phase("crawl"):
+        permission_sets = ssoadmin_wrapper.get_assignments(
+            strategy=STRATEGY_PER_PAIR, permission_sets=shard_input["permission_sets"]
+        )
+    key = snapshot_store.save(
+        shard_result_name(shard["run_id"], shard["index"]),
+        {
+            "permission_sets": permission_sets,
+            "failed_assignment_pairs": ssoadmin_wrapper.failed_assignment_pairs,
+        },
+    )
+    if key is None:
+        raise RuntimeError(f"Failed to save the result of shard {shard['index']}.")
+    if context is not None:
+        RATE_LIMITER.log_stats()
+        emit_metrics()
+    return {
+        "statusCode": 200,
+        "body": json.dumps(
+            {
+                "shard": shard["index"],
+                "permission_set_count": len(permission_sets),
+                "key": key,
+            }
+        ),
+    }
+
+
+def emit_metrics():
+    """Writes the API and phase metrics of this invocation as one CloudWatch EMF record."""
+    if not globals.METRICS_NAMESPACE:
+        return
+    try:
+        API_METRICS.emit(globals.METRICS_NAMESPACE)
+    except Exception:
+        globals.LOGGER.exception("Failed to emit metrics")
+
+
+def create_dispatcher(context):
+    """Shards run as invocations of this function in Lambda, and on local threads without a context."""
+    from crawl_shards import InProcessDispatcher, LambdaDispatcher
+
+    function_arn = getattr(context, "invoked_function_arn", None)
+    if function_arn:
+        return LambdaDispatcher(function_arn)
+    return InProcessDispatcher(lambda_handler)
+
+
+def deadline_check(context) -> Optional[Callable[[], bool]]:
+    """Returns a check for "less than CHECKPOINT_RESERVE_SECONDS left", or None without a Lambda context."""
+    if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+        return None
+    reserve_millis = globals.CHECKPOINT_RESERVE_SECONDS * 1000
+    return lambda: context.get_remaining_time_in_millis() < reserve_millis
+
+
+def checkpoint_and_resume(
+    event, context, snapshot_store, run_id, crawl_state, previous_cursor: int
+):
+    """Stores the crawl state in S3 and invokes the function asynchronously to continue it."""
+    event = event if isinstance(event, dict) else {}
+    resume_count = (event.get("resume") or {}).get("count", 0)
+    if crawl_state["cursor"] <= previous_cursor:
+        raise RuntimeError(
+            f"Crawl made no progress before the deadline (cursor {previous_cursor}), "
+            "increase the Lambda timeout or lower CHECKPOINT_RESERVE_SECONDS."
+        )
+    if resume_count >= globals.CHECKPOINT_MAX_RESUMES:
+        raise RuntimeError(
+            f"Crawl did not finish within {globals.CHECKPOINT_MAX_RESUMES} resumes."
+        )
+    if snapshot_store.save_checkpoint(run_id, crawl_state) is None:
+        raise RuntimeError("Failed to save the crawl checkpoint.")
+
+    # Keeps the flags of the original event, e.g. full_crawl or force_render
+    payload = dict(event, resume={"run_id": run_id, "count": resume_count + 1})
+    globals.get_lambda_client().invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType="Event",
+        Payload=json.dumps(payload).encode("utf-8"),
+    )
+    globals.LOGGER.info(
+        f"Crawl {run_id} checkpointed at {crawl_state['cursor']} of {crawl_state['total']}, "
+        f"resume {resume_count + 1} invoked."
+    )
+    return {
+        "statusCode": 202,
+        "body": json.dumps(
+            {
+                "status": "checkpointed",
+                "run_id": run_id,
+                "cursor": crawl_state["cursor"],
+                "total": crawl_state["total"],
+                "resume_count": resume_count + 1,
+            }
+        ),
+    }
+
+
+def build_summary(transformed, permission_set_count: int, artifacts, timings) -> Dict:
+    """Small response body: counts, artifact keys, timings and API calls of this run."""
+    return {
+        "counts": {
+            "accounts": len(transformed["accounts"]),
+            "permission_sets": permission_set_count,
+            "assignments": sum(1 for _ in iter_assignment_keys(transformed)),
+            "users": len(transformed["principals"]["users"]),
+            "groups": len(transformed["principals"]["groups"]),
+        },
+        "bucket": globals.REPORT_BUCKET_NAME,
+        "artifacts": [artifact["key"] for artifact in artifacts if artifact.get("key")],
+        "timings": {name: round(seconds, 3) for name, seconds in timings.items()},
+        "api_calls": {
+            key: stats["calls"]
+            for key, stats in sorted(RATE_LIMITER.get_stats().items())
+        },
+        "metadata_cache": METADATA_CACHE.get_stats(),
+    }
+
+
+def render_reports(
+    transformed,
+    csv_tables=None,
+    force: bool = False,
+    previous_transformed=None,
+    effective_access=None,
+):
+    """
+    Renders the Excel report and/or the CSV files (OUTPUT_FORMATS) from a single pass over the assignments.
+    With the transformed data of the previous run, the assignment changes are rendered as well.
+    The user-centric effective access index is built from transformed unless it is given.
+
+    Rendering is skipped if the report manifest shows the same data was rendered before,
+    unless force is set or SKIP_UNCHANGED_REPORTS is disabled.
+
+    Returns the manifest entries of the uploaded artifacts, or those of the last render if skipped.
+    """
+    report_manifest = ReportManifest()
+    content_hash = compute_content_hash(transformed)
+    if (
+        globals.SKIP_UNCHANGED_REPORTS
+        and not force
+        and report_manifest.is_current(content_hash)
+    ):
+        globals.LOGGER.info(
+            f"Report data unchanged (sha256={content_hash}), skipping rendering and upload."
+        )
+        athena_partition_date = None
+        if globals.ATHENA_EXPORT:
+            from rendering.partitioned_export import current_partition_date
+
+            # Athena history queries need a partition for every day, also without changes
+            if report_manifest.get_athena_partition_date() != current_partition_date():
+                athena_partition_date = render_athena_partition(transformed)
+        report_manifest.record_skip(
+            content_hash, athena_partition_date=athena_partition_date
+        )
+        # The artifacts of the last render still describe this data
+        return report_manifest.load().get("artifacts", [])
+
+    if previous_transformed is not None:
+        diff = diff_assignments(previous_transformed, transformed)
+        globals.LOGGER.info(
+            f"Assignment changes: added={len(diff['added'])}, removed={len(diff['removed'])}"
+        )
+        AssignmentsDiffCSV(diff).render()
+
+    # Streamed to a gzip file; the Lambda response only carries its key
+    globals.UPLOAD_SERVICE.submit(
+        object_name=f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_transformed.json.gz",
+        local_file_path=globals.dump_json_gz(transformed),
+        remove_local_file=True,
+    )
+
+    # Renderers with heavy dependencies (xlsxwriter, sqlite3) are imported only when enabled,
+    # which keeps them out of the cold start of runs that do not produce their format
+    if globals.SQLITE_EXPORT:
+        from rendering.sqlite_export import SQLiteExport
+
+        SQLiteExport(transformed).render()
+
+    if effective_access is None:
+        effective_access = build_effective_access(transformed)
+    EffectiveAccessExport(transformed, effective_access).render()
+
+    unknown_formats = set(globals.OUTPUT_FORMATS) - {
+        OUTPUT_FORMAT_EXCEL,
+        OUTPUT_FORMAT_CSV,
+    }
+    if unknown_formats:
+        globals.LOGGER.warning(
+            f"Ignoring unknown OUTPUT_FORMATS {sorted(unknown_formats)}"
+        )
+    pipeline = RowPipeline(iter_assignment_rows(transformed))
+    if OUTPUT_FORMAT_EXCEL in globals.OUTPUT_FORMATS:
+        from rendering.excel_report import ExcelReport
+
+        pipeline.subscribe(ExcelReport(transformed, effective_access=effective_access))
+    if OUTPUT_FORMAT_CSV in globals.OUTPUT_FORMATS:
+        pipeline.subscribe(CSV(transformed, tables=csv_tables))
+    partitioned_export = None
+    if globals.ATHENA_EXPORT:
+        from rendering.partitioned_export import PartitionedExport
+
+        partitioned_export = pipeline.subscribe(PartitionedExport(transformed))
+    row_count = pipeline.run()
+    # The renderers only queue their uploads, so the Excel upload overlaps the CSV rendering
+    with API_METRICS.phase("upload"):
+        manifest = globals.UPLOAD_SERVICE.wait()
+    globals.LOGGER.info(f"Rendered {row_count} assignment rows")
+    for entry in manifest:
+        globals.LOGGER.info(
+            f"Uploaded {entry['key']}: size={entry['size_bytes']}, "
+            f"uploaded={entry['uploaded_bytes']}, duration={entry['duration_seconds']}s"
+        )
+    failed_uploads = [entry for entry in manifest if entry.get("url") is None]
+    if failed_uploads:
+        # Recording the hash would skip the failed artifacts until the data changes
+        globals.LOGGER.error(
+            f"{len(failed_uploads)} of {len(manifest)} uploads failed, the next run renders again."
+        )
+        report_manifest.record_failed_render(content_hash, len(failed_uploads))
+        return manifest
+    report_manifest.record_render(
+        content_hash,
+        manifest,
+        athena_partition_date=(
+            partitioned_export.partition_date if partitioned_export else None
+        ),
+    )
+    return manifest
+
 
-        reporting = ExcelReport(transformed)
-        reporting.create_excel()
+def render_event_reports(transformed, affected_outputs, previous_transformed):
+    """
+    Renders the reports after an event. The assignment changes and the CSV tables in
+    affected_outputs are rendered for every event. The outputs covering the whole tenant (Excel,
+    effective access, transformed JSON, SQLite, Athena) are rendered at most every
+    EVENT_RENDER_INTERVAL_SECONDS, so a burst of events does not render the tenant once per event;
+    skipped ones follow with a later event or the next crawl.
+
+    Returns the manifest entries of the uploaded artifacts.
+    """
+    from delta_updater import OUTPUT_ASSIGNMENTS
+
+    report_manifest = ReportManifest()
+    seconds_since_render = report_manifest.seconds_since_render()
+    if (
+        seconds_since_render is None
+        or seconds_since_render >= globals.EVENT_RENDER_INTERVAL_SECONDS
+    ):
+        return render_reports(
+            transformed,
+            csv_tables=affected_outputs,
+            previous_transformed=previous_transformed,
+        )
+
+    globals.LOGGER.info(
+        f"Last complete render {seconds_since_render:.0f}s ago, rendering only {affected_outputs}."
+    )
+    if previous_transformed is not None and OUTPUT_ASSIGNMENTS in affected_outputs:
+        AssignmentsDiffCSV(diff_assignments(previous_transformed, transformed)).render()
+    if OUTPUT_FORMAT_CSV in globals.OUTPUT_FORMATS:
+        RowPipeline(
+            iter_assignment_rows(transformed),
+            [CSV(transformed, tables=affected_outputs)],
+        ).run()
+    with API_METRICS.phase("upload"):
+        manifest = globals.UPLOAD_SERVICE.wait()
+    report_manifest.record_partial_render(compute_content_hash(transformed), manifest)
+    return manifest
+
+
+def render_athena_partition(transformed) -> str:
+    """Writes only the Athena partition of today, e.g. for a run whose report is unchanged. Returns its dt."""
+    from rendering.partitioned_export import PartitionedExport
+
+    partitioned_export = PartitionedExport(transformed)
+    RowPipeline(iter_assignment_rows(transformed), [partitioned_export]).run()
+    with API_METRICS.phase("upload"):
+        globals.UPLOAD_SERVICE.wait()
+    return partitioned_export.partition_date
+
+
+def event_handler(event, context):
+    """
+    Applies one EventBridge/CloudTrail assignment or membership event to the last transformed snapshot.
+
+    EventBridge invokes this concurrently for events close in time. The snapshot is saved only if
+    it did not change since it was loaded; otherwise the event is applied again to the newer one.
+    """
+    try:
+        API_METRICS.reset()
+        crawler_arn = os.environ.get("CRAWLER_ARN")
+        if not crawler_arn:
+            globals.LOGGER.error("Missing required environment variable: CRAWLER_ARN")
+            return {
+                "statusCode": 500,
+                "body": json.dumps({"error": "Server misconfiguration"}),
+            }
+        METADATA_CACHE.bind(crawler_role=crawler_arn)
+
+        crawler_sessions = []
+
+        def _crawler_session():
+            # Assumed once per invocation, also when the event is applied again
+            if not crawler_sessions:
+                crawler_sessions.append(
+                    globals.assume_remote_role(
+                        remote_role_arn=crawler_arn,
+                        sts_region_name=os.environ.get("AWS_REGION"),
+                    )
+                )
+            return crawler_sessions[0]
+
+        # Only event-driven invocations load the delta updater
+        from delta_updater import DeltaUpdater
+
+        snapshot_store = SnapshotStore()
+        for attempt in range(1, EVENT_UPDATE_MAX_ATTEMPTS + 1):
+            transformed, etag = snapshot_store.load_transformed_versioned()
+            if transformed is None:
+                globals.LOGGER.warning(
+                    "No transformed snapshot found, events are covered by the next full crawl."
+                )
+                return {"statusCode": 404, "body": json.dumps({"applied_events": 0})}
+
+            previous_transformed = copy.deepcopy(transformed)
+            delta_updater = DeltaUpdater(transformed, _crawler_session)
+            applied_events = 1 if delta_updater.apply_event(event) else 0
+            affected_outputs = sorted(delta_updater.affected_outputs)
+            if not affected_outputs:
+                break
+            try:
+                key = snapshot_store.save_transformed_if_unchanged(transformed, etag)
+            except SnapshotConflictError:
+                globals.LOGGER.info(
+                    f"Transformed snapshot changed concurrently, applying the event again (attempt {attempt})."
+                )
+                time.sleep(random.uniform(0, 0.2 * attempt))
+                continue
+            if key is None:
+                # E.g. AccessDenied or a boto3 without conditional writes; rendering from an unsaved
+                # snapshot would let the next event work on the old one
+                raise RuntimeError(
+                    "Failed to save the transformed snapshot, event not applied."
+                )
+            break
+        else:
+            # Failing the invocation lets EventBridge retry the event later
+            raise RuntimeError(
+                f"Transformed snapshot changed during {EVENT_UPDATE_MAX_ATTEMPTS} attempts, event not applied."
+            )
 
-        reporting_csv = CSV(transformed)
-        reporting_csv.render()
+        if affected_outputs:
+            with API_METRICS.phase("render"):
+                render_event_reports(
+                    transformed, affected_outputs, previous_transformed
+                )
 
-        return {"statusCode": 200, "body": json.dumps(transformed)}
+        return {
+            "statusCode": 200,
+            "body": json.dumps(
+                {"applied_events": applied_events, "affected_outputs": affected_outputs}
+            ),
+        }
 
     except ClientError:
         globals.LOGGER.exception("AWS client error")
@@ -85,3 +679,5 @@ def lambda_handler(event, context):
     except Exception:
         globals.LOGGER.exception("Unhandled error")
         raise
+    finally:
+        emit_metrics()
@@ -13,48 +13,143 @@ For commercial licensing, contact: contact@acai.gmbh
 """
 
 import logging
-from typing import Dict, List, Optional
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional
 
 import boto3
 import globals
+from pull_data.metadata_cache import ACCOUNTS_KEY, METADATA_CACHE
+
+
+class AccountRecord(NamedTuple):
+    id: str
+    arn: str
+    email: str
+    name: str
+    status: str
+    joined_method: str
+    joined_timestamp: Any
 
 
 class AccountWrapper:
-    def __init__(self, crawler_session: boto3.Session):
-        self._organizations_client = crawler_session.client(
-            "organizations", config=globals.BOTO3_CONFIG_SETTINGS
+    def __init__(
+        self,
+        crawler_session: boto3.Session,
+        accounts: Optional[List[Dict]] = None,
+    ):
+        """
+        Initializes the wrapper and indexes all accounts of the organization by id.
+
+        Args:
+            crawler_session (boto3.Session): Session used for the organizations client.
+            accounts (List[Dict]): Optional organizations:ListAccounts entries to index instead of loading them.
+                Without them, the accounts are loaded on first use, from seed(), METADATA_CACHE or the API.
+        """
+        self._organizations_client = globals.create_client(
+            crawler_session, "organizations"
         )
-        self.accounts: List[Dict] = []
-        self._load_accounts()
+        self._accounts_by_id: Dict[str, AccountRecord] = {}
+        # Set while the accounts come from the cache; an unknown account id then reloads them
+        self._accounts_from_cache = False
+        self._reload_lock = threading.Lock()
+        # ISO time of the ListAccounts listing the accounts come from, None if unknown
+        self.listed_at: Optional[str] = None
+        self._loaded = accounts is not None
+        for account in accounts or []:
+            self._add_account(account)
+
+    @property
+    def accounts(self) -> List[Dict]:
+        """List view of all accounts, kept for compatibility."""
+        self._ensure_loaded()
+        return [record._asdict() for record in self._accounts_by_id.values()]
+
+    # ¦ seed
+    def seed(self, accounts: Optional[List[Dict]], listed_at: Optional[str]):
+        """
+        Indexes the accounts property of an earlier wrapper, e.g. from the previous crawl, instead
+        of loading them, if their listing is younger than the METADATA_CACHE TTL. Like cached
+        accounts, an unknown account id loads the listing again.
+        """
+        with self._reload_lock:
+            if self._loaded or not accounts or not METADATA_CACHE.is_fresh(listed_at):
+                return
+            logging.info(f"Reusing {len(accounts)} accounts of the previous crawl.")
+            for account in accounts:
+                record = AccountRecord(**account)
+                self._accounts_by_id[record.id] = record
+            self._accounts_from_cache = True
+            self.listed_at = listed_at
+            self._loaded = True
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._reload_lock:
+            if not self._loaded:
+                self._load_accounts()
+                self._loaded = True
+
+    def _load_accounts(self, use_cache: bool = True):
+        cached_accounts = METADATA_CACHE.get(ACCOUNTS_KEY) if use_cache else None
+        if cached_accounts is not None:
+            logging.info(f"Reusing {len(cached_accounts)} cached accounts.")
+            for account in cached_accounts:
+                self._add_account(account)
+            self._accounts_from_cache = True
+            self.listed_at = None
+            return
 
-    def _load_accounts(self):
         logging.info(
             "Loading all active accounts with organizations:ListAccounts API call."
         )
 
+        accounts = []
         paginator = self._organizations_client.get_paginator("list_accounts")
         for page in paginator.paginate():
             for account in page.get("Accounts", []):
+                accounts.append(account)
                 self._add_account(account)
+        METADATA_CACHE.put(ACCOUNTS_KEY, accounts, weight=len(accounts))
+        self.listed_at = datetime.now(timezone.utc).isoformat()
+
+    def _reload_accounts(self):
+        with self._reload_lock:
+            if not self._accounts_from_cache:
+                return
+            logging.info(
+                "Account not in the cached listing, loading the accounts again."
+            )
+            self._accounts_from_cache = False
+            self._load_accounts(use_cache=False)
 
     def _add_account(self, account_info: Dict):
-        account_entry = {
-            "id": account_info["Id"],
-            "arn": account_info["Arn"],
-            "email": account_info["Email"],
-            "name": account_info["Name"],
-            "status": account_info["Status"],
-            "joined_method": account_info["JoinedMethod"],
-            "joined_timestamp": account_info["JoinedTimestamp"],
-        }
-        if account_entry not in self.accounts:
-            self.accounts.append(account_entry)
+        if account_info["Id"] in self._accounts_by_id:
+            return
+        self._accounts_by_id[account_info["Id"]] = AccountRecord(
+            id=account_info["Id"],
+            arn=account_info["Arn"],
+            email=account_info["Email"],
+            name=account_info["Name"],
+            status=account_info["Status"],
+            joined_method=account_info["JoinedMethod"],
+            joined_timestamp=account_info["JoinedTimestamp"],
+        )
+
+    def get_account_record_by_id(self, account_id: str) -> Optional[AccountRecord]:
+        self._ensure_loaded()
+        record = self._accounts_by_id.get(account_id)
+        if record is None and self._accounts_from_cache:
+            # Created after the cached listing
+            self._reload_accounts()
+            record = self._accounts_by_id.get(account_id)
+        return record
 
     def get_account_entry_by_id(self, account_id: str) -> Optional[Dict]:
-        return next(
-            (account for account in self.accounts if account["id"] == account_id), None
-        )
+        record = self.get_account_record_by_id(account_id)
+        return record._asdict() if record else None
 
     def get_account_name_by_id(self, account_id: str) -> Optional[str]:
-        account_entry = self.get_account_entry_by_id(account_id)
-        return account_entry["name"] if account_entry else None
+        record = self.get_account_record_by_id(account_id)
+        return record.name if record else None
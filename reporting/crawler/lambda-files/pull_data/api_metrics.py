@@ -0,0 +1,257 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from botocore import xform_name
+
+THROTTLING_ERROR_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "SlowDown",
+}
+# CloudWatch accepts at most 100 metrics per EMF record
+EMF_MAX_METRICS = 100
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(percent / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class ApiMetrics:
+    def __init__(self):
+        """
+        Per-operation API call statistics collected through botocore event hooks, and wall
+        time per phase of a run. Shared by all wrapper clients and worker threads.
+        """
+        self._lock = threading.Lock()
+        self._operations: Dict[str, Dict] = {}
+        self._phases: Dict[str, float] = {}
+
+    # ¦ attach
+    def attach(self, boto3_client):
+        """Records every API call of the client, including paginator pages and retries."""
+        service_name = boto3_client.meta.service_model.service_name
+        paginated_operations = {}
+
+        def _is_paginated(operation_name: str) -> bool:
+            if operation_name not in paginated_operations:
+                paginated_operations[operation_name] = boto3_client.can_paginate(
+                    xform_name(operation_name)
+                )
+            return paginated_operations[operation_name]
+
+        def _before_call(model, context, **kwargs):
+            context["api_metrics_started"] = time.perf_counter()
+
+        def _after_call(http_response, parsed, model, context, **kwargs):
+            parsed = parsed or {}
+            retries = parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+            # Service errors, e.g. AccessDenied or exhausted throttling retries, arrive here
+            # as parsed responses; botocore raises the ClientError only afterwards
+            status_code = getattr(http_response, "status_code", 200)
+            self._record(
+                f"{service_name}:{model.name}",
+                latency=self._elapsed(context),
+                page=_is_paginated(model.name),
+                retries=retries,
+                error=bool(parsed.get("Error")) or status_code >= 400,
+            )
+
+        def _after_call_error(context, event_name, **kwargs):
+            # Transport errors only; botocore passes no operation model with this event
+            self._record(
+                f"{service_name}:{event_name.rsplit('.', 1)[-1]}",
+                latency=self._elapsed(context),
+                error=True,
+            )
+
+        def _needs_retry(response, operation, **kwargs):
+            # Called for every attempt; only looks at the response and leaves the decision to botocore
+            if response is not None:
+                error_code = (response[1] or {}).get("Error", {}).get("Code")
+                if error_code in THROTTLING_ERROR_CODES:
+                    self._count(f"{service_name}:{operation.name}", "throttles")
+
+        events = boto3_client.meta.events
+        events.register("before-call.*.*", _before_call)
+        events.register("after-call.*.*", _after_call)
+        events.register("after-call-error.*.*", _after_call_error)
+        events.register_first("needs-retry.*.*", _needs_retry)
+        return boto3_client
+
+    def _elapsed(self, context: Dict) -> Optional[float]:
+        started = context.get("api_metrics_started")
+        return None if started is None else time.perf_counter() - started
+
+    def _operation(self, key: str) -> Dict:
+        return self._operations.setdefault(
+            key,
+            {
+                "calls": 0,
+                "pages": 0,
+                "retries": 0,
+                "throttles": 0,
+                "errors": 0,
+                "latencies": [],
+            },
+        )
+
+    def _record(
+        self,
+        key: str,
+        latency: Optional[float],
+        page: bool = False,
+        retries: int = 0,
+        error: bool = False,
+    ):
+        with self._lock:
+            operation = self._operation(key)
+            operation["calls"] += 1
+            operation["pages"] += 1 if page else 0
+            operation["retries"] += retries
+            operation["errors"] += 1 if error else 0
+            if latency is not None:
+                operation["latencies"].append(latency)
+
+    def _count(self, key: str, counter: str):
+        with self._lock:
+            self._operation(key)[counter] += 1
+
+    # ¦ phase
+    @contextmanager
+    def phase(self, name: str):
+        """Adds the wall time of the with-block to the named phase."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._phases[name] = (
+                    self._phases.get(name, 0.0) + time.perf_counter() - started
+                )
+
+    # ¦ get_phases
+    def get_phases(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._phases)
+
+    # ¦ get_stats
+    def get_stats(self) -> Dict[str, Dict]:
+        """Per "<service>:<Operation>" counters and latency percentiles in milliseconds."""
+        with self._lock:
+            operations = {
+                key: dict(operation, latencies=sorted(operation["latencies"]))
+                for key, operation in self._operations.items()
+            }
+        stats = {}
+        for key, operation in sorted(operations.items()):
+            latencies = operation.pop("latencies")
+            operation.update(
+                {
+                    f"latency_{name}_ms": round(
+                        _percentile(latencies, percent) * 1000, 2
+                    )
+                    for name, percent in [("p50", 50), ("p90", 90), ("p99", 99)]
+                }
+            )
+            operation["latency_max_ms"] = round(
+                (latencies[-1] if latencies else 0.0) * 1000, 2
+            )
+            stats[key] = operation
+        return stats
+
+    # ¦ reset
+    def reset(self):
+        with self._lock:
+            self._operations = {}
+            self._phases = {}
+
+    # ¦ build_emf_record
+    def build_emf_record(
+        self, namespace: str, timestamp: Optional[float] = None
+    ) -> Dict:
+        """
+        Returns one CloudWatch Embedded Metric Format record of this run.
+
+        Metric names are "<service>:<Operation>.<Counter>" and "Phase.<name>", so one record with
+        the single FunctionName dimension holds all operations. The full statistics are kept as
+        properties of the record for Logs Insights.
+        """
+        stats = self.get_stats()
+        record = {}
+        metrics = []
+
+        def _add(name: str, value, unit: str):
+            record[name] = value
+            metrics.append({"Name": name, "Unit": unit})
+
+        for name, seconds in sorted(self.get_phases().items()):
+            _add(f"Phase.{name}", round(seconds * 1000, 2), "Milliseconds")
+        for key, operation in stats.items():
+            _add(f"{key}.Calls", operation["calls"], "Count")
+            if operation["pages"]:
+                _add(f"{key}.Pages", operation["pages"], "Count")
+            _add(f"{key}.Retries", operation["retries"], "Count")
+            _add(f"{key}.Throttles", operation["throttles"], "Count")
+            _add(f"{key}.Errors", operation["errors"], "Count")
+            _add(f"{key}.LatencyP50", operation["latency_p50_ms"], "Milliseconds")
+            _add(f"{key}.LatencyP99", operation["latency_p99_ms"], "Milliseconds")
+        if len(metrics) > EMF_MAX_METRICS:
+            logging.warning(
+                f"Only the first {EMF_MAX_METRICS} of {len(metrics)} metrics are published."
+            )
+            metrics = metrics[:EMF_MAX_METRICS]
+
+        record.update(
+            {
+                "_aws": {
+                    "Timestamp": int((timestamp or time.time()) * 1000),
+                    "CloudWatchMetrics": [
+                        {
+                            "Namespace": namespace,
+                            "Dimensions": [["FunctionName"]],
+                            "Metrics": metrics,
+                        }
+                    ],
+                },
+                "FunctionName": os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local"),
+                "api_operations": stats,
+            }
+        )
+        return record
+
+    # ¦ emit
+    def emit(self, namespace: str):
+        """Prints the EMF record; the Lambda runtime forwards stdout to CloudWatch Logs."""
+        print(json.dumps(self.build_emf_record(namespace), separators=(",", ":")))
+
+
+# Module-level so every client, thread and warm invocation reports into the same place
+API_METRICS = ApiMetrics()
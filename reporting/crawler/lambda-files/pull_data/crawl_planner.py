@@ -0,0 +1,156 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import logging
+import math
+from typing import Dict, List, NamedTuple, Optional
+
+STRATEGY_AUTO = "auto"
+STRATEGY_PER_PAIR = "per_pair"
+STRATEGY_PER_PRINCIPAL = "per_principal"
+
+# Page size of sso-admin ListAccountAssignments(ForPrincipal)
+ASSIGNMENTS_PAGE_SIZE = 100
+
+
+class CrawlPlan(NamedTuple):
+    strategy: str
+    permission_set_count: int
+    provisioned_account_count: int
+    pair_count: int
+    principal_count: int
+    estimated_calls: Dict[str, int]
+
+
+def count_assignments(permission_sets: Optional[Dict]) -> Optional[Dict[str, int]]:
+    """
+    Counts the direct assignments of every principal in crawled permission sets, e.g. those of
+    the previous crawl. None if they hold no assignments.
+    """
+    counts: Dict[str, int] = {}
+    crawled = False
+    for permission_set_info in (permission_sets or {}).values():
+        for account_info in permission_set_info.get("accounts", []):
+            assignments = account_info.get("assignments")
+            if assignments is None:
+                continue
+            crawled = True
+            for principal_id in assignments.get("users", []) + assignments.get(
+                "groups", []
+            ):
+                counts[principal_id] = counts.get(principal_id, 0) + 1
+    return counts if crawled else None
+
+
+class CrawlPlanner:
+    def __init__(self, page_size: int = ASSIGNMENTS_PAGE_SIZE):
+        self.page_size = page_size
+
+    # ¦ plan
+    def plan(
+        self,
+        permission_set_count: int,
+        provisioned_account_ids: List[str],
+        principals: Dict[str, List[str]],
+        requested_strategy: Optional[str] = None,
+        group_members: Optional[Dict[str, List[str]]] = None,
+        assignment_counts: Optional[Dict[str, int]] = None,
+    ) -> CrawlPlan:
+        """
+        Estimates the API calls of both assignment listing strategies and picks the cheaper one.
+
+        Args:
+            permission_set_count (int): Number of permission sets in scope.
+            provisioned_account_ids (List[str]): Account id of every (permission set, account) pair.
+            principals (Dict[str, List[str]]): User and group ids of the identity store.
+            requested_strategy (str): Forces a strategy unless None or "auto".
+            group_members (Dict[str, List[str]]): User ids of known groups. Without them every
+                user is assumed to inherit the assignments of every group.
+            assignment_counts (Dict[str, int]): Direct assignments per principal, e.g. from
+                count_assignments() of the previous crawl. Without them one assignment per pair
+                is spread evenly over the principals.
+
+        Returns:
+            CrawlPlan: The chosen strategy and the figures the decision is based on.
+        """
+        pair_count = len(provisioned_account_ids)
+        principal_count = len(principals.get("users", [])) + len(
+            principals.get("groups", [])
+        )
+        estimated_calls = {
+            # One ListAccountAssignments call per pair
+            STRATEGY_PER_PAIR: pair_count,
+            STRATEGY_PER_PRINCIPAL: self._estimate_per_principal_calls(
+                pair_count, principals, group_members, assignment_counts
+            ),
+        }
+
+        if requested_strategy in estimated_calls:
+            strategy = requested_strategy
+            reason = "requested"
+        else:
+            strategy = min(estimated_calls, key=estimated_calls.get)
+            reason = "cheapest"
+
+        plan = CrawlPlan(
+            strategy=strategy,
+            permission_set_count=permission_set_count,
+            provisioned_account_count=len(set(provisioned_account_ids)),
+            pair_count=pair_count,
+            principal_count=principal_count,
+            estimated_calls=estimated_calls,
+        )
+        logging.info(
+            f"Crawl plan: strategy={strategy} ({reason}), permission_sets={plan.permission_set_count}, "
+            f"provisioned_accounts={plan.provisioned_account_count}, pairs={pair_count}, "
+            f"principals={principal_count}, estimated_calls={estimated_calls}"
+        )
+        return plan
+
+    def _estimate_per_principal_calls(
+        self,
+        pair_count: int,
+        principals: Dict[str, List[str]],
+        group_members: Optional[Dict[str, List[str]]],
+        assignment_counts: Optional[Dict[str, int]],
+    ) -> int:
+        """
+        One ListAccountAssignmentsForPrincipal page per principal and started page size of its
+        entries. The pages of a user also hold the assignments inherited from its groups, which
+        the crawl discards but still pages through.
+        """
+        user_ids = principals.get("users", [])
+        group_ids = principals.get("groups", [])
+        if assignment_counts is None:
+            # At least one assignment per pair
+            average = pair_count / max(1, len(user_ids) + len(group_ids))
+            direct = {principal_id: average for principal_id in user_ids + group_ids}
+        else:
+            direct = assignment_counts
+
+        user_entries = {user_id: direct.get(user_id, 0) for user_id in user_ids}
+        if group_members is None:
+            inherited = sum(direct.get(group_id, 0) for group_id in group_ids)
+            for user_id in user_entries:
+                user_entries[user_id] += inherited
+        else:
+            for group_id in group_ids:
+                for user_id in group_members.get(group_id, []):
+                    if user_id in user_entries:
+                        user_entries[user_id] += direct.get(group_id, 0)
+
+        entries = list(user_entries.values()) + [
+            direct.get(group_id, 0) for group_id in group_ids
+        ]
+        return sum(max(1, math.ceil(count / self.page_size)) for count in entries)
@@ -13,32 +13,67 @@ For commercial licensing, contact: contact@acai.gmbh
 """
 
 import logging
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
 
 import boto3
 import globals
+from pull_data.metadata_cache import METADATA_CACHE, group_key, users_key
+
+GROUP_RESOLUTION_LAZY = "lazy"
+GROUP_RESOLUTION_PREFETCH = "prefetch"
 
 
 class IdentitystoreWrapper:
-    def __init__(self, crawler_session: boto3.Session, identitystore_id: str):
+    def __init__(
+        self,
+        crawler_session: boto3.Session,
+        identitystore_id: str,
+        group_resolution: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        previous_cache: Optional[Dict] = None,
+        previous_users_listed_at: Optional[str] = None,
+    ):
         """
         Initializes the wrapper with a boto3 Identity Store client and store ID.
 
         Args:
-            boto3_identitystore_client: The boto3 client for AWS Identity Store.
+            crawler_session (boto3.Session): Session used for the Identity Store client.
             identitystore_id (str): The ID of the AWS Identity Store.
+            group_resolution (str): "lazy" expands only groups passed to resolve_groups,
+                "prefetch" expands every group of the store in fill_cache.
+            max_workers (int): Number of groups expanded concurrently.
+            previous_cache (Dict): Cache of the previous crawl; group details are reused from it,
+                memberships are always listed again.
+            previous_users_listed_at (str): ISO time the users of previous_cache were listed; they
+                are reused like cached users while the listing is younger than the METADATA_CACHE TTL.
+
+        Users and group details listed by an earlier invocation of a warm container are reused
+        from METADATA_CACHE; group memberships are always listed.
         """
-        self._identitystore_client = crawler_session.client(
-            "identitystore", config=globals.BOTO3_CONFIG_SETTINGS
+        self.max_workers = max(1, max_workers or globals.CRAWLER_MAX_WORKERS)
+        self._identitystore_client = globals.create_client(
+            crawler_session, "identitystore", max_pool_connections=self.max_workers
         )
         self._identitystore_id = identitystore_id
+        self.group_resolution = group_resolution or globals.GROUP_RESOLUTION
         self.cache = {"users": {}, "groups": {}}
+        self._group_ids: Optional[List[str]] = None
+        # Set while the users come from the cache, which may miss users created since
+        self._users_from_cache = False
+        self._previous_groups = (previous_cache or {}).get("groups", {})
+        self._previous_users = (previous_cache or {}).get("users", {})
+        self._previous_users_listed_at = previous_users_listed_at
+        # ISO time of the ListUsers listing the users come from, None if unknown
+        self.users_listed_at: Optional[str] = None
 
     # ¦ fill_cache
     def fill_cache(self):
         logging.info("Pre-populating users and groups cache.")
         self._fill_user_cache()
-        self._fill_group_cache()
+        if self.group_resolution == GROUP_RESOLUTION_PREFETCH:
+            self._fill_group_cache()
 
     # region user_info
     # ¦ get_user_info
@@ -58,7 +93,7 @@ class IdentitystoreWrapper:
                 IdentityStoreId=self._identitystore_id, UserId=user_id
             )
             self.cache["users"][user_id] = self._extract_user_info(user_info_boto3)
-            return user_info
+            return self.cache["users"][user_id]
         except Exception as e:
             logging.error(f"Error fetching user {user_id}: {e}")
             return user_info
@@ -70,22 +105,52 @@ class IdentitystoreWrapper:
         }
 
     # ¦ _fill_user_cache
-    def _fill_user_cache(self):
+    def _fill_user_cache(self, use_cache: bool = True):
+        cached_users = (
+            METADATA_CACHE.get(users_key(self._identitystore_id)) if use_cache else None
+        )
+        if cached_users is not None:
+            logging.info(f"Reusing {len(cached_users)} cached users.")
+            self.cache["users"].update(cached_users)
+            self._users_from_cache = True
+            self.users_listed_at = None
+            return
+        if (
+            use_cache
+            and self._previous_users
+            and METADATA_CACHE.is_fresh(self._previous_users_listed_at)
+        ):
+            logging.info(
+                f"Reusing {len(self._previous_users)} users of the previous crawl."
+            )
+            self.cache["users"].update(self._previous_users)
+            self._users_from_cache = True
+            self.users_listed_at = self._previous_users_listed_at
+            return
+
         logging.info("Fetching all users.")
+        self._users_from_cache = False
+        users = {}
         try:
             paginator = self._identitystore_client.get_paginator("list_users")
             for page in paginator.paginate(IdentityStoreId=self._identitystore_id):
                 for user in page["Users"]:
-                    self.cache["users"][user["UserId"]] = self._extract_user_info(user)
+                    users[user["UserId"]] = self._extract_user_info(user)
+            # Only a complete listing is cached
+            METADATA_CACHE.put(
+                users_key(self._identitystore_id), dict(users), weight=len(users)
+            )
+            self.users_listed_at = datetime.now(timezone.utc).isoformat()
         except Exception as e:
             logging.error(f"Failed to fetch users: {e}")
+        self.cache["users"].update(users)
 
     # endregion
 
     # region group_info
     # ¦ get_group_info
     def get_group_info(self, group_id: str) -> Optional[Dict]:
-        group_info = {"display_name": "n/a", "user_ids": [], "external_ids": []}
+        group_info = {"display_name": "n/a", "assigned_users": [], "external_ids": []}
         if not isinstance(group_id, str):
             logging.error(
                 f"Expected string for group_id, got {type(group_id)}: {group_id}"
@@ -95,6 +160,18 @@ class IdentitystoreWrapper:
         if group_id in self.cache["groups"]:
             return self.cache["groups"][group_id]
 
+        previous_group_info = METADATA_CACHE.get(
+            group_key(self._identitystore_id, group_id)
+        ) or self._previous_groups.get(group_id)
+        if previous_group_info is not None:
+            group_info = {
+                "display_name": previous_group_info.get("display_name"),
+                "assigned_users": self._list_group_memberships(group_id),
+                "external_ids": previous_group_info.get("external_ids", []),
+            }
+            self.cache["groups"][group_id] = group_info
+            return group_info
+
         try:
             response = self._identitystore_client.describe_group(
                 IdentityStoreId=self._identitystore_id, GroupId=group_id
@@ -103,6 +180,13 @@ class IdentitystoreWrapper:
                 {"issuer": external_id.get("Issuer"), "id": external_id.get("Id")}
                 for external_id in response.get("ExternalIds", [])
             ]
+            METADATA_CACHE.put(
+                group_key(self._identitystore_id, group_id),
+                {
+                    "display_name": response.get("DisplayName"),
+                    "external_ids": external_ids_transformed,
+                },
+            )
             group_info = {
                 "display_name": response.get("DisplayName"),
                 "assigned_users": self._list_group_memberships(group_id),
@@ -114,16 +198,98 @@ class IdentitystoreWrapper:
             logging.error(f"Error fetching group {group_id}: {e}")
             return group_info
 
+    # ¦ resolve_groups
+    def resolve_groups(self, group_ids: Iterable[str]):
+        """Expands details and memberships of the given groups that are not cached yet, concurrently."""
+        pending_group_ids = [
+            group_id
+            for group_id in dict.fromkeys(group_ids)
+            if isinstance(group_id, str) and group_id not in self.cache["groups"]
+        ]
+        if not pending_group_ids:
+            return
+
+        logging.info(
+            f"Resolving {len(pending_group_ids)} groups with {self.max_workers} workers."
+        )
+        if self.max_workers == 1:
+            for group_id in pending_group_ids:
+                self.get_group_info(group_id)
+            return
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="groups"
+        ) as executor:
+            # get_group_info handles its own errors and stores the result in the cache
+            list(executor.map(self.get_group_info, pending_group_ids))
+
+    # ¦ list_group_ids
+    def list_group_ids(self) -> List[str]:
+        """Lists the ids of all groups of the store; the listing is done once per wrapper."""
+        if self._group_ids is None:
+            logging.info("Fetching all groups.")
+            group_ids = []
+            try:
+                paginator = self._identitystore_client.get_paginator("list_groups")
+                for page in paginator.paginate(IdentityStoreId=self._identitystore_id):
+                    for group in page["Groups"]:
+                        group_ids.append(group["GroupId"])
+            except Exception as e:
+                logging.error(f"Failed to fetch groups: {e}")
+            self._group_ids = group_ids
+        return self._group_ids
+
+    # ¦ list_principal_ids
+    def list_principal_ids(self) -> Dict[str, List[str]]:
+        """
+        Returns the ids of all users (from the filled cache) and groups of the store.
+
+        Users reused from METADATA_CACHE are not listed again; users created since are picked up
+        once the entry expires or refresh_users() lists them again.
+        """
+        return {
+            "users": list(self.cache["users"].keys()),
+            "groups": self.list_group_ids(),
+        }
+
+    # ¦ refresh_users
+    def refresh_users(self):
+        """Lists the users again if they were reused (METADATA_CACHE or previous crawl), e.g. after a reused user was not found."""
+        if not self._users_from_cache:
+            return
+        logging.info("Cached users are outdated, listing them again.")
+        METADATA_CACHE.invalidate(users_key(self._identitystore_id))
+        self.cache["users"] = {}
+        self._fill_user_cache(use_cache=False)
+
+    # ¦ known_group_members
+    def known_group_members(self) -> Optional[Dict[str, List[str]]]:
+        """
+        Returns the members of the groups resolved so far or by the previous crawl, without API
+        calls, e.g. for the crawl planner. None if no memberships are known.
+        """
+        group_members = {
+            group_id: group_info.get("assigned_users", [])
+            for group_id, group_info in self._previous_groups.items()
+        }
+        for group_id, group_info in self.cache["groups"].items():
+            group_members[group_id] = group_info.get("assigned_users", [])
+        return group_members or None
+
+    # ¦ forget_user
+    def forget_user(self, user_id: str):
+        """Drops the user from this wrapper and the metadata cache, e.g. after an UpdateUser event."""
+        self.cache["users"].pop(user_id, None)
+        METADATA_CACHE.invalidate(users_key(self._identitystore_id))
+
+    # ¦ forget_group
+    def forget_group(self, group_id: str):
+        """Drops the group from this wrapper and the metadata cache, e.g. after an UpdateGroup event."""
+        self.cache["groups"].pop(group_id, None)
+        METADATA_CACHE.invalidate(group_key(self._identitystore_id, group_id))
+
     # ¦ _fill_group_cache
     def _fill_group_cache(self):
-        logging.info("Fetching all groups.")
-        try:
-            paginator = self._identitystore_client.get_paginator("list_groups")
-            for page in paginator.paginate(IdentityStoreId=self._identitystore_id):
-                for group in page["Groups"]:
-                    self.get_group_info(group["GroupId"])
-        except Exception as e:
-            logging.error(f"Failed to fetch groups: {e}")
+        self.resolve_groups(self.list_group_ids())
 
     # ¦ _list_group_memberships
     def _list_group_memberships(self, group_id: str) -> List[str]:
@@ -0,0 +1,178 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Slowly changing metadata is reused across warm invocations for this long (0 disables the cache)
+DEFAULT_TTL_SECONDS = 4 * 3600
+# Upper bound of the cached items (accounts, users, permission sets, groups) over all entries
+DEFAULT_MAX_ITEMS = 250000
+
+# organizations:ListAccounts entries of the organization
+ACCOUNTS_KEY = ("organizations", "accounts")
+
+
+def permission_set_key(permission_set_arn: str) -> Tuple[str, ...]:
+    return ("sso-admin", "permission_set", permission_set_arn)
+
+
+def users_key(identitystore_id: str) -> Tuple[str, ...]:
+    return ("identitystore", "users", identitystore_id)
+
+
+def group_key(identitystore_id: str, group_id: str) -> Tuple[str, ...]:
+    return ("identitystore", "group", identitystore_id, group_id)
+
+
+class MetadataCache:
+    def __init__(self, ttl_seconds: float, max_items: int):
+        """
+        Thread-safe LRU cache with a time to live, for metadata that outlives one invocation.
+
+        Entries are bound to a scope, e.g. the crawler role and the Identity Center instance.
+        Binding a different value for any scope key drops all entries.
+
+        Args:
+            ttl_seconds (float): Age after which an entry is no longer returned.
+            max_items (int): Sum of the entry weights after which least recently used entries are evicted.
+        """
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_items = int(max_items)
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._items = 0
+        self._scope: Dict[str, str] = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_items > 0
+
+    # ¦ is_fresh
+    def is_fresh(self, listed_at: Optional[str]) -> bool:
+        """
+        True if a listing made at listed_at (ISO timestamp), e.g. one stored with the previous crawl,
+        is younger than the TTL and may be reused like a cache entry.
+        """
+        if not self.enabled or not listed_at:
+            return False
+        try:
+            age = datetime.now(timezone.utc) - datetime.fromisoformat(listed_at)
+        except ValueError:
+            return False
+        return age.total_seconds() < self.ttl_seconds
+
+    # ¦ bind
+    def bind(self, **scope: Optional[str]):
+        """Sets scope values; entries cached under a different value of a key are dropped."""
+        with self._lock:
+            for key, value in scope.items():
+                previous = self._scope.get(key)
+                if previous is not None and previous != value:
+                    logging.info(
+                        f"Metadata cache scope {key} changed, dropping {len(self._entries)} entries."
+                    )
+                    self._clear()
+                self._scope[key] = value
+
+    # ¦ get
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Returns the cached value, or None if it is missing or older than the TTL."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not self.enabled:
+                self._stats["misses"] += 1
+                return None
+            expires_at, weight, value = entry
+            if time.monotonic() >= expires_at:
+                self._remove(key)
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    # ¦ put
+    def put(self, key: Hashable, value: Any, weight: int = 1):
+        """
+        Caches the value, which must not be modified afterwards.
+
+        Args:
+            weight (int): Number of items the value holds, e.g. len() of a list of accounts.
+        """
+        weight = max(1, weight)
+        if not self.enabled or weight > self.max_items:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, weight, value)
+            self._items += weight
+            while self._items > self.max_items:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    # ¦ invalidate
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self._stats["invalidations"] += 1
+
+    # ¦ clear
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    # ¦ get_stats
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), items=self._items)
+
+    # ¦ reset_stats
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {key: 0 for key in self._stats}
+
+    def _remove(self, key: Hashable):
+        _, weight, _ = self._entries.pop(key)
+        self._items -= weight
+
+    def _clear(self):
+        self._entries.clear()
+        self._items = 0
+
+
+def _load_setting(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logging.error(f"Ignoring invalid {name} '{value}'.")
+        return default
+
+
+# Module-level so the entries survive between invocations of a warm Lambda container
+METADATA_CACHE = MetadataCache(
+    ttl_seconds=_load_setting("METADATA_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS),
+    max_items=int(_load_setting("METADATA_CACHE_MAX_ITEMS", DEFAULT_MAX_ITEMS)),
+)
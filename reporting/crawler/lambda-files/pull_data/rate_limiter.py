@@ -0,0 +1,155 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+# Requests per second, kept slightly below the documented service quotas.
+# Keys are either "<service>" (one bucket shared by all operations of the service)
+# or "<service>:<Operation>" (a dedicated bucket for that operation).
+DEFAULT_RATE_LIMITS = {
+    "sso-admin": 18.0,
+    "identitystore": 18.0,
+    "organizations": 8.0,
+}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Thread-safe token bucket.
+
+        Args:
+            rate (float): Tokens refilled per second.
+            burst (float): Bucket capacity, defaults to one second worth of tokens.
+        """
+        self.rate = float(rate)
+        self.capacity = float(burst) if burst else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    # ¦ acquire
+    def acquire(self) -> float:
+        """Takes one token, sleeping until it is available. Returns the seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            # Reserve the token right away so concurrent callers queue up behind each other
+            self._tokens -= 1.0
+            wait_seconds = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+        return wait_seconds
+
+
+class RateLimiter:
+    def __init__(self, rate_limits: Dict[str, float]):
+        """
+        Per-API rate limiter shared by all wrapper clients and worker threads.
+
+        Args:
+            rate_limits (Dict[str, float]): TPS per "<service>" or "<service>:<Operation>".
+        """
+        self._rate_limits = dict(rate_limits)
+        self._share = 1.0
+        self._buckets = self._create_buckets(self._share)
+        self._stats: Dict[str, Dict] = {}
+        self._stats_lock = threading.Lock()
+
+    def _create_buckets(self, share: float) -> Dict[str, TokenBucket]:
+        return {
+            key: TokenBucket(tps * share)
+            for key, tps in self._rate_limits.items()
+            if tps and tps > 0
+        }
+
+    # ¦ set_share
+    def set_share(self, share: float):
+        """
+        Scales all rate limits to the given share of the configured TPS, e.g. 1/n when n
+        processes crawl the same tenant. The buckets are only replaced if the share changes.
+        """
+        if share != self._share:
+            self._share = share
+            self._buckets = self._create_buckets(share)
+
+    # ¦ attach
+    def attach(self, boto3_client):
+        """Routes every API call of the client (including paginator pages) through the limiter."""
+        service_name = boto3_client.meta.service_model.service_name
+
+        def _before_call(model, **kwargs):
+            self.acquire(service_name, model.name)
+
+        boto3_client.meta.events.register("before-call.*.*", _before_call)
+        return boto3_client
+
+    # ¦ acquire
+    def acquire(self, service_name: str, operation_name: str) -> float:
+        key = f"{service_name}:{operation_name}"
+        bucket = self._buckets.get(key) or self._buckets.get(service_name)
+        wait_seconds = bucket.acquire() if bucket else 0.0
+
+        with self._stats_lock:
+            stats = self._stats.setdefault(
+                key, {"calls": 0, "waited_seconds": 0.0, "max_wait_seconds": 0.0}
+            )
+            stats["calls"] += 1
+            stats["waited_seconds"] += wait_seconds
+            stats["max_wait_seconds"] = max(stats["max_wait_seconds"], wait_seconds)
+        return wait_seconds
+
+    # ¦ get_stats
+    def get_stats(self) -> Dict[str, Dict]:
+        with self._stats_lock:
+            return {key: dict(stats) for key, stats in self._stats.items()}
+
+    # ¦ reset_stats
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = {}
+
+    # ¦ log_stats
+    def log_stats(self):
+        for key, stats in sorted(self.get_stats().items()):
+            logging.info(
+                f"Rate limiter {key}: calls={stats['calls']}, "
+                f"waited={stats['waited_seconds']:.2f}s, max_wait={stats['max_wait_seconds']:.3f}s"
+            )
+
+
+def _load_rate_limits() -> Dict[str, float]:
+    rate_limits = dict(DEFAULT_RATE_LIMITS)
+    overrides = os.environ.get("API_RATE_LIMITS")
+    if overrides:
+        try:
+            rate_limits.update(
+                {key: float(tps) for key, tps in json.loads(overrides).items()}
+            )
+        except (ValueError, TypeError, AttributeError) as e:
+            logging.error(f"Ignoring invalid API_RATE_LIMITS '{overrides}': {e}")
+    return rate_limits
+
+
+# Module-level so the buckets are shared by every client, thread and warm invocation
+RATE_LIMITER = RateLimiter(_load_rate_limits())
@@ -13,25 +13,51 @@ For commercial licensing, contact: contact@acai.gmbh
 """
 
 import logging
-from typing import Dict, List, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
 
 import globals  # Ensure this contains BOTO3_CONFIG_SETTINGS
 from boto3.session import Session
+from botocore.exceptions import ClientError
 from pull_data.account_wrapper import AccountWrapper
+from pull_data.crawl_planner import (
+    STRATEGY_PER_PAIR,
+    STRATEGY_PER_PRINCIPAL,
+    CrawlPlanner,
+    count_assignments,
+)
+from pull_data.metadata_cache import METADATA_CACHE, permission_set_key
 
 
 class SsoAdminWrapper:
     def __init__(
-        self, crawler_session: Session, sso_admin_instance: Optional[Dict] = None
+        self,
+        crawler_session: Session,
+        sso_admin_instance: Optional[Dict] = None,
+        max_workers: Optional[int] = None,
+        accounts: Optional[List[Dict]] = None,
     ):
-        self.account_wrapper = AccountWrapper(crawler_session)
-        self._sso_client = crawler_session.client(
-            "sso-admin", config=globals.BOTO3_CONFIG_SETTINGS
+        self.max_workers = max(1, max_workers or globals.CRAWLER_MAX_WORKERS)
+        # One client (and connection pool) is shared by all crawl workers
+        self._sso_client = globals.create_client(
+            crawler_session, "sso-admin", max_pool_connections=self.max_workers
         )
+        self.failed_assignment_pairs: List[Tuple[str, str]] = []
+        self.failed_principals: List[Tuple[str, str]] = []
+        # Principals the per-principal crawl found deleted since their ids were listed
+        self.missing_principals: List[Tuple[str, str]] = []
+        self.crawl_plan = None
+        # Set by get_assignments(); the checkpoint is only set if the crawl was stopped early
+        self.crawl_complete = True
+        self.checkpoint: Optional[Dict] = None
 
         self.instance_arn, self.identitystore_id = self._initialize_instance(
             sso_admin_instance
         )
+        # Cached metadata of another instance must not be reused, so bind before loading accounts
+        METADATA_CACHE.bind(instance_arn=self.instance_arn)
+        # accounts: organizations:ListAccounts entries to use instead of loading them
+        self.account_wrapper = AccountWrapper(crawler_session, accounts=accounts)
 
     # ¦ _initialize_instance
     def _initialize_instance(self, instance: Optional[Dict]) -> Tuple[str, str]:
@@ -51,10 +77,55 @@ class SsoAdminWrapper:
 
     # ¦ get_assignments
     def get_assignments(
-        self, permissionsets_in_scope: Optional[List[str]] = None
+        self,
+        permissionsets_in_scope: Optional[List[str]] = None,
+        principals: Optional[Dict[str, List[str]]] = None,
+        strategy: Optional[str] = None,
+        previous_permission_sets: Optional[Dict] = None,
+        checkpoint: Optional[Dict] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+        permission_sets: Optional[Dict] = None,
+        group_members: Optional[Dict[str, List[str]]] = None,
     ) -> Dict:
-        """Fetches assignments for all or specified permission sets."""
-        permission_sets = self._load_all_permissionsets(permissionsets_in_scope)
+        """
+        Fetches assignments for all or specified permission sets.
+
+        If should_stop returns True before the crawl is done, no further work is started,
+        crawl_complete is False and self.checkpoint holds what is needed to continue later.
+
+        Args:
+            permissionsets_in_scope (List[str]): Permission set names to crawl, all if None.
+            principals (Dict[str, List[str]]): User and group ids of the identity store. Required
+                for the planner to consider listing assignments per principal.
+            strategy (str): "auto", "per_pair" or "per_principal", defaults to globals.CRAWL_STRATEGY.
+            previous_permission_sets (Dict): Permission sets of the previous crawl; their details are
+                reused for permission sets whose provisioned accounts did not change.
+            checkpoint (Dict): self.checkpoint of an earlier, stopped call to continue from.
+            should_stop (Callable[[], bool]): Checked before each unit of work is started.
+            permission_sets (Dict): Output of load_permission_sets() to crawl instead of loading
+                them, e.g. one shard of a fanned-out crawl.
+            group_members (Dict[str, List[str]]): Known group memberships; the planner counts the
+                group assignments a per-principal crawl pages through for each member.
+
+        Returns:
+            Dict: Permission sets by ARN, each account entry carrying its "assignments".
+                Incomplete if crawl_complete is False.
+        """
+        self.crawl_complete = True
+        self.checkpoint = None
+        if checkpoint:
+            # Permission sets, strategy and principals are taken over, so the work list is identical
+            permission_sets = checkpoint["permission_sets"]
+            principals = checkpoint.get("principals")
+            strategy = checkpoint["strategy"]
+            logging.info(
+                f"Resuming the {strategy} crawl at {checkpoint['cursor']} of {checkpoint['total']}."
+            )
+        elif permission_sets is None:
+            permission_sets = self.load_permission_sets(
+                permissionsets_in_scope, previous_permission_sets
+            )
+        pairs = []
         for permissionset_arn, permissionset_info in permission_sets.items():
             permissionset_name = permissionset_info["permissionset_details"]["name"]
             if (
@@ -62,24 +133,294 @@ class SsoAdminWrapper:
                 or permissionset_name in permissionsets_in_scope
             ):
                 for account_info in permissionset_info["accounts"]:
-                    account_info["assignments"] = (
-                        self._get_account_assignments_for_permissionset(
-                            permissionset_arn, account_info["id"]
-                        )
-                    )
+                    pairs.append((permissionset_arn, account_info))
+
+        self.crawl_plan = None
+        if not checkpoint and principals is not None:
+            self.crawl_plan = CrawlPlanner().plan(
+                permission_set_count=len(permission_sets),
+                provisioned_account_ids=[
+                    account_info["id"] for _, account_info in pairs
+                ],
+                principals=principals,
+                requested_strategy=strategy or globals.CRAWL_STRATEGY,
+                group_members=group_members,
+                assignment_counts=count_assignments(previous_permission_sets),
+            )
+            strategy = self.crawl_plan.strategy
+        elif not checkpoint:
+            # Listing per principal needs the principal ids
+            strategy = STRATEGY_PER_PAIR
+
+        if strategy == STRATEGY_PER_PRINCIPAL:
+            crawl_state = self._crawl_assignments_by_principal(
+                pairs, principals, checkpoint, should_stop
+            )
+        else:
+            crawl_state = self._crawl_assignment_pairs(pairs, checkpoint, should_stop)
+
+        if crawl_state is not None:
+            self.crawl_complete = False
+            self.checkpoint = dict(
+                crawl_state,
+                strategy=strategy,
+                permission_sets=permission_sets,
+                principals=principals,
+                failed_assignment_pairs=self.failed_assignment_pairs,
+                failed_principals=self.failed_principals,
+                missing_principals=self.missing_principals,
+            )
+            logging.info(
+                f"Crawl stopped at {crawl_state['cursor']} of {crawl_state['total']}."
+            )
+            return permission_sets
+
+        # Both strategies and the API return principals in different orders; sorted, the result
+        # and its content hash do not depend on the strategy
+        for _, account_info in pairs:
+            assignments = account_info.setdefault(
+                "assignments", {"users": [], "groups": []}
+            )
+            assignments["users"].sort()
+            assignments["groups"].sort()
         return permission_sets
 
+    # ¦ _run_bounded
+    def _run_bounded(
+        self,
+        function: Callable,
+        argument_tuples: List[Tuple],
+        should_stop: Optional[Callable[[], bool]] = None,
+    ) -> int:
+        """
+        Calls function for every argument tuple on the worker pool, keeping a bounded window in flight.
+
+        Returns the number of argument tuples processed. It is smaller than their count if should_stop
+        returned True; all started calls are finished before returning, so they form a prefix.
+        """
+        if self.max_workers == 1 or len(argument_tuples) <= 1:
+            for index, arguments in enumerate(argument_tuples):
+                if should_stop and should_stop():
+                    return index
+                function(*arguments)
+            return len(argument_tuples)
+
+        # Keep only a bounded window in flight instead of one future per item
+        max_in_flight = self.max_workers * 4
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="assignments"
+        ) as executor:
+            in_flight = set()
+            for index, arguments in enumerate(argument_tuples):
+                if len(in_flight) >= max_in_flight:
+                    _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                if should_stop and should_stop():
+                    wait(in_flight)
+                    return index
+                in_flight.add(executor.submit(function, *arguments))
+            wait(in_flight)
+        return len(argument_tuples)
+
+    # ¦ _crawl_assignment_pairs
+    def _crawl_assignment_pairs(
+        self,
+        pairs: List[Tuple[str, Dict]],
+        checkpoint: Optional[Dict] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ) -> Optional[Dict]:
+        """
+        Fills the assignments of all (permission set, account) pairs, fanned out over the worker pool.
+
+        Returns None when done, or the cursor state if should_stop ended the crawl early.
+        The assignments found so far are kept in the account entries of the pairs.
+        """
+        cursor = checkpoint["cursor"] if checkpoint else 0
+        self.failed_assignment_pairs = [
+            tuple(pair)
+            for pair in (checkpoint or {}).get("failed_assignment_pairs", [])
+        ]
+        logging.info(
+            f"Crawling {len(pairs) - cursor} assignment pairs with {self.max_workers} workers."
+        )
+        cursor += self._run_bounded(
+            self._crawl_assignment_pair, pairs[cursor:], should_stop
+        )
+        if cursor < len(pairs):
+            return {"cursor": cursor, "total": len(pairs)}
+
+        if self.failed_assignment_pairs:
+            logging.error(
+                f"Failed to retrieve assignments for {len(self.failed_assignment_pairs)} of {len(pairs)} pairs."
+            )
+        return None
+
+    # ¦ _crawl_assignment_pair
+    def _crawl_assignment_pair(self, permission_set_arn: str, account_info: Dict):
+        """Fills the assignments of one pair; a failure leaves it empty and is recorded, not raised."""
+        try:
+            account_info["assignments"] = (
+                self._get_account_assignments_for_permissionset(
+                    permission_set_arn, account_info["id"]
+                )
+            )
+        except Exception as e:
+            logging.error(
+                f"Error retrieving assignments for PermissionSet: {permission_set_arn} in Account: {account_info['id']}: {e}"
+            )
+            account_info["assignments"] = {"users": [], "groups": []}
+            self.failed_assignment_pairs.append(
+                (permission_set_arn, account_info["id"])
+            )
+
+    # ¦ _crawl_assignments_by_principal
+    def _crawl_assignments_by_principal(
+        self,
+        pairs: List[Tuple[str, Dict]],
+        principals: Dict[str, List[str]],
+        checkpoint: Optional[Dict] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ) -> Optional[Dict]:
+        """
+        Fills the assignments of all pairs by listing the assignments of every principal.
+
+        Returns None when done, or the cursor state with the results so far if should_stop
+        ended the crawl early.
+        """
+        cursor = checkpoint["cursor"] if checkpoint else 0
+        self.failed_principals = [
+            tuple(principal)
+            for principal in (checkpoint or {}).get("failed_principals", [])
+        ]
+        self.missing_principals = [
+            tuple(principal)
+            for principal in (checkpoint or {}).get("missing_principals", [])
+        ]
+        assignments_by_pair = {}
+        for permissionset_arn, account_info in pairs:
+            account_info["assignments"] = {"users": [], "groups": []}
+            assignments_by_pair[(permissionset_arn, account_info["id"])] = account_info[
+                "assignments"
+            ]
+
+        principal_list = [("USER", user_id) for user_id in principals.get("users", [])]
+        principal_list += [
+            ("GROUP", group_id) for group_id in principals.get("groups", [])
+        ]
+        logging.info(
+            f"Crawling assignments of {len(principal_list) - cursor} principals with {self.max_workers} workers."
+        )
+        # Collected per principal and merged in principal order to keep the output deterministic
+        results: List[List[Tuple[str, str]]] = [[] for _ in principal_list]
+        for index, principal_pairs in enumerate((checkpoint or {}).get("results", [])):
+            results[index] = [tuple(pair) for pair in principal_pairs]
+
+        def _crawl_principal(index: int, principal_type: str, principal_id: str):
+            try:
+                results[index] = self._get_account_assignments_for_principal(
+                    principal_type, principal_id
+                )
+            except ClientError as e:
+                if (
+                    e.response.get("Error", {}).get("Code")
+                    != "ResourceNotFoundException"
+                ):
+                    logging.error(
+                        f"Error retrieving assignments for {principal_type} {principal_id}: {e}"
+                    )
+                    self.failed_principals.append((principal_type, principal_id))
+                    return
+                # Deleted since the principal ids were listed, so it has no assignments
+                logging.warning(f"{principal_type} {principal_id} no longer exists.")
+                self.missing_principals.append((principal_type, principal_id))
+            except Exception as e:
+                logging.error(
+                    f"Error retrieving assignments for {principal_type} {principal_id}: {e}"
+                )
+                self.failed_principals.append((principal_type, principal_id))
+
+        cursor += self._run_bounded(
+            _crawl_principal,
+            [
+                (index, *principal)
+                for index, principal in enumerate(principal_list)
+                if index >= cursor
+            ],
+            should_stop,
+        )
+        if cursor < len(principal_list):
+            return {
+                "cursor": cursor,
+                "total": len(principal_list),
+                "results": results[:cursor],
+            }
+
+        for (principal_type, principal_id), principal_pairs in zip(
+            principal_list, results
+        ):
+            key = "users" if principal_type == "USER" else "groups"
+            for pair in principal_pairs:
+                # Pairs outside the crawl scope (or of unknown accounts) are skipped
+                if pair in assignments_by_pair:
+                    assignments_by_pair[pair][key].append(principal_id)
+
+        if self.failed_principals:
+            logging.error(
+                f"Failed to retrieve assignments for {len(self.failed_principals)} of {len(principal_list)} principals."
+            )
+        return None
+
+    # ¦ load_permission_sets
+    def load_permission_sets(
+        self,
+        permissionsets_in_scope: Optional[List[str]] = None,
+        previous_permission_sets: Optional[Dict] = None,
+    ) -> Dict:
+        """Returns the permission sets with their details and provisioned accounts, without assignments."""
+        return self._load_all_permissionsets(
+            permissionsets_in_scope, previous_permission_sets
+        )
+
     # ¦ _load_all_permissionsets
     def _load_all_permissionsets(
-        self, permissionsets_in_scope: Optional[List[str]] = None
+        self,
+        permissionsets_in_scope: Optional[List[str]] = None,
+        previous_permission_sets: Optional[Dict] = None,
     ) -> Dict:
         """Loads all permission sets, optionally filtered by scope."""
         logging.info("Retrieving all Permission Sets.")
         permission_sets = {}
+        previous_permission_sets = previous_permission_sets or {}
+        reused_count = 0
         try:
             paginator = self._sso_client.get_paginator("list_permission_sets")
             for page in paginator.paginate(InstanceArn=self.instance_arn):
                 for permission_set_arn in page.get("PermissionSets", []):
+                    previous = previous_permission_sets.get(permission_set_arn)
+                    if previous is not None:
+                        # Known permission set: compare the provisioned accounts first and
+                        # only describe it again if they changed
+                        accounts = self._get_accounts_for_permissionset(
+                            permission_set_arn
+                        )
+                        if [account["id"] for account in accounts] == [
+                            account["id"] for account in previous["accounts"]
+                        ]:
+                            permission_set_info = previous["permissionset_details"]
+                            reused_count += 1
+                        else:
+                            permission_set_info = self._describe_permission_set(
+                                permission_set_arn
+                            )
+                        if (
+                            permissionsets_in_scope is None
+                            or permission_set_info["name"] in permissionsets_in_scope
+                        ):
+                            permission_sets[permission_set_arn] = {
+                                "permissionset_details": permission_set_info,
+                                "accounts": accounts,
+                            }
+                        continue
+
                     permission_set_info = self._describe_permission_set(
                         permission_set_arn
                     )
@@ -96,17 +437,25 @@ class SsoAdminWrapper:
                         }
         except Exception as e:
             logging.error(f"Error loading permission sets: {e}")
+        if previous_permission_sets:
+            logging.info(
+                f"Reused details of {reused_count} unchanged permission sets from the previous crawl."
+            )
         return permission_sets
 
     # ¦ _describe_permission_set
     def _describe_permission_set(self, permission_set_arn: str) -> Dict:
-        """Describes a single permission set."""
+        """Describes a single permission set, or returns its details cached by an earlier invocation."""
+        cached_details = METADATA_CACHE.get(permission_set_key(permission_set_arn))
+        if cached_details is not None:
+            return dict(cached_details)
         try:
             response = self._sso_client.describe_permission_set(
                 InstanceArn=self.instance_arn, PermissionSetArn=permission_set_arn
             )
-            details = response.get("PermissionSet", {})
-            return self._format_permission_set(details)
+            details = self._format_permission_set(response.get("PermissionSet", {}))
+            METADATA_CACHE.put(permission_set_key(permission_set_arn), dict(details))
+            return details
         except Exception as e:
             logging.error(f"Error describing permission set {permission_set_arn}: {e}")
             return {}
@@ -134,15 +483,15 @@ class SsoAdminWrapper:
                 InstanceArn=self.instance_arn, PermissionSetArn=permission_set_arn
             ):
                 for account_id in page.get("AccountIds", []):
-                    account_info = self.account_wrapper.get_account_entry_by_id(
+                    account_record = self.account_wrapper.get_account_record_by_id(
                         account_id
                     )
-                    if account_info:
+                    if account_record:
                         accounts.append(
                             {
-                                "id": account_info.get("id"),
-                                "name": account_info.get("name"),
-                                "status": account_info.get("status"),
+                                "id": account_record.id,
+                                "name": account_record.name,
+                                "status": account_record.status,
                             }
                         )
             return accounts
@@ -177,3 +526,37 @@ class SsoAdminWrapper:
                         assignments["groups"].append(principal_id)
 
         return assignments
+
+    # ¦ _get_account_assignments_for_principal
+    def _get_account_assignments_for_principal(
+        self, principal_type: str, principal_id: str
+    ) -> List[Tuple[str, str]]:
+        """
+        Returns the (permission set ARN, account id) pairs the principal is directly assigned to.
+
+        For a user, the API also returns the assignments inherited through its groups, with the
+        group as principal. Those are skipped; the group's own query credits them to the group.
+        """
+        logging.info(f"Retrieving assignments for {principal_type}: {principal_id}")
+        pairs = []
+
+        paginator = self._sso_client.get_paginator(
+            "list_account_assignments_for_principal"
+        )
+        for page in paginator.paginate(
+            InstanceArn=self.instance_arn,
+            PrincipalId=principal_id,
+            PrincipalType=principal_type,
+        ):
+            for assignment in page.get("AccountAssignments", []):
+                if (
+                    assignment.get("PrincipalType") != principal_type
+                    or assignment.get("PrincipalId") != principal_id
+                ):
+                    continue
+                permission_set_arn = assignment.get("PermissionSetArn")
+                account_id = assignment.get("AccountId")
+                if permission_set_arn and account_id:
+                    pairs.append((permission_set_arn, account_id))
+
+        return pairs
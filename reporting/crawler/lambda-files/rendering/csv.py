@@ -13,90 +13,172 @@ For commercial licensing, contact: contact@acai.gmbh
 """
 
 import csv
+import tempfile
 from datetime import datetime
-from io import StringIO
+from typing import Dict, Iterable, List, Optional
 
 import globals
+from rendering.rows import AssignmentRow, RowPipeline, RowSink, iter_assignment_rows
 
+CSV_TABLES = ("assignments", "users", "groups")
 
-class CSV:
-    def __init__(self, transformed):
+
+class CSV(RowSink):
+    def __init__(self, transformed, tables: Optional[Iterable[str]] = None):
+        """
+        Renders the assignments and the user and group lookups as CSV files.
+
+        Args:
+            transformed (dict): Output of Transformer.transform_assignments().
+            tables (Iterable[str]): Tables to upload ("assignments", "users", "groups"), all by default.
+        """
         self.transformed = transformed
+        self.tables = set(tables) if tables is not None else set(CSV_TABLES)
+        self.timestamp = None
+        self.assignments_file = None
+        self.assignments_writer = None
 
-    def render(self):
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    def render(self, tables: Optional[Iterable[str]] = None):
+        """Renders and uploads the given tables ("assignments", "users", "groups"), all by default."""
+        if tables is not None:
+            self.tables = set(tables)
+        RowPipeline(iter_assignment_rows(self.transformed), [self]).run()
+        return globals.UPLOAD_SERVICE.wait()
 
-        # Assignments file
-        object_name_assignments = f"{timestamp}_assignments.csv"
-        assignments_content = StringIO()
-        csv_writer_assignments = csv.writer(assignments_content)
-        csv_writer_assignments.writerow(
-            ["account_id", "account_name", "permission_set_name", "group_id", "user_id"]
-        )
+    # ¦ open
+    def open(self):
+        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if "assignments" in self.tables:
+            # Rows are streamed to a temporary file instead of being collected in memory
+            self.assignments_file = self._create_temp_file()
+            self.assignments_writer = csv.writer(self.assignments_file)
+            self.assignments_writer.writerow(
+                [
+                    "account_id",
+                    "account_name",
+                    "permission_set_name",
+                    "group_id",
+                    "user_id",
+                ]
+            )
 
-        # Iterate through accounts for assignments
-        for account_id, account_info in self.transformed["accounts"].items():
-            for permission_set_name, permission_set_info in account_info[
-                "permission_sets"
-            ].items():
-                for group_id in permission_set_info["groups"]:
-                    for user_id in self.transformed["principals"]["groups"][group_id][
-                        "assigned_users"
-                    ]:
-                        csv_writer_assignments.writerow(
-                            [
-                                account_id,
-                                account_info["account_name"],
-                                permission_set_name,
-                                group_id,
-                                user_id,
-                            ]
-                        )
+    # ¦ write
+    def write(self, row: AssignmentRow):
+        # The assignments file only lists group-based assignments
+        if self.assignments_writer and row.group_id:
+            self.assignments_writer.writerow(
+                [
+                    row.account_id,
+                    row.account_name,
+                    row.permission_set_name,
+                    row.group_id,
+                    row.user_id,
+                ]
+            )
+
+    # ¦ close
+    def close(self):
+        if self.assignments_file:
+            self._upload(f"{self.timestamp}_assignments.csv", self.assignments_file)
+            self.assignments_file = None
+            self.assignments_writer = None
 
         # Lookup files for Users
-        user_object_name_lookup = f"{timestamp}_user_lookup.csv"
-        user_lookup_content = StringIO()
-        csv_writer_user_lookup = csv.writer(user_lookup_content)
-        csv_writer_user_lookup.writerow(["principal_id", "display_name", "user_name"])
-        # Populate lookup CSV with users
-        for user_id, user_details in self.transformed["principals"]["users"].items():
+        if "users" in self.tables:
+            user_lookup_file = self._create_temp_file()
+            csv_writer_user_lookup = csv.writer(user_lookup_file)
             csv_writer_user_lookup.writerow(
+                ["principal_id", "display_name", "user_name"]
+            )
+            # Populate lookup CSV with users
+            for user_id, user_details in self.transformed["principals"][
+                "users"
+            ].items():
+                csv_writer_user_lookup.writerow(
+                    [
+                        user_id,
+                        "User",
+                        user_details.get("display_name", ""),
+                        user_details.get("user_name", ""),
+                    ]
+                )
+            self._upload(f"{self.timestamp}_user_lookup.csv", user_lookup_file)
+
+        # Lookup files for Groups
+        if "groups" in self.tables:
+            group_lookup_file = self._create_temp_file()
+            csv_writer_group_lookup = csv.writer(group_lookup_file)
+            csv_writer_group_lookup.writerow(
                 [
-                    user_id,
-                    "User",
-                    user_details.get("display_name", ""),
-                    user_details.get("user_name", ""),
+                    "principal_id",
+                    "display_name",
+                    "external_id_0",
+                    "external_id_issuer_0",
                 ]
             )
+            # Populate group CSV with groups and their details
+            for group_id, group_details in self.transformed["principals"][
+                "groups"
+            ].items():
+                display_name = group_details.get("display_name", "")
+                external_ids = group_details.get("external_ids", [])
 
-        # Lookup files for Groups
-        group_object_name_lookup = f"{timestamp}_group_lookup.csv"
-        group_lookup_content = StringIO()
-        csv_writer_group_lookup = csv.writer(group_lookup_content)
-        csv_writer_group_lookup.writerow(
-            ["principal_id", "display_name", "external_id_0", "external_id_issuer_0"]
+                # Assuming at least one external_id exists and taking the first one as an example
+                external_id_0 = external_ids[0]["id"] if external_ids else ""
+                external_id_issuer_0 = external_ids[0]["issuer"] if external_ids else ""
+
+                csv_writer_group_lookup.writerow(
+                    [group_id, display_name, external_id_0, external_id_issuer_0]
+                )
+            self._upload(f"{self.timestamp}_group_lookup.csv", group_lookup_file)
+
+    def _create_temp_file(self):
+        return tempfile.NamedTemporaryFile(
+            mode="w", newline="", suffix=".csv", delete=False
         )
-        # Populate group CSV with groups and their details
-        for group_id, group_details in self.transformed["principals"]["groups"].items():
-            display_name = group_details.get("display_name", "")
-            external_ids = group_details.get("external_ids", [])
 
-            # Assuming at least one external_id exists and taking the first one as an example
-            external_id_0 = external_ids[0]["id"] if external_ids else ""
-            external_id_issuer_0 = external_ids[0]["issuer"] if external_ids else ""
+    def _upload(self, object_name: str, temp_file):
+        temp_file.close()
+        globals.UPLOAD_SERVICE.submit(
+            object_name=object_name,
+            local_file_path=temp_file.name,
+            remove_local_file=True,
+        )
 
-            csv_writer_group_lookup.writerow(
-                [group_id, display_name, external_id_0, external_id_issuer_0]
-            )
 
-        # Save to S3
-        globals.upload_to_s3(
-            object_name=object_name_assignments, content=assignments_content.getvalue()
+class AssignmentsDiffCSV:
+    def __init__(self, diff: Dict[str, List]):
+        """
+        Renders the added and removed assignments of report_diff.diff_assignments as CSV.
+
+        Args:
+            diff (Dict[str, List]): "added" and "removed" AssignmentChange lists.
+        """
+        self.diff = diff
+
+    def render(self):
+        """Queues the upload of <timestamp>_assignments_diff.csv on globals.UPLOAD_SERVICE."""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        diff_file = tempfile.NamedTemporaryFile(
+            mode="w", newline="", suffix=".csv", delete=False
         )
-        globals.upload_to_s3(
-            object_name=user_object_name_lookup, content=user_lookup_content.getvalue()
+        csv_writer_diff = csv.writer(diff_file)
+        csv_writer_diff.writerow(
+            [
+                "change",
+                "account_id",
+                "account_name",
+                "permission_set_name",
+                "principal_type",
+                "principal_id",
+                "principal_name",
+            ]
         )
-        globals.upload_to_s3(
-            object_name=group_object_name_lookup,
-            content=group_lookup_content.getvalue(),
+        csv_writer_diff.writerows(self.diff["added"])
+        csv_writer_diff.writerows(self.diff["removed"])
+        diff_file.close()
+        globals.UPLOAD_SERVICE.submit(
+            object_name=f"{timestamp}_assignments_diff.csv",
+            local_file_path=diff_file.name,
+            remove_local_file=True,
         )
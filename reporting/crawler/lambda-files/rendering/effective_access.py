@@ -0,0 +1,106 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import csv
+import json
+import tempfile
+from datetime import datetime
+from typing import Dict, Iterator, List, NamedTuple
+
+import globals
+from transformer import EffectiveAccessEntry
+
+
+class UserAccessRow(NamedTuple):
+    user_id: str
+    user_name: str
+    user_display_name: str
+    account_id: str
+    account_name: str
+    permission_set_name: str
+    # Empty for direct user assignments
+    group_id: str
+    group_name: str
+
+
+def iter_user_access_rows(
+    transformed: Dict, effective_access: Dict[str, List[EffectiveAccessEntry]]
+) -> Iterator[UserAccessRow]:
+    accounts = transformed["accounts"]
+    users = transformed["principals"]["users"]
+    groups = transformed["principals"]["groups"]
+    for user_id, entries in effective_access.items():
+        user_details = users.get(user_id, {})
+        user_name = user_details.get("user_name", f"User-{user_id}")
+        user_display_name = user_details.get("display_name", f"User-{user_id}")
+        for account_id, permission_set_name, group_id in entries:
+            group_name = (
+                groups.get(group_id, {}).get("display_name", f"Group-{group_id}")
+                if group_id
+                else ""
+            )
+            yield UserAccessRow(
+                user_id,
+                user_name,
+                user_display_name,
+                account_id,
+                accounts.get(account_id, {}).get("account_name", ""),
+                permission_set_name,
+                group_id or "",
+                group_name,
+            )
+
+
+class EffectiveAccessExport:
+    def __init__(
+        self, transformed, effective_access: Dict[str, List[EffectiveAccessEntry]]
+    ):
+        """
+        Renders the user-centric effective access index.
+
+        Args:
+            transformed (dict): Output of Transformer.transform_assignments().
+            effective_access (dict): Output of transformer.build_effective_access().
+        """
+        self.transformed = transformed
+        self.effective_access = effective_access
+
+    def render(self):
+        """Queues <timestamp>_effective_access.json and <timestamp>_user_access.csv on globals.UPLOAD_SERVICE."""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        # {user_id: [[account_id, permission_set_name, group_id or null], ...]}
+        index_file = tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False)
+        json.dump(self.effective_access, index_file, separators=(",", ":"))
+        index_file.close()
+        globals.UPLOAD_SERVICE.submit(
+            object_name=f"{timestamp}_effective_access.json",
+            local_file_path=index_file.name,
+            remove_local_file=True,
+        )
+
+        user_access_file = tempfile.NamedTemporaryFile(
+            mode="w", newline="", suffix=".csv", delete=False
+        )
+        csv_writer_user_access = csv.writer(user_access_file)
+        csv_writer_user_access.writerow(UserAccessRow._fields)
+        csv_writer_user_access.writerows(
+            iter_user_access_rows(self.transformed, self.effective_access)
+        )
+        user_access_file.close()
+        globals.UPLOAD_SERVICE.submit(
+            object_name=f"{timestamp}_user_access.csv",
+            local_file_path=user_access_file.name,
+            remove_local_file=True,
+        )
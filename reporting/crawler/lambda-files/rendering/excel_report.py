@@ -15,28 +15,126 @@ For commercial licensing, contact: contact@acai.gmbh
 import os
 import tempfile
 from datetime import datetime
+from typing import List
 
 import globals
 import xlsxwriter
-
-
-class ExcelReport:
-    def __init__(self, transformed):
+from rendering.effective_access import iter_user_access_rows
+from rendering.rows import (
+    AssignmentRow,
+    RowPipeline,
+    RowSink,
+    iter_assignment_rows,
+    iter_group_member_rows,
+)
+
+# Rows of an Excel worksheet, including the header row
+EXCEL_MAX_ROWS = 1048576
+
+
+class SheetWriter:
+    def __init__(
+        self,
+        workbook,
+        title: str,
+        headers: List[str],
+        column_widths: List[int],
+        header_format,
+        autofilter: bool = True,
+    ):
+        """
+        Writes rows below a header row. A full sheet is continued on "<title> (2)", "<title> (3)", ...
+        with the same header, so large tenants do not lose the rows past the Excel row limit.
+        """
+        self.workbook = workbook
+        self.title = title
+        self.headers = headers
+        self.column_widths = column_widths
+        self.header_format = header_format
+        self.autofilter = autofilter
+        self.worksheet = None
+        self.sheet_count = 0
+        self.row_num = 0
+        self.row_count = 0
+        self.dropped_rows = 0
+        self._add_sheet()
+
+    def _add_sheet(self):
+        self.sheet_count += 1
+        name = (
+            self.title
+            if self.sheet_count == 1
+            else f"{self.title} ({self.sheet_count})"
+        )
+        self.worksheet = self.workbook.add_worksheet(name)
+        for col_num, header in enumerate(self.headers):
+            self.worksheet.write(0, col_num, header, self.header_format)
+        for col_num, width in enumerate(self.column_widths):
+            self.worksheet.set_column(col_num, col_num, width)
+        self.worksheet.freeze_panes(1, 0)
+        if self.autofilter:
+            # Apply filter to the header row
+            self.worksheet.autofilter(0, 0, 0, len(self.headers) - 1)
+        self.row_num = 1  # Start after the header row
+
+    # ¦ write_row
+    def write_row(self, values: List):
+        if self.row_num >= EXCEL_MAX_ROWS:
+            self._add_sheet()
+        # xlsxwriter returns -1 instead of raising for cells outside the sheet
+        if self.worksheet.write_row(self.row_num, 0, values) == -1:
+            self.dropped_rows += 1
+        else:
+            self.row_count += 1
+        self.row_num += 1
+
+    # ¦ log_summary
+    def log_summary(self):
+        if self.sheet_count > 1:
+            globals.LOGGER.info(
+                f"Excel {self.title}: {self.row_count} rows on {self.sheet_count} sheets."
+            )
+        if self.dropped_rows:
+            globals.LOGGER.error(
+                f"Excel {self.title}: {self.dropped_rows} rows could not be written."
+            )
+
+
+class ExcelReport(RowSink):
+    def __init__(self, transformed, effective_access=None):
         self.transformed = transformed
+        # Adds the per-user "User Access" sheet if given
+        self.effective_access = effective_access
+        self.file_name = None
+        self.local_file_path = None
+        self.workbook = None
+        self.header_format = None
+        self.assignments_sheet = None
 
     def create_excel(self):
+        RowPipeline(iter_assignment_rows(self.transformed), [self]).run()
+        return globals.UPLOAD_SERVICE.wait()
+
+    # ¦ open
+    def open(self):
         # Generate the timestamp for file naming
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_name = f"{timestamp}_assignments.xlsx"
+        self.file_name = f"{timestamp}_assignments.xlsx"
         # local_file_path = f"/tmp/{file_name}"
-        local_file_path = os.path.join(tempfile.gettempdir(), file_name)
+        self.local_file_path = os.path.join(tempfile.gettempdir(), self.file_name)
 
         # Create the Excel workbook and the first worksheet
-        workbook = xlsxwriter.Workbook(local_file_path)
-        worksheet_assignments = workbook.add_worksheet("Assignments")
-
+        # In constant_memory mode every row is flushed to a temp file once the next row starts,
+        # which works because the pipeline writes rows strictly in order
+        self.workbook = xlsxwriter.Workbook(
+            self.local_file_path,
+            {
+                "constant_memory": globals.EXCEL_CONSTANT_MEMORY,
+                "tmpdir": tempfile.gettempdir(),
+            },
+        )
         # Define header format and write headers for the first sheet
-        header_format = workbook.add_format(
+        self.header_format = self.workbook.add_format(
             {
                 "bold": True,
                 "align": "center",
@@ -44,131 +142,108 @@ class ExcelReport:
                 "bg_color": "#D3D3D3",
             }
         )
-        headers_assignments = [
-            "Account-ID",
-            "Account-Name",
-            "PermSet-Name",
-            "Group-Name",
-            "User-Name",
-            "User-Display-Name",
-            "Group-ID",
-            "User-ID",
-        ]
-
-        for col_num, header in enumerate(headers_assignments):
-            worksheet_assignments.write(0, col_num, header, header_format)
-
-        # Set column widths and freeze the header row for the first sheet
-        worksheet_assignments.set_column("A:A", 20)  # Account-ID
-        worksheet_assignments.set_column("B:B", 30)  # Account-Name
-        worksheet_assignments.set_column("C:C", 30)  # PermSet-Name
-        worksheet_assignments.set_column("D:D", 30)  # Group-Name
-        worksheet_assignments.set_column("E:E", 30)  # User-Name
-        worksheet_assignments.set_column("F:F", 30)  # User-Display-Name
-        worksheet_assignments.set_column("G:G", 50)  # Group-ID
-        worksheet_assignments.set_column("H:H", 50)  # User-ID
-        worksheet_assignments.freeze_panes(1, 0)
-        worksheet_assignments.autofilter(
-            0, 0, 0, len(headers_assignments) - 1
-        )  # Apply filter to the header row
-
-        # Write data to the first worksheet
-        row_num = 1  # Start after the header row
-        for account_id, account_info in self.transformed["accounts"].items():
-            for permission_set_name, permission_set_info in account_info[
-                "permission_sets"
-            ].items():
-                # Group-based assignments
-                for group_id in permission_set_info["groups"]:
-                    group_details = self.transformed["principals"]["groups"].get(
-                        group_id, {}
-                    )
-                    group_name = group_details.get("display_name", f"Group-{group_id}")
-
-                    for user_id in group_details.get("assigned_users", []):
-                        user_details = self.transformed["principals"]["users"].get(
-                            user_id, {}
-                        )
-                        user_name = user_details.get("user_name", f"User-{user_id}")
-                        user_display_name = user_details.get(
-                            "display_name", f"User-{user_id}"
-                        )
-                        worksheet_assignments.write_row(
-                            row_num,
-                            0,
-                            [
-                                account_id,
-                                account_info["account_name"],
-                                permission_set_name,
-                                group_name,
-                                user_name,
-                                user_display_name,
-                                group_id,
-                                user_id,
-                            ],
-                        )
-                        row_num += 1
-
-                # Direct user assignments (no group)
-                for user_id in permission_set_info.get("users", []):
-                    user_details = self.transformed["principals"]["users"].get(
-                        user_id, {}
-                    )
-                    user_name = user_details.get("user_name", f"User-{user_id}")
-                    user_display_name = user_details.get(
-                        "display_name", f"User-{user_id}"
-                    )
-                    worksheet_assignments.write_row(
-                        row_num,
-                        0,
-                        [
-                            account_id,
-                            account_info["account_name"],
-                            permission_set_name,
-                            "",
-                            user_name,
-                            user_display_name,
-                            "",
-                            user_id,
-                        ],
-                    )
-                    row_num += 1
+        self.assignments_sheet = SheetWriter(
+            self.workbook,
+            "Assignments",
+            [
+                "Account-ID",
+                "Account-Name",
+                "PermSet-Name",
+                "Group-Name",
+                "User-Name",
+                "User-Display-Name",
+                "Group-ID",
+                "User-ID",
+            ],
+            [20, 30, 30, 30, 30, 30, 50, 50],
+            self.header_format,
+        )
+
+    # ¦ write
+    def write(self, row: AssignmentRow):
+        self.assignments_sheet.write_row(
+            [
+                row.account_id,
+                row.account_name,
+                row.permission_set_name,
+                row.group_name,
+                row.user_name,
+                row.user_display_name,
+                row.group_id,
+                row.user_id,
+            ]
+        )
 
+    # ¦ close
+    def close(self):
         # Add the second worksheet for group and user summary
-        worksheet_group_user = workbook.add_worksheet("Group-User Summary")
-        headers_summary = ["Group-Name", "User-Name", "Group-ID", "User-ID"]
-
-        for col_num, header in enumerate(headers_summary):
-            worksheet_group_user.write(0, col_num, header, header_format)
-
-        worksheet_group_user.set_column("A:A", 30)  # Group-Name
-        worksheet_group_user.set_column("B:B", 30)  # User-Name
-        worksheet_group_user.set_column("C:C", 30)  # User-Display-Name
-        worksheet_group_user.set_column("D:D", 50)  # Group-ID
-        worksheet_group_user.set_column("E:E", 50)  # User-ID
-        worksheet_group_user.freeze_panes(1, 0)
-
-        # Write data to the second worksheet
-        row_num = 1  # Start after the header row
-        for group_id, group_info in self.transformed["principals"]["groups"].items():
-            group_name = group_info.get("display_name", f"Group-{group_id}")
-            for user_id in group_info.get("assigned_users", []):
-                user_details = self.transformed["principals"]["users"].get(user_id, {})
-                user_name = user_details.get("user_name", f"User-{user_id}")
-                user_display_name = user_details.get("display_name", f"User-{user_id}")
-                worksheet_group_user.write_row(
-                    row_num,
-                    0,
-                    [group_name, user_name, user_display_name, group_id, user_id],
-                )
-                row_num += 1
+        group_user_sheet = SheetWriter(
+            self.workbook,
+            "Group-User Summary",
+            ["Group-Name", "User-Name", "Group-ID", "User-ID"],
+            [30, 30, 30, 50, 50],
+            self.header_format,
+            autofilter=False,
+        )
+        for row in iter_group_member_rows(self.transformed):
+            group_user_sheet.write_row(
+                [
+                    row.group_name,
+                    row.user_name,
+                    row.user_display_name,
+                    row.group_id,
+                    row.user_id,
+                ]
+            )
+        self.assignments_sheet.log_summary()
+        group_user_sheet.log_summary()
+
+        if self.effective_access is not None:
+            self._write_user_access_sheet()
 
         # Close the workbook after writing all data
-        workbook.close()
+        self.workbook.close()
 
         # Log and upload the file to S3
-        file_size = os.path.getsize(local_file_path)
+        file_size = os.path.getsize(self.local_file_path)
         globals.LOGGER.info(
             f"Local Excel created. File size: {file_size / (1024 * 1024):.2f} MB"
         )
-        globals.upload_to_s3(object_name=file_name, local_file_path=local_file_path)
+        globals.log_resource_usage("Excel report")
+        globals.UPLOAD_SERVICE.submit(
+            object_name=self.file_name,
+            local_file_path=self.local_file_path,
+            remove_local_file=True,
+        )
+
+    def _write_user_access_sheet(self):
+        user_access_sheet = SheetWriter(
+            self.workbook,
+            "User Access",
+            [
+                "User-Name",
+                "User-Display-Name",
+                "Account-ID",
+                "Account-Name",
+                "PermSet-Name",
+                "Via-Group-Name",
+                "User-ID",
+                "Group-ID",
+            ],
+            [30, 30, 20, 30, 30, 30, 50, 50],
+            self.header_format,
+        )
+        for row in iter_user_access_rows(self.transformed, self.effective_access):
+            user_access_sheet.write_row(
+                [
+                    row.user_name,
+                    row.user_display_name,
+                    row.account_id,
+                    row.account_name,
+                    row.permission_set_name,
+                    row.group_name,
+                    row.user_id,
+                    row.group_id,
+                ]
+            )
+        user_access_sheet.log_summary()
@@ -0,0 +1,234 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import globals
+from rendering.rows import AssignmentRow, RowSink
+
+# Column name -> Athena type, in file order
+TABLE_COLUMNS = {
+    "assignments": {
+        "account_id": "string",
+        "account_name": "string",
+        "permission_set_name": "string",
+        "group_id": "string",
+        "group_name": "string",
+        "user_id": "string",
+        "user_name": "string",
+        "user_display_name": "string",
+        "report_time": "string",
+    },
+    "users": {
+        "user_id": "string",
+        "user_name": "string",
+        "display_name": "string",
+        "report_time": "string",
+    },
+    "groups": {
+        "group_id": "string",
+        "display_name": "string",
+        "external_id": "string",
+        "external_id_issuer": "string",
+        "member_count": "int",
+        "report_time": "string",
+    },
+}
+ATHENA_DDL_NAME = "athena/tables.sql"
+
+
+def current_partition_date() -> str:
+    """The dt partition written by a run starting now (UTC)."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def athena_ddl(
+    bucket_name: str, shard_prefix_length: int = 0, database: str = "idc_reports"
+) -> str:
+    """
+    Returns CREATE EXTERNAL TABLE statements for the partitioned export.
+
+    Partition projection maps dt (and shard) to the S3 layout, so no crawler or
+    MSCK REPAIR is needed and queries filtering on dt only read matching prefixes.
+
+    Every run writes a complete copy of each table into the partition of its day, so a day
+    with several runs holds each row several times. The <table>_latest views keep only the
+    rows of the last run per day, told apart by report_time.
+    """
+    statements = [f"CREATE DATABASE IF NOT EXISTS {database};"]
+    for table, columns in TABLE_COLUMNS.items():
+        sharded = table == "assignments" and shard_prefix_length > 0
+        location = f"s3://{bucket_name}/{globals.REPORT_BUCKET_FOLDER_NAME}/dt=${{dt}}/table={table}/"
+        partitions = ["dt string"]
+        properties = {
+            "projection.enabled": "true",
+            "projection.dt.type": "date",
+            "projection.dt.format": "yyyy-MM-dd",
+            "projection.dt.range": "2024-01-01,NOW",
+        }
+        if sharded:
+            location += "shard=${shard}/"
+            partitions.append("shard string")
+            properties.update(
+                {
+                    "projection.shard.type": "integer",
+                    "projection.shard.range": f"0,{10 ** shard_prefix_length - 1}",
+                    "projection.shard.digits": str(shard_prefix_length),
+                }
+            )
+        properties["storage.location.template"] = location
+        column_lines = ",\n".join(
+            f"  `{name}` {column_type}" for name, column_type in columns.items()
+        )
+        property_lines = ",\n".join(
+            f"  '{key}' = '{value}'" for key, value in properties.items()
+        )
+        statements.append(
+            f"CREATE EXTERNAL TABLE IF NOT EXISTS {database}.{table} (\n{column_lines}\n)\n"
+            f"PARTITIONED BY ({', '.join(partitions)})\n"
+            f"ROW FORMAT SERDE 'org.openx.data.jsonserde.JsonSerDe'\n"
+            f"LOCATION 's3://{bucket_name}/{globals.REPORT_BUCKET_FOLDER_NAME}/'\n"
+            f"TBLPROPERTIES (\n{property_lines}\n);"
+        )
+        # Views are queried with Trino SQL, which quotes identifiers with double quotes.
+        # dt is the window partition, so filters on dt are pushed below the window
+        view_columns = ", ".join(
+            f'"{name}"'
+            for name in list(columns)
+            + [partition.split()[0] for partition in partitions]
+        )
+        statements.append(
+            f"CREATE OR REPLACE VIEW {database}.{table}_latest AS\n"
+            f"SELECT {view_columns}\n"
+            f"FROM (\n"
+            f"  SELECT *, max(report_time) OVER (PARTITION BY dt) AS latest_report_time\n"
+            f"  FROM {database}.{table}\n"
+            f")\n"
+            f"WHERE report_time = latest_report_time;"
+        )
+    return "\n\n".join(statements) + "\n"
+
+
+class PartitionedExport(RowSink):
+    def __init__(self, transformed, shard_prefix_length: Optional[int] = None):
+        """
+        Writes gzip-compressed NDJSON files laid out for Athena partition pruning:
+        idc-reports/dt=YYYY-MM-DD/table=<table>/[shard=<account id prefix>/]part-<HHMMSS>.ndjson.gz
+
+        Args:
+            transformed (dict): Output of Transformer.transform_assignments().
+            shard_prefix_length (int): Shards the assignments by this many leading account id digits, 0 disables it.
+        """
+        self.transformed = transformed
+        self.shard_prefix_length = (
+            globals.ATHENA_SHARD_DIGITS
+            if shard_prefix_length is None
+            else shard_prefix_length
+        )
+        self.report_time = None
+        self.partition_date = None
+        self.part_name = None
+        self._assignment_files: Dict[str, object] = {}
+
+    # ¦ open
+    def open(self):
+        now = datetime.now(timezone.utc)
+        # Several runs per day land in the same partition; report_time tells them apart
+        self.report_time = now.isoformat(timespec="seconds")
+        self.partition_date = current_partition_date()
+        self.part_name = f"part-{now.strftime('%H%M%S')}.ndjson.gz"
+
+    # ¦ write
+    def write(self, row: AssignmentRow):
+        shard = (
+            row.account_id[: self.shard_prefix_length]
+            if self.shard_prefix_length
+            else ""
+        )
+        assignment_file = self._assignment_files.get(shard)
+        if assignment_file is None:
+            assignment_file = self._assignment_files[shard] = self._create_temp_file()
+        self._write_record(
+            assignment_file, dict(row._asdict(), report_time=self.report_time)
+        )
+
+    # ¦ close
+    def close(self):
+        for shard, assignment_file in self._assignment_files.items():
+            self._upload("assignments", assignment_file, shard)
+        self._assignment_files = {}
+
+        users_file = self._create_temp_file()
+        for user_id, user_details in self.transformed["principals"]["users"].items():
+            self._write_record(
+                users_file,
+                {
+                    "user_id": user_id,
+                    "user_name": user_details.get("user_name"),
+                    "display_name": user_details.get("display_name"),
+                    "report_time": self.report_time,
+                },
+            )
+        self._upload("users", users_file)
+
+        groups_file = self._create_temp_file()
+        for group_id, group_details in self.transformed["principals"]["groups"].items():
+            external_ids = group_details.get("external_ids") or []
+            self._write_record(
+                groups_file,
+                {
+                    "group_id": group_id,
+                    "display_name": group_details.get("display_name"),
+                    "external_id": external_ids[0]["id"] if external_ids else None,
+                    "external_id_issuer": (
+                        external_ids[0]["issuer"] if external_ids else None
+                    ),
+                    "member_count": len(group_details.get("assigned_users", [])),
+                    "report_time": self.report_time,
+                },
+            )
+        self._upload("groups", groups_file)
+
+        if globals.REPORT_BUCKET_NAME:
+            globals.UPLOAD_SERVICE.submit(
+                object_name=ATHENA_DDL_NAME,
+                content=athena_ddl(
+                    globals.REPORT_BUCKET_NAME, self.shard_prefix_length
+                ),
+            )
+
+    def _create_temp_file(self):
+        file_descriptor, path = tempfile.mkstemp(suffix=".ndjson.gz")
+        os.close(file_descriptor)
+        return gzip.open(path, "wt", encoding="utf-8")
+
+    def _write_record(self, ndjson_file, record: Dict):
+        ndjson_file.write(json.dumps(record, separators=(",", ":")))
+        ndjson_file.write("\n")
+
+    def _upload(self, table: str, ndjson_file, shard: str = ""):
+        ndjson_file.close()
+        object_name = f"dt={self.partition_date}/table={table}/"
+        if shard:
+            object_name += f"shard={shard}/"
+        globals.UPLOAD_SERVICE.submit(
+            object_name=object_name + self.part_name,
+            local_file_path=ndjson_file.name,
+            remove_local_file=True,
+        )
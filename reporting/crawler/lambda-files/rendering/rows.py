@@ -0,0 +1,140 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+
+class AssignmentRow(NamedTuple):
+    account_id: str
+    account_name: str
+    permission_set_name: str
+    # Empty for direct user assignments
+    group_id: str
+    group_name: str
+    user_id: str
+    user_name: str
+    user_display_name: str
+
+
+class GroupMemberRow(NamedTuple):
+    group_id: str
+    group_name: str
+    user_id: str
+    user_name: str
+    user_display_name: str
+
+
+def _user_names(users: Dict, user_id: str):
+    user_details = users.get(user_id, {})
+    return (
+        user_details.get("user_name", f"User-{user_id}"),
+        user_details.get("display_name", f"User-{user_id}"),
+    )
+
+
+def iter_assignment_rows(transformed: Dict) -> Iterator[AssignmentRow]:
+    """
+    Flattens transformed["accounts"] into one row per (account, permission set, user).
+
+    Per permission set, the group-based rows come first (one per group member), followed by
+    the direct user assignments.
+    """
+    users = transformed["principals"]["users"]
+    groups = transformed["principals"]["groups"]
+    for account_id, account_info in transformed["accounts"].items():
+        account_name = account_info["account_name"]
+        for permission_set_name, permission_set_info in account_info[
+            "permission_sets"
+        ].items():
+            for group_id in permission_set_info["groups"]:
+                group_details = groups.get(group_id, {})
+                group_name = group_details.get("display_name", f"Group-{group_id}")
+                for user_id in group_details.get("assigned_users", []):
+                    yield AssignmentRow(
+                        account_id,
+                        account_name,
+                        permission_set_name,
+                        group_id,
+                        group_name,
+                        user_id,
+                        *_user_names(users, user_id),
+                    )
+
+            for user_id in permission_set_info.get("users", []):
+                yield AssignmentRow(
+                    account_id,
+                    account_name,
+                    permission_set_name,
+                    "",
+                    "",
+                    user_id,
+                    *_user_names(users, user_id),
+                )
+
+
+def iter_group_member_rows(transformed: Dict) -> Iterator[GroupMemberRow]:
+    users = transformed["principals"]["users"]
+    for group_id, group_info in transformed["principals"]["groups"].items():
+        group_name = group_info.get("display_name", f"Group-{group_id}")
+        for user_id in group_info.get("assigned_users", []):
+            yield GroupMemberRow(
+                group_id, group_name, user_id, *_user_names(users, user_id)
+            )
+
+
+class RowSink:
+    """Receives the rows of a RowPipeline. Renderers implement the methods they need."""
+
+    def open(self):
+        pass
+
+    def write(self, row):
+        pass
+
+    def close(self):
+        pass
+
+
+class RowPipeline:
+    def __init__(self, rows: Iterable, sinks: Optional[List[RowSink]] = None):
+        """
+        Walks a row generator once and hands every row to all subscribed sinks.
+
+        Rows are not buffered, so memory stays bounded by what the sinks keep.
+
+        Args:
+            rows (Iterable): Row generator, e.g. iter_assignment_rows(transformed).
+            sinks (List[RowSink]): Initial subscribers.
+        """
+        self.rows = rows
+        self.sinks: List[RowSink] = list(sinks or [])
+
+    # ¦ subscribe
+    def subscribe(self, sink: RowSink) -> RowSink:
+        self.sinks.append(sink)
+        return sink
+
+    # ¦ run
+    def run(self) -> int:
+        """Opens all sinks, streams the rows and closes the sinks. Returns the row count."""
+        for sink in self.sinks:
+            sink.open()
+        row_count = 0
+        for row in self.rows:
+            for sink in self.sinks:
+                sink.write(row)
+            row_count += 1
+        for sink in self.sinks:
+            sink.close()
+        return row_count
@@ -0,0 +1,179 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import os
+import sqlite3
+import tempfile
+from datetime import datetime
+
+import globals
+
+SCHEMA = """
+CREATE TABLE accounts (
+    account_id TEXT PRIMARY KEY,
+    account_name TEXT,
+    account_status TEXT
+);
+CREATE TABLE permission_sets (
+    permission_set_arn TEXT PRIMARY KEY,
+    permission_set_name TEXT
+);
+CREATE TABLE users (
+    user_id TEXT PRIMARY KEY,
+    user_name TEXT,
+    display_name TEXT
+);
+CREATE TABLE groups (
+    group_id TEXT PRIMARY KEY,
+    display_name TEXT,
+    external_id TEXT,
+    external_id_issuer TEXT
+);
+CREATE TABLE group_memberships (
+    group_id TEXT NOT NULL,
+    user_id TEXT NOT NULL
+);
+CREATE TABLE assignments (
+    account_id TEXT NOT NULL,
+    permission_set_arn TEXT NOT NULL,
+    principal_type TEXT NOT NULL,
+    principal_id TEXT NOT NULL
+);
+"""
+
+# Created after the bulk insert, which is faster than maintaining them row by row
+INDEXES = """
+CREATE UNIQUE INDEX idx_group_memberships ON group_memberships (group_id, user_id);
+CREATE INDEX idx_group_memberships_user ON group_memberships (user_id);
+CREATE INDEX idx_assignments_account ON assignments (account_id, permission_set_arn);
+CREATE INDEX idx_assignments_principal ON assignments (principal_type, principal_id);
+CREATE INDEX idx_assignments_permission_set ON assignments (permission_set_arn);
+CREATE VIEW effective_access AS
+    SELECT a.account_id, a.permission_set_arn, a.principal_id AS user_id, NULL AS via_group_id
+    FROM assignments a
+    WHERE a.principal_type = 'USER'
+    UNION ALL
+    SELECT a.account_id, a.permission_set_arn, m.user_id, a.principal_id AS via_group_id
+    FROM assignments a
+    JOIN group_memberships m ON m.group_id = a.principal_id
+    WHERE a.principal_type = 'GROUP';
+"""
+
+
+class SQLiteExport:
+    def __init__(self, transformed):
+        """
+        Exports the transformed model into an indexed SQLite file for point queries,
+        e.g. "who can reach account X" via the effective_access view.
+
+        Args:
+            transformed (dict): Output of Transformer.transform_assignments().
+        """
+        self.transformed = transformed
+
+    def render(self):
+        """Builds the database and queues its upload on globals.UPLOAD_SERVICE."""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_name = f"{timestamp}_assignments.sqlite"
+        local_file_path = os.path.join(tempfile.gettempdir(), file_name)
+        self.write_database(local_file_path)
+
+        file_size = os.path.getsize(local_file_path)
+        globals.LOGGER.info(
+            f"Local SQLite export created. File size: {file_size / (1024 * 1024):.2f} MB"
+        )
+        globals.UPLOAD_SERVICE.submit(
+            object_name=file_name,
+            local_file_path=local_file_path,
+            remove_local_file=True,
+        )
+
+    # ¦ write_database
+    def write_database(self, local_file_path: str):
+        connection = sqlite3.connect(local_file_path)
+        try:
+            # The file is built once and uploaded, so durability during the build does not matter
+            connection.execute("PRAGMA journal_mode = OFF")
+            connection.execute("PRAGMA synchronous = OFF")
+            connection.executescript(SCHEMA)
+            with connection:
+                connection.executemany(
+                    "INSERT INTO accounts VALUES (?, ?, ?)", self._account_rows()
+                )
+                connection.executemany(
+                    "INSERT OR IGNORE INTO permission_sets VALUES (?, ?)",
+                    self._permission_set_rows(),
+                )
+                connection.executemany(
+                    "INSERT INTO users VALUES (?, ?, ?)", self._user_rows()
+                )
+                connection.executemany(
+                    "INSERT INTO groups VALUES (?, ?, ?, ?)", self._group_rows()
+                )
+                connection.executemany(
+                    "INSERT INTO group_memberships VALUES (?, ?)",
+                    self._membership_rows(),
+                )
+                connection.executemany(
+                    "INSERT INTO assignments VALUES (?, ?, ?, ?)",
+                    self._assignment_rows(),
+                )
+            connection.executescript(INDEXES)
+            connection.execute("ANALYZE")
+        finally:
+            connection.close()
+
+    def _account_rows(self):
+        for account_id, account_info in self.transformed["accounts"].items():
+            yield account_id, account_info.get("account_name"), account_info.get(
+                "account_status"
+            )
+
+    def _permission_set_rows(self):
+        for account_info in self.transformed["accounts"].values():
+            for permission_set_name, permission_set_info in account_info[
+                "permission_sets"
+            ].items():
+                yield permission_set_info["permission_set_arn"], permission_set_name
+
+    def _user_rows(self):
+        for user_id, user_details in self.transformed["principals"]["users"].items():
+            yield user_id, user_details.get("user_name"), user_details.get(
+                "display_name"
+            )
+
+    def _group_rows(self):
+        for group_id, group_details in self.transformed["principals"]["groups"].items():
+            external_ids = group_details.get("external_ids") or []
+            yield (
+                group_id,
+                group_details.get("display_name"),
+                external_ids[0]["id"] if external_ids else None,
+                external_ids[0]["issuer"] if external_ids else None,
+            )
+
+    def _membership_rows(self):
+        for group_id, group_details in self.transformed["principals"]["groups"].items():
+            # dict.fromkeys drops duplicate members while keeping their order
+            for user_id in dict.fromkeys(group_details.get("assigned_users", [])):
+                yield group_id, user_id
+
+    def _assignment_rows(self):
+        for account_id, account_info in self.transformed["accounts"].items():
+            for permission_set_info in account_info["permission_sets"].values():
+                permission_set_arn = permission_set_info["permission_set_arn"]
+                for group_id in permission_set_info.get("groups", []):
+                    yield account_id, permission_set_arn, "GROUP", group_id
+                for user_id in permission_set_info.get("users", []):
+                    yield account_id, permission_set_arn, "USER", user_id
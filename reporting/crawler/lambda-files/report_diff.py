@@ -0,0 +1,104 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+from typing import Dict, Iterator, List, NamedTuple
+
+PRINCIPAL_TYPE_USER = "USER"
+PRINCIPAL_TYPE_GROUP = "GROUP"
+
+
+class AssignmentKey(NamedTuple):
+    account_id: str
+    permission_set_name: str
+    principal_type: str
+    principal_id: str
+
+
+class AssignmentChange(NamedTuple):
+    change: str
+    account_id: str
+    account_name: str
+    permission_set_name: str
+    principal_type: str
+    principal_id: str
+    principal_name: str
+
+
+def iter_assignment_keys(transformed: Dict) -> Iterator[AssignmentKey]:
+    """Yields one key per direct (account, permission set, principal) assignment."""
+    for account_id, account_info in transformed.get("accounts", {}).items():
+        for permission_set_name, permission_set_info in account_info.get(
+            "permission_sets", {}
+        ).items():
+            for group_id in permission_set_info.get("groups", []):
+                yield AssignmentKey(
+                    account_id, permission_set_name, PRINCIPAL_TYPE_GROUP, group_id
+                )
+            for user_id in permission_set_info.get("users", []):
+                yield AssignmentKey(
+                    account_id, permission_set_name, PRINCIPAL_TYPE_USER, user_id
+                )
+
+
+def _to_change(change: str, key: AssignmentKey, transformed: Dict) -> AssignmentChange:
+    principals = transformed.get("principals", {})
+    if key.principal_type == PRINCIPAL_TYPE_GROUP:
+        principal = principals.get("groups", {}).get(key.principal_id, {})
+        principal_name = principal.get("display_name", "")
+    else:
+        principal = principals.get("users", {}).get(key.principal_id, {})
+        principal_name = principal.get("user_name", "")
+    account_name = (
+        transformed.get("accounts", {}).get(key.account_id, {}).get("account_name")
+    )
+    return AssignmentChange(
+        change,
+        key.account_id,
+        account_name or "",
+        key.permission_set_name,
+        key.principal_type,
+        key.principal_id,
+        principal_name,
+    )
+
+
+def diff_assignments(previous: Dict, current: Dict) -> Dict[str, List]:
+    """
+    Compares the assignments of two transformed reports.
+
+    Both sides are indexed once by their AssignmentKey, so the runtime grows linearly
+    with the number of assignments. Changes keep the order of the report they come from.
+
+    Args:
+        previous (Dict): Transformed data of the previous run.
+        current (Dict): Transformed data of this run.
+
+    Returns:
+        Dict[str, List]: "added" and "removed" AssignmentChange lists.
+    """
+    # Dicts act as insertion-ordered sets
+    previous_keys = dict.fromkeys(iter_assignment_keys(previous))
+    current_keys = dict.fromkeys(iter_assignment_keys(current))
+    return {
+        "added": [
+            _to_change("added", key, current)
+            for key in current_keys
+            if key not in previous_keys
+        ],
+        "removed": [
+            _to_change("removed", key, previous)
+            for key in previous_keys
+            if key not in current_keys
+        ],
+    }
@@ -0,0 +1,208 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import globals
+from botocore.exceptions import ClientError
+
+REPORT_MANIFEST_NAME = "manifest.json"
+# Bump when the rendered artifacts change for the same data, so the next run renders again
+REPORT_FORMAT_VERSION = 1
+
+
+def _normalize(value):
+    """Sorts dict keys and list items, so the hash does not depend on crawl order."""
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in sorted(value.items())}
+    if isinstance(value, (list, tuple, set)):
+        items = [_normalize(item) for item in value]
+        return sorted(
+            items, key=lambda item: json.dumps(item, sort_keys=True, default=str)
+        )
+    return value
+
+
+def _output_settings() -> Dict:
+    """Settings that change the rendered artifacts for the same data."""
+    return {
+        "output_formats": sorted(globals.OUTPUT_FORMATS),
+        "sqlite_export": globals.SQLITE_EXPORT,
+        "athena_export": globals.ATHENA_EXPORT,
+        "athena_shard_digits": globals.ATHENA_SHARD_DIGITS,
+    }
+
+
+def compute_content_hash(transformed: Dict) -> str:
+    """
+    Returns a SHA-256 over the normalized transformed data, the report format version and the
+    output settings, so enabling another output renders again although the data is unchanged.
+    """
+    normalized = json.dumps(
+        {
+            "format_version": REPORT_FORMAT_VERSION,
+            "output_settings": _output_settings(),
+            "data": _normalize(transformed),
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class ReportManifest:
+    def __init__(self, bucket_name: Optional[str] = None):
+        """
+        Keeps idc-reports/manifest.json, which points to the artifacts of the last rendered report.
+
+        Args:
+            bucket_name (str): Report bucket, defaults to globals.REPORT_BUCKET_NAME.
+        """
+        self.bucket_name = bucket_name or globals.REPORT_BUCKET_NAME
+        self.key = f"{globals.REPORT_BUCKET_FOLDER_NAME}/{REPORT_MANIFEST_NAME}"
+        self._manifest: Optional[Dict] = None
+
+    # ¦ load
+    def load(self) -> Dict:
+        if self._manifest is not None:
+            return self._manifest
+        self._manifest = {}
+        if not self.bucket_name:
+            return self._manifest
+        try:
+            response = globals.get_s3_client().get_object(
+                Bucket=self.bucket_name, Key=self.key
+            )
+            self._manifest = json.loads(response["Body"].read())
+        except ClientError as e:
+            # Without s3:ListBucket a missing key is reported as AccessDenied
+            if e.response.get("Error", {}).get("Code") not in [
+                "NoSuchKey",
+                "404",
+                "AccessDenied",
+            ]:
+                globals.LOGGER.exception(f"Failed to load report manifest {self.key}")
+        except Exception:
+            globals.LOGGER.exception(f"Failed to load report manifest {self.key}")
+        return self._manifest
+
+    # ¦ is_current
+    def is_current(self, content_hash: str) -> bool:
+        """True if the last rendered report was built from data with the same hash."""
+        manifest = self.load()
+        return bool(manifest.get("artifacts")) and (
+            manifest.get("content_hash") == content_hash
+        )
+
+    # ¦ get_athena_partition_date
+    def get_athena_partition_date(self) -> Optional[str]:
+        """The dt of the last Athena partition written, see render_reports()."""
+        return self.load().get("athena_partition_date")
+
+    # ¦ seconds_since_render
+    def seconds_since_render(self) -> Optional[float]:
+        """Age of the last complete render, None if there was none."""
+        rendered_at = self.load().get("rendered_at")
+        if not rendered_at:
+            return None
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(rendered_at)
+        return age.total_seconds()
+
+    # ¦ record_render
+    def record_render(
+        self,
+        content_hash: str,
+        artifacts: List[Dict],
+        athena_partition_date: Optional[str] = None,
+    ):
+        now = datetime.now(timezone.utc).isoformat()
+        self._save(
+            {
+                "content_hash": content_hash,
+                "athena_partition_date": athena_partition_date
+                or self.get_athena_partition_date(),
+                "rendered_at": now,
+                "artifacts": [
+                    {
+                        "key": artifact["key"],
+                        "size_bytes": artifact["size_bytes"],
+                        "uploaded_bytes": artifact["uploaded_bytes"],
+                        "compressed": artifact["compressed"],
+                    }
+                    for artifact in artifacts
+                    if artifact.get("key")
+                ],
+                "last_run": {"at": now, "rendered": True},
+            }
+        )
+
+    # ¦ record_skip
+    def record_skip(
+        self, content_hash: str, athena_partition_date: Optional[str] = None
+    ):
+        """Keeps the artifacts of the last render and only notes that this run found no changes."""
+        manifest = dict(self.load())
+        if athena_partition_date:
+            manifest["athena_partition_date"] = athena_partition_date
+        manifest["last_run"] = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "rendered": False,
+            "content_hash": content_hash,
+        }
+        self._save(manifest)
+
+    # ¦ record_failed_render
+    def record_failed_render(self, content_hash: str, failed_uploads: int):
+        """
+        Drops the content hash after an incomplete upload, so the next run renders again instead
+        of skipping. The artifacts of the last complete render are kept.
+        """
+        manifest = dict(self.load())
+        manifest.pop("content_hash", None)
+        manifest["last_run"] = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "rendered": False,
+            "content_hash": content_hash,
+            "failed_uploads": failed_uploads,
+        }
+        self._save(manifest)
+
+    # ¦ record_partial_render
+    def record_partial_render(self, content_hash: str, artifacts: List[Dict]):
+        """
+        Notes the artifacts rendered for an event. The content hash is dropped, so the next run
+        renders all outputs; artifacts and rendered_at keep describing the last complete render.
+        """
+        manifest = dict(self.load())
+        manifest.pop("content_hash", None)
+        manifest["last_run"] = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "rendered": False,
+            "content_hash": content_hash,
+            "partial_artifacts": [
+                artifact["key"] for artifact in artifacts if artifact.get("key")
+            ],
+        }
+        self._save(manifest)
+
+    def _save(self, manifest: Dict):
+        self._manifest = manifest
+        globals.upload_to_s3(
+            object_name=REPORT_MANIFEST_NAME,
+            content=json.dumps(manifest, indent=2),
+        )
@@ -0,0 +1,272 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import gzip
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import globals
+from botocore.exceptions import ClientError
+
+SNAPSHOT_FOLDER_NAME = "snapshots"
+RAW_CRAWL_SNAPSHOT_NAME = "raw_crawl.json.gz"
+RAW_CRAWL_SNAPSHOT_VERSION = 1
+TRANSFORMED_SNAPSHOT_NAME = "transformed.json.gz"
+CHECKPOINT_SNAPSHOT_NAME = "crawl_checkpoint.json.gz"
+# Error codes of a conditional put whose If-Match/If-None-Match condition failed
+CONFLICT_ERROR_CODES = [
+    "PreconditionFailed",
+    "ConditionalRequestConflict",
+    "412",
+    "409",
+]
+
+
+class SnapshotConflictError(Exception):
+    """The snapshot was changed by another invocation since it was loaded."""
+
+
+class SnapshotStore:
+    def __init__(self, bucket_name: Optional[str] = None, s3_client=None):
+        """
+        Stores gzip-compressed JSON snapshots under idc-reports/snapshots/ in the report bucket.
+
+        Args:
+            bucket_name (str): Report bucket, defaults to globals.REPORT_BUCKET_NAME.
+            s3_client: S3 client to use, defaults to globals.get_s3_client().
+        """
+        self.bucket_name = bucket_name or globals.REPORT_BUCKET_NAME
+        self._s3_client = s3_client
+
+    @property
+    def s3_client(self):
+        return self._s3_client or globals.get_s3_client()
+
+    def get_key(self, name: str) -> str:
+        return f"{globals.REPORT_BUCKET_FOLDER_NAME}/{SNAPSHOT_FOLDER_NAME}/{name}"
+
+    # ¦ load
+    def load(self, name: str) -> Optional[Dict]:
+        """Returns the stored snapshot, or None if there is none (or no bucket is configured)."""
+        return self.load_versioned(name)[0]
+
+    # ¦ load_versioned
+    def load_versioned(self, name: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """Returns the stored snapshot and its ETag, the version save_if_unchanged() expects."""
+        if not self.bucket_name:
+            return None, None
+        key = self.get_key(name)
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+            snapshot = json.loads(gzip.decompress(response["Body"].read()))
+            globals.LOGGER.info(f"Loaded snapshot s3://{self.bucket_name}/{key}")
+            return snapshot, response.get("ETag")
+        except ClientError as e:
+            # Without s3:ListBucket a missing key is reported as AccessDenied
+            if e.response.get("Error", {}).get("Code") in [
+                "NoSuchKey",
+                "404",
+                "AccessDenied",
+            ]:
+                globals.LOGGER.info(
+                    f"No snapshot found at s3://{self.bucket_name}/{key}"
+                )
+                return None, None
+            globals.LOGGER.exception(f"Failed to load snapshot {key}")
+            return None, None
+        except Exception:
+            globals.LOGGER.exception(f"Failed to load snapshot {key}")
+            return None, None
+
+    # ¦ save
+    def save(self, name: str, snapshot: Dict) -> Optional[str]:
+        if not self.bucket_name:
+            return None
+        key = self.get_key(name)
+        local_file_path = None
+        try:
+            # default=str covers datetimes returned by boto3, e.g. JoinedTimestamp
+            local_file_path = globals.dump_json_gz(snapshot)
+            self.s3_client.upload_file(
+                local_file_path,
+                self.bucket_name,
+                key,
+                ExtraArgs={
+                    "ContentType": "application/json",
+                    "ContentEncoding": "gzip",
+                },
+                Config=globals.get_s3_transfer_config(),
+            )
+            globals.LOGGER.info(
+                f"Saved snapshot s3://{self.bucket_name}/{key} "
+                f"({os.path.getsize(local_file_path) / 1024:.1f} KiB)"
+            )
+            return key
+        except Exception:
+            globals.LOGGER.exception(f"Failed to save snapshot {key}")
+            return None
+        finally:
+            if local_file_path and os.path.exists(local_file_path):
+                os.remove(local_file_path)
+
+    # ¦ save_if_unchanged
+    def save_if_unchanged(
+        self, name: str, snapshot: Dict, etag: Optional[str]
+    ) -> Optional[str]:
+        """
+        Saves the snapshot only if the stored one still has the given ETag (or, without an ETag,
+        if none is stored), so concurrent read-modify-write cycles cannot overwrite each other.
+
+        Raises:
+            SnapshotConflictError: The stored snapshot changed since it was loaded.
+        """
+        if not self.bucket_name:
+            return None
+        key = self.get_key(name)
+        condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+        local_file_path = None
+        try:
+            local_file_path = globals.dump_json_gz(snapshot)
+            # upload_file cannot pass the condition, a single PutObject streams up to 5 GB
+            with open(local_file_path, "rb") as snapshot_file:
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=key,
+                    Body=snapshot_file,
+                    ContentType="application/json",
+                    ContentEncoding="gzip",
+                    **condition,
+                )
+            globals.LOGGER.info(f"Saved snapshot s3://{self.bucket_name}/{key}")
+            return key
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in CONFLICT_ERROR_CODES:
+                raise SnapshotConflictError(key) from e
+            globals.LOGGER.exception(f"Failed to save snapshot {key}")
+            return None
+        except Exception:
+            globals.LOGGER.exception(f"Failed to save snapshot {key}")
+            return None
+        finally:
+            if local_file_path and os.path.exists(local_file_path):
+                os.remove(local_file_path)
+
+    # ¦ delete
+    def delete(self, name: str):
+        if not self.bucket_name:
+            return
+        key = self.get_key(name)
+        try:
+            self.s3_client.delete_object(Bucket=self.bucket_name, Key=key)
+        except Exception:
+            globals.LOGGER.exception(f"Failed to delete snapshot {key}")
+
+    # ¦ load_raw_crawl
+    def load_raw_crawl(
+        self, instance_arn: str, max_age_hours: Optional[float] = None
+    ) -> Optional[Dict]:
+        """Returns the previous raw crawl if it belongs to the same instance and is recent enough."""
+        snapshot = self.load(RAW_CRAWL_SNAPSHOT_NAME)
+        if not snapshot:
+            return None
+        if snapshot.get("version") != RAW_CRAWL_SNAPSHOT_VERSION:
+            globals.LOGGER.info("Ignoring raw crawl snapshot of another version")
+            return None
+        if snapshot.get("instance_arn") != instance_arn:
+            globals.LOGGER.info("Ignoring raw crawl snapshot of another instance")
+            return None
+        if max_age_hours:
+            created = datetime.fromisoformat(snapshot["created"])
+            if datetime.now(timezone.utc) - created > timedelta(hours=max_age_hours):
+                globals.LOGGER.info(
+                    f"Ignoring raw crawl snapshot older than {max_age_hours} hours"
+                )
+                return None
+        return snapshot
+
+    # ¦ save_raw_crawl
+    def save_raw_crawl(
+        self,
+        instance_arn: str,
+        identitystore_id: str,
+        accounts: List[Dict],
+        permission_sets: Dict,
+        identity_cache: Dict,
+        accounts_listed_at: Optional[str] = None,
+        users_listed_at: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        The listing times let the next crawl reuse the accounts and users while they are younger
+        than the METADATA_CACHE TTL, see AccountWrapper.seed().
+        """
+        return self.save(
+            RAW_CRAWL_SNAPSHOT_NAME,
+            {
+                "version": RAW_CRAWL_SNAPSHOT_VERSION,
+                "created": datetime.now(timezone.utc).isoformat(),
+                "instance_arn": instance_arn,
+                "identitystore_id": identitystore_id,
+                "accounts": accounts,
+                "accounts_listed_at": accounts_listed_at,
+                "permission_sets": permission_sets,
+                "identity_cache": identity_cache,
+                "users_listed_at": users_listed_at,
+            },
+        )
+
+    # ¦ load_transformed
+    def load_transformed(self) -> Optional[Dict]:
+        return self.load(TRANSFORMED_SNAPSHOT_NAME)
+
+    # ¦ load_transformed_versioned
+    def load_transformed_versioned(self) -> Tuple[Optional[Dict], Optional[str]]:
+        return self.load_versioned(TRANSFORMED_SNAPSHOT_NAME)
+
+    # ¦ save_transformed
+    def save_transformed(self, transformed: Dict) -> Optional[str]:
+        return self.save(TRANSFORMED_SNAPSHOT_NAME, transformed)
+
+    # ¦ save_transformed_if_unchanged
+    def save_transformed_if_unchanged(
+        self, transformed: Dict, etag: Optional[str]
+    ) -> Optional[str]:
+        return self.save_if_unchanged(TRANSFORMED_SNAPSHOT_NAME, transformed, etag)
+
+    # ¦ load_checkpoint
+    def load_checkpoint(self, run_id: str) -> Optional[Dict]:
+        """Returns the checkpoint of the given crawl run, or None if the stored one belongs to another run."""
+        checkpoint = self.load(CHECKPOINT_SNAPSHOT_NAME)
+        if checkpoint and checkpoint.get("run_id") != run_id:
+            globals.LOGGER.warning(
+                f"Ignoring crawl checkpoint of run {checkpoint.get('run_id')}, expected {run_id}"
+            )
+            return None
+        return checkpoint
+
+    # ¦ save_checkpoint
+    def save_checkpoint(self, run_id: str, crawl_state: Dict) -> Optional[str]:
+        return self.save(
+            CHECKPOINT_SNAPSHOT_NAME,
+            {
+                "run_id": run_id,
+                "created": datetime.now(timezone.utc).isoformat(),
+                "crawl_state": crawl_state,
+            },
+        )
+
+    # ¦ delete_checkpoint
+    def delete_checkpoint(self):
+        self.delete(CHECKPOINT_SNAPSHOT_NAME)
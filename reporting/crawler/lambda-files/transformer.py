@@ -13,10 +13,38 @@ For commercial licensing, contact: contact@acai.gmbh
 """
 
 import logging
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
 from pull_data.identitystore_wrapper import IdentitystoreWrapper
 
+# (account id, permission set name, group id or None for direct assignments)
+EffectiveAccessEntry = Tuple[str, str, Optional[str]]
+
+
+def build_effective_access(transformed: Dict) -> Dict[str, List[EffectiveAccessEntry]]:
+    """
+    Inverts the account-centric transformed data into user id -> effective access entries.
+
+    One pass over the assignments, expanding group assignments by their members.
+    Users without any access are listed with an empty list.
+    """
+    groups = transformed["principals"]["groups"]
+    effective_access = {user_id: [] for user_id in transformed["principals"]["users"]}
+    for account_id, account_info in transformed["accounts"].items():
+        for permission_set_name, permission_set_info in account_info[
+            "permission_sets"
+        ].items():
+            for group_id in permission_set_info["groups"]:
+                for user_id in groups.get(group_id, {}).get("assigned_users", []):
+                    effective_access.setdefault(user_id, []).append(
+                        (account_id, permission_set_name, group_id)
+                    )
+            for user_id in permission_set_info["users"]:
+                effective_access.setdefault(user_id, []).append(
+                    (account_id, permission_set_name, None)
+                )
+    return effective_access
+
 
 class Transformer:
     def __init__(
@@ -24,6 +52,8 @@ class Transformer:
     ):
         self.permission_sets = permission_sets
         self.identitystore_wrapper = identitystore_wrapper
+        # Filled by transform_assignments()
+        self.effective_access: Dict[str, List[EffectiveAccessEntry]] = {}
 
     def transform_assignments(self) -> Dict:
         """
@@ -37,69 +67,49 @@ class Transformer:
 
         Returns:
             Dict: The transformed data structure organized by account IDs, including principals info.
+            The user-centric inverse is kept in self.effective_access.
         """
         # Initialize the structure for transformed data
         transformed = {"accounts": {}, "principals": {"users": {}, "groups": {}}}
-        referenced_user_ids = []
-        referenced_group_ids = []
+        # Dicts act as insertion-ordered sets: O(1) membership, first-seen order kept
+        referenced_user_ids: Dict[str, None] = {}
+        referenced_group_ids: Dict[str, None] = {}
 
         for ps_arn, ps_info in self.permission_sets.items():
+            permission_set_name = ps_info["permissionset_details"]["name"]
             for account in ps_info.get("accounts", []):
                 account_id = account.get("id")
-                account_name = account.get("name")
-                account_status = account.get("status")
 
                 # Fetch user and group display names
                 user_ids = account.get("assignments", {}).get("users", [])
                 group_ids = account.get("assignments", {}).get("groups", [])
 
-                # Add unique user_ids to referenced_user_ids
-                new_user_ids = [
-                    user_id
-                    for user_id in user_ids
-                    if user_id not in referenced_user_ids
-                ]
-                referenced_user_ids.extend(new_user_ids)
-                # Similarly, add unique group_ids to referenced_group_ids
-                new_group_ids = [
-                    group_id
-                    for group_id in group_ids
-                    if group_id not in referenced_group_ids
-                ]
-                referenced_group_ids.extend(new_group_ids)
-
-                # Initialize or update the account info in the transformed dict
-                if account_id not in transformed["accounts"]:
-                    transformed["accounts"][account_id] = {
-                        "account_name": account_name,
-                        "account_status": account_status,
-                        "permission_sets": {
-                            ps_info["permissionset_details"]["name"]: {
-                                "permission_set_arn": ps_arn,
-                                "users": user_ids,
-                                "groups": group_ids,
-                            }
-                        },
+                # Add unique user_ids and group_ids, existing keys keep their position
+                referenced_user_ids.update(dict.fromkeys(user_ids))
+                referenced_group_ids.update(dict.fromkeys(group_ids))
+
+                # Initialize the account info in the transformed dict on first sight
+                account_entry = transformed["accounts"].get(account_id)
+                if account_entry is None:
+                    account_entry = transformed["accounts"][account_id] = {
+                        "account_name": account.get("name"),
+                        "account_status": account.get("status"),
+                        "permission_sets": {},
                     }
-                else:
-                    # If the account is already in the transformed dict, just update with new permission set info
-                    transformed["accounts"][account_id]["permission_sets"][
-                        ps_info["permissionset_details"]["name"]
-                    ] = {
-                        "permission_set_arn": ps_arn,
-                        "users": user_ids,
-                        "groups": group_ids,
-                    }
-
+                account_entry["permission_sets"][permission_set_name] = {
+                    "permission_set_arn": ps_arn,
+                    "users": user_ids,
+                    "groups": group_ids,
+                }
+
+        # Expand only the referenced groups (no-op for groups that are already cached)
+        self.identitystore_wrapper.resolve_groups(referenced_group_ids)
         for group_id in referenced_group_ids:
             group_info = self.identitystore_wrapper.get_group_info(group_id)
-            assigned_user_ids = group_info["assigned_users"]
             # Populate the groups within principals with display names and assigned users
             transformed["principals"]["groups"][group_id] = group_info
             # Ensure all users found as part of group memberships are also referenced
-            for user_id in assigned_user_ids:
-                if user_id not in referenced_user_ids:
-                    referenced_user_ids.append(user_id)
+            referenced_user_ids.update(dict.fromkeys(group_info["assigned_users"]))
 
         # Now, fetch and add user details for all referenced users
         for user_id in referenced_user_ids:
@@ -112,4 +122,5 @@ class Transformer:
                     f"Expected string for user_id, got {type(user_id)}: {user_id}"
                 )
 
+        self.effective_access = build_effective_access(transformed)
         return transformed
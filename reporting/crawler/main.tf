@@ -70,9 +70,33 @@ module "icd_report" {
     config       = var.lambda_settings
     tracing_mode = var.lambda_settings.tracing_mode
     environment_variables = {
-      LOG_LEVEL          = var.lambda_settings.log_level
-      CRAWLER_ARN        = local.settings.crawled_account.iam_role_arn
-      REPORT_BUCKET_NAME = var.settings.security.reporting.bucket_name
+      LOG_LEVEL                     = var.lambda_settings.log_level
+      CRAWLER_ARN                   = local.settings.crawled_account.iam_role_arn
+      CRAWLER_MAX_WORKERS           = local.settings.crawler.max_workers
+      API_RATE_LIMITS               = jsonencode(local.settings.crawler.api_rate_limits)
+      GROUP_RESOLUTION              = local.settings.crawler.group_resolution
+      CRAWL_STRATEGY                = local.settings.crawler.crawl_strategy
+      FORCE_FULL_CRAWL              = tostring(local.settings.crawler.force_full_crawl)
+      SNAPSHOT_MAX_AGE_HOURS        = local.settings.crawler.snapshot_max_age_hours
+      EXCEL_CONSTANT_MEMORY         = tostring(local.settings.crawler.excel_constant_memory)
+      UPLOAD_MAX_WORKERS            = local.settings.crawler.upload_max_workers
+      UPLOAD_GZIP_THRESHOLD_MB      = local.settings.crawler.upload_gzip_threshold_mb
+      SKIP_UNCHANGED_REPORTS        = tostring(local.settings.crawler.skip_unchanged_reports)
+      OUTPUT_FORMATS                = join(",", local.settings.crawler.output_formats)
+      SQLITE_EXPORT                 = tostring(local.settings.crawler.sqlite_export)
+      ATHENA_EXPORT                 = tostring(local.settings.crawler.athena_export)
+      ATHENA_SHARD_DIGITS           = local.settings.crawler.athena_shard_digits
+      EVENT_RENDER_INTERVAL_SECONDS = local.settings.crawler.event_render_interval_seconds
+      FULL_RESPONSE                 = tostring(local.settings.crawler.full_response)
+      CHECKPOINT_RESERVE_SECONDS    = local.settings.crawler.checkpoint_reserve_seconds
+      CHECKPOINT_MAX_RESUMES        = local.settings.crawler.checkpoint_max_resumes
+      CRAWL_SHARDS                  = local.settings.crawler.crawl_shards
+      METRICS_NAMESPACE             = local.settings.crawler.metrics_namespace
+      METADATA_CACHE_TTL_SECONDS    = local.settings.crawler.metadata_cache_ttl_seconds
+      METADATA_CACHE_MAX_ITEMS      = local.settings.crawler.metadata_cache_max_items
+      ROLE_SESSION_DURATION         = local.settings.crawled_account.session_duration_seconds
+      ROLE_SESSION_NAME             = local.settings.crawled_account.session_name
+      REPORT_BUCKET_NAME            = var.settings.security.reporting.bucket_name
     }
     package = {
       source_path = "${path.module}/lambda-files"
@@ -110,10 +134,86 @@ data "aws_iam_policy_document" "lambda_policy" {
       effect = "Allow"
       actions = [
         "s3:PutObject",
+        "s3:GetObject",
+        "s3:AbortMultipartUpload",
+        "s3:DeleteObject",
       ]
       resources = [
         format("arn:aws:s3:::%s/idc-reports/*", var.settings.security.reporting.bucket_name)
       ]
     }
   }
+
+  # Crawls close to the Lambda timeout checkpoint and continue in a new invocation,
+  # sharded crawls invoke the function once per shard
+  statement {
+    sid    = "AllowSelfInvoke"
+    effect = "Allow"
+    actions = [
+      "lambda:InvokeFunction"
+    ]
+    resources = [local.crawler_lambda_arn]
+  }
+}
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# ¦ EVENT-DRIVEN DELTA UPDATES
+# ---------------------------------------------------------------------------------------------------------------------
+# CloudTrail events of the IdC instance must reach the default event bus of this account, e.g. via a
+# cross-account EventBridge rule in the IdC management account.
+data "aws_region" "current" {}
+data "aws_caller_identity" "current" {}
+
+locals {
+  crawler_lambda_arn = format(
+    "arn:aws:lambda:%s:%s:function:%s",
+    data.aws_region.current.name,
+    data.aws_caller_identity.current.account_id,
+    local.settings.crawler.lambda_name
+  )
+}
+
+resource "aws_cloudwatch_event_rule" "idc_changes" {
+  count = local.settings.crawler.event_driven_updates ? 1 : 0
+
+  name        = format("%s-idc-changes", local.settings.crawler.lambda_name)
+  description = "IAM Identity Center assignment and membership changes for the IdC report"
+  event_pattern = jsonencode({
+    source        = ["aws.sso", "aws.identitystore"]
+    "detail-type" = ["AWS API Call via CloudTrail"]
+    detail = {
+      eventName = [
+        "CreateAccountAssignment",
+        "DeleteAccountAssignment",
+        "DeletePermissionSet",
+        "CreateGroupMembership",
+        "DeleteGroupMembership",
+        "UpdateUser",
+        "DeleteUser",
+        "UpdateGroup",
+        "DeleteGroup"
+      ]
+    }
+  })
+  tags = local.resource_tags
+}
+
+resource "aws_cloudwatch_event_target" "idc_changes" {
+  count = local.settings.crawler.event_driven_updates ? 1 : 0
+
+  rule       = aws_cloudwatch_event_rule.idc_changes[0].name
+  arn        = local.crawler_lambda_arn
+  depends_on = [module.icd_report]
+}
+
+resource "aws_lambda_permission" "idc_changes" {
+  count = local.settings.crawler.event_driven_updates ? 1 : 0
+
+  statement_id  = "AllowIdcChangeEvents"
+  action        = "lambda:InvokeFunction"
+  function_name = local.settings.crawler.lambda_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.idc_changes[0].arn
+  depends_on    = [module.icd_report]
 }
@@ -0,0 +1,76 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+Offline tests of the crawler Lambda against the fakes in crawler/benchmark.
+
+    cd reporting/crawler && python -m pytest tests
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+CRAWLER_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in ["lambda-files", "benchmark"]:
+    if os.path.join(CRAWLER_PATH, path) not in sys.path:
+        sys.path.insert(0, os.path.join(CRAWLER_PATH, path))
+
+# globals reads its settings at import time
+os.environ.update(
+    {
+        "AWS_REGION": "us-east-1",
+        "CRAWLER_ARN": "arn:aws:iam::000000000000:role/offline",
+        "REPORT_BUCKET_NAME": "local-report-bucket",
+        "CRAWLER_MAX_WORKERS": "2",
+        "LOG_LEVEL": "WARNING",
+        # No EMF record on stdout
+        "METRICS_NAMESPACE": "",
+        "API_RATE_LIMITS": json.dumps(
+            {"sso-admin": 1e6, "identitystore": 1e6, "organizations": 1e6}
+        ),
+    }
+)
+
+import globals  # noqa: E402
+from fake_aws import FakeSession, FakeTenant  # noqa: E402
+from local_s3 import LocalS3Client  # noqa: E402
+from pull_data.metadata_cache import METADATA_CACHE  # noqa: E402
+
+
+@pytest.fixture
+def s3_client(monkeypatch) -> LocalS3Client:
+    """In-memory report bucket, installed as the S3 client of the crawler."""
+    client = LocalS3Client()
+    monkeypatch.setattr(globals, "_S3_CLIENT", client)
+    return client
+
+
+@pytest.fixture
+def tenant(monkeypatch) -> FakeTenant:
+    """Seeded fake tenant; every assumed crawler role session is served by it."""
+    fake_tenant = FakeTenant()
+    monkeypatch.setattr(
+        globals, "assume_remote_role", lambda **kwargs: FakeSession(fake_tenant)
+    )
+    return fake_tenant
+
+
+@pytest.fixture(autouse=True)
+def crawler_settings(monkeypatch):
+    """Full crawls that always render, without metadata of earlier tests."""
+    monkeypatch.setattr(globals, "FORCE_FULL_CRAWL", True)
+    monkeypatch.setattr(globals, "SKIP_UNCHANGED_REPORTS", False)
+    METADATA_CACHE.clear()
+    yield
+    METADATA_CACHE.clear()
@@ -0,0 +1,37 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import pytest
+from botocore.exceptions import ClientError
+from fake_aws import FakeSession
+from pull_data.api_metrics import ApiMetrics
+
+
+def test_service_errors_are_counted(tenant):
+    api_metrics = ApiMetrics()
+    client = api_metrics.attach(FakeSession(tenant).client("sso-admin"))
+    instance_arn = tenant.handle("ListInstances", {})["Instances"][0]["InstanceArn"]
+
+    client.list_permission_sets(InstanceArn=instance_arn)
+    with pytest.raises(ClientError, match="ResourceNotFoundException"):
+        client.list_account_assignments_for_principal(
+            InstanceArn=instance_arn, PrincipalId="u-missing", PrincipalType="USER"
+        )
+
+    stats = api_metrics.get_stats()
+    assert stats["sso-admin:ListPermissionSets"]["errors"] == 0
+    assert stats["sso-admin:ListAccountAssignmentsForPrincipal"]["calls"] == 1
+    assert stats["sso-admin:ListAccountAssignmentsForPrincipal"]["errors"] == 1
+    record = api_metrics.build_emf_record("IdcReport")
+    assert record["sso-admin:ListAccountAssignmentsForPrincipal.Errors"] == 1
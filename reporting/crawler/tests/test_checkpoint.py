@@ -0,0 +1,63 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import globals
+import main as crawler_main
+import pytest
+from fake_aws import FakeContext, FakeLambdaClient
+from snapshot_store import CHECKPOINT_SNAPSHOT_NAME, SnapshotStore
+
+
+@pytest.fixture
+def lambda_client(monkeypatch) -> FakeLambdaClient:
+    client = FakeLambdaClient()
+    monkeypatch.setattr(globals, "_LAMBDA_CLIENT", client)
+    monkeypatch.setattr(globals, "CHECKPOINT_MAX_RESUMES", 1000)
+    return client
+
+
+@pytest.mark.parametrize("strategy", ["per_pair", "per_principal"])
+def test_resumed_crawl_matches_uninterrupted_crawl(
+    monkeypatch, s3_client, tenant, lambda_client, strategy
+):
+    monkeypatch.setattr(globals, "CRAWL_STRATEGY", strategy)
+    snapshot_store = SnapshotStore()
+    crawler_main.lambda_handler({}, None)
+    expected = snapshot_store.load_transformed()
+
+    event, results = {}, []
+    while not results or results[-1]["statusCode"] == 202:
+        # Every invocation gets five units of work before its deadline
+        results.append(crawler_main.lambda_handler(event, FakeContext(5)))
+        event = lambda_client.invocations[-1] if lambda_client.invocations else {}
+
+    assert len(results) > 2
+    assert results[-1]["statusCode"] == 200
+    assert len(lambda_client.invocations) == len(results) - 1
+    assert snapshot_store.load_transformed() == expected
+    assert (
+        s3_client.objects.get(
+            (
+                snapshot_store.bucket_name,
+                snapshot_store.get_key(CHECKPOINT_SNAPSHOT_NAME),
+            )
+        )
+        is None
+    )
+
+
+def test_crawl_without_progress_fails(s3_client, tenant, lambda_client):
+    with pytest.raises(RuntimeError, match="no progress"):
+        crawler_main.lambda_handler({}, FakeContext(0))
+    assert not lambda_client.invocations
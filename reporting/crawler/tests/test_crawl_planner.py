@@ -0,0 +1,79 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+from typing import Dict
+
+from pull_data.crawl_planner import (
+    STRATEGY_PER_PAIR,
+    STRATEGY_PER_PRINCIPAL,
+    CrawlPlanner,
+    count_assignments,
+)
+
+ACCOUNT_IDS = [f"{index:012d}" for index in range(200)]
+USER_IDS = [f"u-{index:04d}" for index in range(500)]
+
+
+def permission_sets(assignments: Dict) -> Dict:
+    return {
+        f"ps-{index}": {
+            "accounts": [
+                {"id": account_id, "assignments": assignments}
+                for account_id in ACCOUNT_IDS
+            ]
+        }
+        for index in range(5)
+    }
+
+
+def plan(previous_permission_sets: Dict, group_members=None):
+    return CrawlPlanner().plan(
+        permission_set_count=5,
+        provisioned_account_ids=ACCOUNT_IDS * 5,
+        principals={"users": USER_IDS, "groups": ["g-all", "g-admins"]},
+        group_members=group_members,
+        assignment_counts=count_assignments(previous_permission_sets),
+    )
+
+
+def test_group_heavy_tenant_lists_per_pair():
+    # An "all employees" group assigned to every pair; each user query pages through all of them
+    crawl_plan = plan(
+        permission_sets({"users": [], "groups": ["g-all"]}),
+        group_members={"g-all": USER_IDS},
+    )
+
+    assert crawl_plan.strategy == STRATEGY_PER_PAIR
+    assert crawl_plan.estimated_calls[STRATEGY_PER_PRINCIPAL] == 10 + 500 * 10 + 1
+
+
+def test_unknown_memberships_count_every_group_assignment():
+    crawl_plan = plan(permission_sets({"users": [], "groups": ["g-all"]}))
+
+    assert crawl_plan.strategy == STRATEGY_PER_PAIR
+
+
+def test_small_groups_list_per_principal():
+    crawl_plan = plan(
+        permission_sets({"users": [], "groups": ["g-admins"]}),
+        group_members={"g-admins": USER_IDS[:5], "g-all": USER_IDS},
+    )
+
+    assert crawl_plan.strategy == STRATEGY_PER_PRINCIPAL
+    assert crawl_plan.estimated_calls[STRATEGY_PER_PRINCIPAL] < 1000
+
+
+def test_previous_crawl_without_assignments_is_not_counted():
+    assert count_assignments({"ps": {"accounts": [{"id": "1"}]}}) is None
+    assert count_assignments(None) is None
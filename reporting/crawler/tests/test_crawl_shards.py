@@ -0,0 +1,104 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import io
+import json
+import threading
+
+import crawl_shards
+import globals
+import main as crawler_main
+import pytest
+from crawl_shards import LambdaDispatcher
+from fake_aws import FakeContext, FakeLambdaClient
+from snapshot_store import CHECKPOINT_SNAPSHOT_NAME, SnapshotStore
+
+
+class DetachedDispatcher:
+    def __init__(self):
+        """Starts no worker; the test runs the shard events later, like workers outliving the coordinator."""
+        self.events = []
+
+    def dispatch(self, events, should_stop=None):
+        self.events.extend(events)
+        return [None] * len(events)
+
+
+def test_coordinator_checkpoints_while_shards_run(monkeypatch, s3_client, tenant):
+    lambda_client = FakeLambdaClient()
+    monkeypatch.setattr(globals, "_LAMBDA_CLIENT", lambda_client)
+    snapshot_store = SnapshotStore()
+    crawler_main.lambda_handler({}, None)
+    expected = snapshot_store.load_transformed()
+
+    dispatcher = DetachedDispatcher()
+    monkeypatch.setattr(crawler_main, "create_dispatcher", lambda context: dispatcher)
+    result = crawler_main.lambda_handler({"shard_count": 3}, FakeContext(0))
+
+    assert result["statusCode"] == 202
+    assert len(dispatcher.events) == 3
+    for event in dispatcher.events:
+        crawler_main.shard_handler(event, None)
+    resume_event = lambda_client.invocations[-1]
+    result = crawler_main.lambda_handler(resume_event, FakeContext(0))
+
+    assert result["statusCode"] == 200
+    # Resuming collects the results instead of dispatching the shards again
+    assert len(dispatcher.events) == 3
+    assert snapshot_store.load_transformed() == expected
+    run_id = resume_event["resume"]["run_id"]
+    assert not [key for _, key in s3_client.objects if f"/shards/{run_id}/" in key]
+    assert snapshot_store.load(CHECKPOINT_SNAPSHOT_NAME) is None
+
+
+def test_missing_shard_results_fail_after_the_worker_limit(
+    monkeypatch, s3_client, tenant
+):
+    monkeypatch.setattr(globals, "_LAMBDA_CLIENT", FakeLambdaClient())
+    monkeypatch.setattr(crawl_shards, "SHARD_MAX_WAIT_SECONDS", -1)
+    monkeypatch.setattr(
+        crawler_main, "create_dispatcher", lambda context: DetachedDispatcher()
+    )
+    with pytest.raises(RuntimeError, match="did not complete"):
+        crawler_main.lambda_handler({"shard_count": 2}, FakeContext(0))
+    assert not [key for _, key in s3_client.objects if "/shards/" in key]
+
+
+class BlockingLambdaClient:
+    def __init__(self):
+        """Answers shard 0 at once and keeps shard 1 running until released."""
+        self.release = threading.Event()
+
+    def invoke(self, FunctionName, InvocationType, Payload):
+        if json.loads(Payload)["shard"]["index"] == 1:
+            self.release.wait(5)
+        return {"Payload": io.BytesIO(json.dumps({"statusCode": 200}).encode())}
+
+
+def test_dispatch_stops_waiting_at_the_deadline(monkeypatch):
+    monkeypatch.setattr(crawl_shards, "SHARD_POLL_SECONDS", 0.05)
+    lambda_client = BlockingLambdaClient()
+    dispatcher = LambdaDispatcher("worker", lambda_client=lambda_client)
+    events = [{"shard": {"run_id": "run", "index": index}} for index in range(2)]
+
+    responses = dispatcher.dispatch(events, should_stop=lambda: True)
+    lambda_client.release.set()
+
+    assert responses == [{"statusCode": 200}, None]
+
+
+def test_shard_invokes_are_not_retried(monkeypatch):
+    monkeypatch.setattr(globals, "_LAMBDA_CLIENT", None)
+    retries = globals.get_lambda_client().meta.config.retries
+    assert retries["total_max_attempts"] == 1
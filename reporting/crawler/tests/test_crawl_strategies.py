@@ -0,0 +1,53 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import globals
+import main as crawler_main
+from fake_aws import FakeSession
+from pull_data.ssoadmin_wrapper import SsoAdminWrapper
+from snapshot_store import SnapshotStore
+
+
+def crawl(monkeypatch, strategy: str):
+    monkeypatch.setattr(globals, "CRAWL_STRATEGY", strategy)
+    result = crawler_main.lambda_handler({}, None)
+    assert result["statusCode"] == 200, result
+    return SnapshotStore().load_transformed()
+
+
+def test_strategies_produce_the_same_report(monkeypatch, s3_client, tenant):
+    assert crawl(monkeypatch, "per_principal") == crawl(monkeypatch, "per_pair")
+
+
+def test_inherited_assignments_are_not_credited_to_the_user(tenant):
+    ssoadmin_wrapper = SsoAdminWrapper(FakeSession(tenant))
+    group_id = tenant.group_ids[0]
+    user_id = tenant.members[group_id][0]
+    group_pairs = set(
+        ssoadmin_wrapper._get_account_assignments_for_principal("GROUP", group_id)
+    )
+    direct_pairs = {
+        pair
+        for pair, principals in tenant.assignments.items()
+        if ("USER", user_id) in principals
+    }
+
+    user_pairs = ssoadmin_wrapper._get_account_assignments_for_principal(
+        "USER", user_id
+    )
+
+    assert group_pairs
+    assert set(user_pairs) == direct_pairs
+    # The fake returns the group's entries to the user query, like the real API
+    assert len(tenant._get_principal_assignments()[("USER", user_id)]) > len(user_pairs)
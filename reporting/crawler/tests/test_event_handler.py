@@ -0,0 +1,178 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import json
+import os
+
+import delta_updater
+import main as crawler_main
+import pytest
+from botocore.exceptions import ClientError
+from delta_updater import DeltaUpdater
+from report_manifest import ReportManifest
+from snapshot_store import SnapshotStore
+
+EVENTS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "benchmark", "fixtures", "events"
+)
+
+
+def load_fixture(name: str):
+    with open(os.path.join(EVENTS_PATH, name)) as fixture_file:
+        return json.load(fixture_file)
+
+
+@pytest.fixture
+def snapshot_store(s3_client, tenant) -> SnapshotStore:
+    store = SnapshotStore()
+    store.save_transformed(load_fixture("transformed.json"))
+    return store
+
+
+def assigned_users(transformed):
+    return transformed["accounts"]["111111111111"]["permission_sets"][
+        "AdministratorAccess"
+    ]["users"]
+
+
+def group_members(transformed):
+    return transformed["principals"]["groups"]["99999999-9999-9999-9999-999999999999"][
+        "assigned_users"
+    ]
+
+
+def test_concurrent_events_are_both_kept(monkeypatch, snapshot_store):
+    assignment_event = load_fixture("create_account_assignment.json")
+    membership_event = load_fixture("create_group_membership.json")
+    attempts = []
+
+    class InterleavedDeltaUpdater(DeltaUpdater):
+        def apply_event(self, event):
+            attempts.append(event["detail"]["eventName"])
+            if len(attempts) == 1:
+                # Another invocation saves its event between our load and save
+                crawler_main.event_handler(membership_event, None)
+            return super().apply_event(event)
+
+    monkeypatch.setattr(delta_updater, "DeltaUpdater", InterleavedDeltaUpdater)
+    result = crawler_main.event_handler(assignment_event, None)
+
+    assert result["statusCode"] == 200
+    # The assignment event was applied again to the snapshot with the membership
+    assert attempts == [
+        "CreateAccountAssignment",
+        "CreateGroupMembership",
+        "CreateAccountAssignment",
+    ]
+    transformed = snapshot_store.load_transformed()
+    assert "22222222-2222-2222-2222-222222222222" in assigned_users(transformed)
+    assert "11111111-1111-1111-1111-111111111111" in group_members(transformed)
+
+
+def test_event_fails_after_repeated_conflicts(monkeypatch, snapshot_store):
+    monkeypatch.setattr(crawler_main, "EVENT_UPDATE_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(crawler_main.time, "sleep", lambda seconds: None)
+
+    class ConflictingDeltaUpdater(DeltaUpdater):
+        def apply_event(self, event):
+            # Every attempt loses the race against another invocation
+            snapshot_store.save_transformed(load_fixture("transformed.json"))
+            return super().apply_event(event)
+
+    monkeypatch.setattr(delta_updater, "DeltaUpdater", ConflictingDeltaUpdater)
+    with pytest.raises(RuntimeError):
+        crawler_main.event_handler(load_fixture("create_account_assignment.json"), None)
+    assert "22222222-2222-2222-2222-222222222222" not in assigned_users(
+        snapshot_store.load_transformed()
+    )
+
+
+def test_recorded_events_patch_the_snapshot(snapshot_store):
+    for name in [
+        "create_account_assignment.json",
+        "create_group_membership.json",
+        "delete_account_assignment.json",
+    ]:
+        assert crawler_main.event_handler(load_fixture(name), None)["statusCode"] == 200
+
+    assert snapshot_store.load_transformed() == load_fixture(
+        "expected_transformed.json"
+    )
+
+
+def test_scheduled_event_runs_the_full_crawl(s3_client, tenant):
+    scheduled_event = {
+        "version": "0",
+        "id": "53dc4d37-cffa-4f76-80c9-8b7d4a4d2eaa",
+        "detail-type": "Scheduled Event",
+        "source": "aws.events",
+        "account": "000000000000",
+        "time": "2025-01-01T06:00:00Z",
+        "region": "us-east-1",
+        "resources": ["arn:aws:events:us-east-1:000000000000:rule/idc-report"],
+        "detail": {},
+    }
+    result = crawler_main.lambda_handler(scheduled_event, None)
+
+    assert result["statusCode"] == 200
+    transformed = SnapshotStore().load_transformed()
+    assert len(transformed["accounts"]) == tenant.account_count
+    assert tenant.calls
+
+
+def test_cloudtrail_events_go_to_the_event_handler(snapshot_store):
+    event = load_fixture("create_account_assignment.json")
+    assert crawler_main.is_identity_center_change(event)
+    assert not crawler_main.is_identity_center_change(dict(event, source="aws.ec2"))
+    result = crawler_main.lambda_handler(event, None)
+
+    assert json.loads(result["body"])["applied_events"] == 1
+
+
+def test_event_fails_if_the_snapshot_cannot_be_saved(monkeypatch, snapshot_store):
+    def denied_put_object(**kwargs):
+        raise ClientError(
+            {"Error": {"Code": "AccessDenied", "Message": "Access Denied"}},
+            "PutObject",
+        )
+
+    monkeypatch.setattr(snapshot_store.s3_client, "put_object", denied_put_object)
+    with pytest.raises(RuntimeError, match="Failed to save"):
+        crawler_main.event_handler(load_fixture("create_account_assignment.json"), None)
+
+
+def test_events_render_the_whole_tenant_once_per_interval(monkeypatch, snapshot_store):
+    monkeypatch.setattr(crawler_main.globals, "EVENT_RENDER_INTERVAL_SECONDS", 300)
+    crawler_main.event_handler(load_fixture("create_account_assignment.json"), None)
+    crawler_main.event_handler(load_fixture("create_group_membership.json"), None)
+
+    manifest = ReportManifest().load()
+    # The second event rendered only its CSV tables and the assignment changes
+    assert "content_hash" not in manifest
+    partial_artifacts = manifest["last_run"]["partial_artifacts"]
+    assert partial_artifacts
+    assert all(key.endswith(".csv") for key in partial_artifacts)
+    # The complete render of the first event is still listed
+    assert any(artifact["key"].endswith(".xlsx") for artifact in manifest["artifacts"])
+
+
+def test_events_render_everything_without_an_interval(monkeypatch, snapshot_store):
+    monkeypatch.setattr(crawler_main.globals, "EVENT_RENDER_INTERVAL_SECONDS", 0)
+    crawler_main.event_handler(load_fixture("create_account_assignment.json"), None)
+    crawler_main.event_handler(load_fixture("create_group_membership.json"), None)
+
+    manifest = ReportManifest().load()
+    assert manifest["last_run"]["rendered"]
+    assert "partial_artifacts" not in manifest["last_run"]
+    assert any(artifact["key"].endswith(".xlsx") for artifact in manifest["artifacts"])
@@ -0,0 +1,54 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import re
+import zipfile
+
+import xlsxwriter
+from rendering import excel_report
+from rendering.excel_report import SheetWriter
+
+
+def sheet_row_counts(path: str):
+    """Rows per worksheet name, read from the xlsx package without an Excel library."""
+    with zipfile.ZipFile(path) as package:
+        names = re.findall(
+            r'<sheet name="([^"]+)"', package.read("xl/workbook.xml").decode()
+        )
+        return {
+            name: package.read(f"xl/worksheets/sheet{index}.xml")
+            .decode()
+            .count("<row ")
+            for index, name in enumerate(names, start=1)
+        }
+
+
+def test_full_sheets_continue_on_numbered_sheets(monkeypatch, tmp_path):
+    monkeypatch.setattr(excel_report, "EXCEL_MAX_ROWS", 4)
+    path = str(tmp_path / "report.xlsx")
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    sheet = SheetWriter(workbook, "Assignments", ["A", "B"], [10, 10], None)
+
+    for index in range(10):
+        sheet.write_row([index, f"row {index}"])
+    workbook.close()
+
+    assert (sheet.sheet_count, sheet.row_count, sheet.dropped_rows) == (4, 10, 0)
+    # Header plus at most three data rows per sheet
+    assert sheet_row_counts(path) == {
+        "Assignments": 4,
+        "Assignments (2)": 4,
+        "Assignments (3)": 4,
+        "Assignments (4)": 2,
+    }
@@ -0,0 +1,70 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import globals
+import main as crawler_main
+from pull_data.crawl_planner import STRATEGY_PER_PRINCIPAL
+from pull_data.metadata_cache import METADATA_CACHE
+from snapshot_store import SnapshotStore
+
+
+def assigned_user_ids(transformed):
+    return {
+        user_id
+        for account in transformed["accounts"].values()
+        for permission_set in account["permission_sets"].values()
+        for user_id in permission_set["users"]
+    }
+
+
+def test_warm_per_principal_crawl_reuses_cached_users(monkeypatch, s3_client, tenant):
+    monkeypatch.setattr(globals, "FORCE_FULL_CRAWL", False)
+    monkeypatch.setattr(globals, "CRAWL_STRATEGY", STRATEGY_PER_PRINCIPAL)
+    assert crawler_main.lambda_handler({}, None)["statusCode"] == 200
+    cold_list_users = tenant.calls["ListUsers"]
+
+    assert crawler_main.lambda_handler({}, None)["statusCode"] == 200
+    assert tenant.calls["ListUsers"] == cold_list_users
+
+    # A cached user that no longer exists refreshes the cached listing
+    deleted_user_id = sorted(assigned_user_ids(SnapshotStore().load_transformed()))[0]
+    tenant.delete_user(deleted_user_id)
+    assert crawler_main.lambda_handler({}, None)["statusCode"] == 200
+    assert tenant.calls["ListUsers"] == 2 * cold_list_users
+    assert deleted_user_id not in assigned_user_ids(SnapshotStore().load_transformed())
+
+    assert crawler_main.lambda_handler({}, None)["statusCode"] == 200
+    assert tenant.calls["ListUsers"] == 2 * cold_list_users
+
+
+def test_cold_crawl_reuses_accounts_and_users_of_the_previous_crawl(
+    monkeypatch, s3_client, tenant
+):
+    monkeypatch.setattr(globals, "FORCE_FULL_CRAWL", False)
+    assert crawler_main.lambda_handler({}, None)["statusCode"] == 200
+    expected = SnapshotStore().load_transformed()
+    listed = {name: tenant.calls[name] for name in ["ListAccounts", "ListUsers"]}
+
+    # A new container starts without METADATA_CACHE entries
+    METADATA_CACHE.clear()
+    assert crawler_main.lambda_handler({}, None)["statusCode"] == 200
+    assert {name: tenant.calls[name] for name in listed} == listed
+    assert SnapshotStore().load_transformed() == expected
+
+    # Listings older than the cache TTL are not reused
+    METADATA_CACHE.clear()
+    monkeypatch.setattr(METADATA_CACHE, "ttl_seconds", 0)
+    assert crawler_main.lambda_handler({}, None)["statusCode"] == 200
+    assert tenant.calls["ListAccounts"] == 2 * listed["ListAccounts"]
+    assert tenant.calls["ListUsers"] == 2 * listed["ListUsers"]
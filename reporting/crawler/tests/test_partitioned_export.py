@@ -0,0 +1,64 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import globals
+import main as crawler_main
+from rendering import partitioned_export
+
+
+def partition_dates(s3_client, table: str):
+    return {
+        key.split("/")[1]
+        for _, key in s3_client.objects
+        if f"/table={table}/" in key and key.endswith(".ndjson.gz")
+    }
+
+
+def test_unchanged_day_still_gets_a_partition(monkeypatch, s3_client, tenant):
+    monkeypatch.setattr(globals, "ATHENA_EXPORT", True)
+    monkeypatch.setattr(globals, "SKIP_UNCHANGED_REPORTS", True)
+    monkeypatch.setattr(
+        partitioned_export, "current_partition_date", lambda: "2030-01-01"
+    )
+    crawler_main.lambda_handler({}, None)
+
+    # Next day, same data: the report is not rendered again, the partition is written
+    monkeypatch.setattr(
+        partitioned_export, "current_partition_date", lambda: "2030-01-02"
+    )
+    xlsx_count = sum(key.endswith(".xlsx") for _, key in s3_client.objects)
+    crawler_main.lambda_handler({}, None)
+    assert sum(key.endswith(".xlsx") for _, key in s3_client.objects) == xlsx_count
+    assert partition_dates(s3_client, "assignments") == {
+        "dt=2030-01-01",
+        "dt=2030-01-02",
+    }
+    assert partition_dates(s3_client, "users") == {"dt=2030-01-01", "dt=2030-01-02"}
+
+    # Same day again: nothing to write
+    object_count = len(s3_client.objects)
+    crawler_main.lambda_handler({}, None)
+    assert len(partition_dates(s3_client, "groups")) == 2
+    assert not [
+        key
+        for _, key in list(s3_client.objects)[object_count:]
+        if key.endswith(".ndjson.gz")
+    ]
+
+
+def test_latest_views_keep_the_last_run_per_day():
+    ddl = partitioned_export.athena_ddl("bucket", shard_prefix_length=1)
+    for table in partitioned_export.TABLE_COLUMNS:
+        assert f"CREATE OR REPLACE VIEW idc_reports.{table}_latest AS" in ddl
+    assert "max(report_time) OVER (PARTITION BY dt)" in ddl
@@ -0,0 +1,40 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import globals
+
+
+def test_session_refreshes_credentials_before_expiry():
+    calls = []
+
+    def refresh():
+        calls.append(len(calls))
+        # The second set is valid for an hour, the first one is about to expire
+        lifetime = timedelta(hours=1) if calls[1:] else timedelta(seconds=30)
+        return {
+            "access_key": f"AKIA{len(calls)}",
+            "secret_key": "secret",
+            "token": "token",
+            "expiry_time": (datetime.now(timezone.utc) + lifetime).isoformat(),
+        }
+
+    session = globals.refreshable_session(refresh)
+    credentials = session.get_credentials()
+
+    assert credentials.method == "sts-assume-role"
+    assert credentials.get_frozen_credentials().access_key == "AKIA2"
+    assert credentials.get_frozen_credentials().access_key == "AKIA2"
+    assert len(calls) == 2
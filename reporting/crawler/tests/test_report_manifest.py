@@ -0,0 +1,75 @@
+"""
+ACAI Cloud Foundation (ACF)
+Copyright (C) 2025 ACAI GmbH
+Licensed under AGPL v3
+#
+This file is part of ACAI ACF.
+Visit https://www.acai.gmbh or https://docs.acai.gmbh for more information.
+
+For full license text, see LICENSE file in repository root.
+For commercial licensing, contact: contact@acai.gmbh
+
+
+"""
+
+import globals
+import main as crawler_main
+import pytest
+from report_manifest import ReportManifest, compute_content_hash
+
+TRANSFORMED = {
+    "accounts": {},
+    "principals": {"users": {"u-1": {"user_name": "u1"}}, "groups": {}},
+}
+
+
+@pytest.mark.parametrize(
+    "setting, value",
+    [
+        ("OUTPUT_FORMATS", ["csv"]),
+        ("SQLITE_EXPORT", not globals.SQLITE_EXPORT),
+        ("ATHENA_EXPORT", not globals.ATHENA_EXPORT),
+        ("ATHENA_SHARD_DIGITS", globals.ATHENA_SHARD_DIGITS + 1),
+    ],
+)
+def test_output_settings_change_the_hash(monkeypatch, setting, value):
+    content_hash = compute_content_hash(TRANSFORMED)
+    monkeypatch.setattr(globals, setting, value)
+    assert compute_content_hash(TRANSFORMED) != content_hash
+
+
+def test_format_order_does_not_change_the_hash(monkeypatch):
+    monkeypatch.setattr(globals, "OUTPUT_FORMATS", ["excel", "csv"])
+    content_hash = compute_content_hash(TRANSFORMED)
+    monkeypatch.setattr(globals, "OUTPUT_FORMATS", ["csv", "excel"])
+    assert compute_content_hash(TRANSFORMED) == content_hash
+
+
+def test_failed_upload_renders_again(monkeypatch, s3_client, tenant):
+    monkeypatch.setattr(globals, "SKIP_UNCHANGED_REPORTS", True)
+    upload_file = s3_client.upload_file
+
+    def failing_upload_file(Filename, Bucket, Key, **kwargs):
+        if Key.endswith("_assignments.xlsx"):
+            raise RuntimeError("Simulated upload failure")
+        return upload_file(Filename, Bucket, Key, **kwargs)
+
+    monkeypatch.setattr(s3_client, "upload_file", failing_upload_file)
+    assert crawler_main.lambda_handler({}, None)["statusCode"] == 200
+    assert ReportManifest().load()["last_run"]["failed_uploads"] == 1
+    assert not excel_keys(s3_client)
+
+    monkeypatch.setattr(s3_client, "upload_file", upload_file)
+    assert crawler_main.lambda_handler({}, None)["statusCode"] == 200
+    manifest = ReportManifest().load()
+    assert manifest["last_run"]["rendered"]
+    assert manifest["content_hash"]
+    assert len(excel_keys(s3_client)) == 1
+
+    # Complete and unchanged, the next run skips rendering
+    assert crawler_main.lambda_handler({}, None)["statusCode"] == 200
+    assert not ReportManifest().load()["last_run"]["rendered"]
+
+
+def excel_keys(s3_client):
+    return [key for _, key in s3_client.objects if key.endswith("_assignments.xlsx")]
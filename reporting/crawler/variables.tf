@@ -18,18 +18,65 @@ variable "settings" {
         bucket_name = optional(string, "")
         identity_center = optional(object({
           crawler = object({
-            lambda_name             = string
-            lambda_description      = optional(string, "")
-            execution_iam_role_name = optional(string, null)
-            execution_iam_role_path = optional(string, "/")
+            lambda_name                   = string
+            lambda_description            = optional(string, "")
+            execution_iam_role_name       = optional(string, null)
+            execution_iam_role_path       = optional(string, "/")
+            max_workers                   = optional(number, 8)       # Concurrent assignment crawl workers (1 = serial)
+            api_rate_limits               = optional(map(number), {}) # TPS per "<service>" or "<service>:<Operation>"
+            group_resolution              = optional(string, "lazy")  # "lazy" (referenced groups only) or "prefetch" (all groups)
+            crawl_strategy                = optional(string, "auto")  # "auto" (planner decides), "per_pair" or "per_principal"
+            force_full_crawl              = optional(bool, false)     # Ignore the snapshot of the previous crawl
+            snapshot_max_age_hours        = optional(number, 24)      # Older snapshots are not reused
+            event_driven_updates          = optional(bool, false)     # Patch the last report from IdC CloudTrail events
+            event_render_interval_seconds = optional(number, 300) # Events render the whole-tenant reports (Excel, SQLite, ...) at most this often (0 = every event)
+            excel_constant_memory         = optional(bool, true)      # Write the Excel report row by row instead of in memory
+            upload_max_workers            = optional(number, 4)       # Concurrent report uploads
+            upload_gzip_threshold_mb      = optional(number, 5)       # Larger CSV/JSON artifacts are uploaded as <name>.gz (0 disables it)
+            skip_unchanged_reports        = optional(bool, true)      # Do not render again if the report data did not change
+            output_formats                = optional(list(string), ["excel", "csv"]) # Reports to render: "excel" and/or "csv"; fewer formats load less code on cold start
+            sqlite_export                 = optional(bool, false)     # Also upload the report as an indexed SQLite database
+            athena_export                 = optional(bool, false)     # Also write NDJSON partitions dt=YYYY-MM-DD/table=<table>/ for Athena
+            athena_shard_digits           = optional(number, 0)       # Shard the Athena assignments by leading account id digits (0 = off)
+            full_response                 = optional(bool, false)     # Return the transformed model instead of a summary (6 MB limit)
+            checkpoint_reserve_seconds    = optional(number, 120)     # Checkpoint the crawl and re-invoke once less time is left
+            checkpoint_max_resumes        = optional(number, 10)      # Upper bound of re-invocations per crawl
+            crawl_shards                  = optional(number, 1)       # Worker invocations of the assignment crawl, split by permission set (1 = off)
+            metrics_namespace             = optional(string, "IdcReporting") # CloudWatch namespace of the per-run EMF metrics ("" disables them)
+            metadata_cache_ttl_seconds    = optional(number, 14400)   # Reuse of account, permission set and identity store metadata in warm containers (0 = off)
+            metadata_cache_max_items      = optional(number, 250000)  # Upper bound of the items held by that cache
           })
           crawled_account = object({
-            iam_role_arn = string
+            iam_role_arn             = string
+            session_duration_seconds = optional(number, 3600)            # Lifetime of the assumed role credentials, refreshed before expiry (max 3600 when chained)
+            session_name             = optional(string, "RemoteSession") # Role session name shown in CloudTrail of the crawled account
           })
         }), null)
       })
     })
   })
+
+  validation {
+    condition = var.settings.security.reporting.identity_center == null ? true : contains(
+      ["lazy", "prefetch"], var.settings.security.reporting.identity_center.crawler.group_resolution
+    )
+    error_message = "crawler.group_resolution must be one of: \"lazy\", \"prefetch\"."
+  }
+
+  validation {
+    condition = var.settings.security.reporting.identity_center == null ? true : contains(
+      ["auto", "per_pair", "per_principal"], var.settings.security.reporting.identity_center.crawler.crawl_strategy
+    )
+    error_message = "crawler.crawl_strategy must be one of: \"auto\", \"per_pair\", \"per_principal\"."
+  }
+
+  validation {
+    condition = var.settings.security.reporting.identity_center == null ? true : (
+      var.settings.security.reporting.identity_center.crawled_account.session_duration_seconds >= 900 &&
+      var.settings.security.reporting.identity_center.crawled_account.session_duration_seconds <= 3600
+    )
+    error_message = "crawled_account.session_duration_seconds must be between 900 and 3600 (the maximum for chained role sessions)."
+  }
 }
 
 # ---------------------------------------------------------------------------------------------------------------------